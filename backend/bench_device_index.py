@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Benchmark showing that link-format parsing scales linearly with device count
+"""
+
+import time
+
+from main import NetworkParser
+
+SIZES = [1_000, 10_000, 50_000, 100_000, 200_000]
+
+# One line per link; every link introduces a new device
+LINK_FORMATS = {
+    "dash": "Core{0} - Core{1}",
+    "arrow": "Core{0} Gi0/0 <-> Core{1} Gi0/1",
+    "word": "Core{0} connects to Core{1}",
+}
+
+def build_chain(line_format, device_count):
+    return '\n'.join(line_format.format(i, i + 1) for i in range(device_count - 1))
+
+def bench_device_index():
+    print(f'{"format":<8}{"devices":>10}{"seconds":>10}{"us/device":>12}')
+    for format_name, line_format in LINK_FORMATS.items():
+        for device_count in SIZES:
+            content = build_chain(line_format, device_count)
+
+            start = time.perf_counter()
+            result = NetworkParser().parse_txt_file(content)
+            elapsed = time.perf_counter() - start
+
+            assert len(result["devices"]) == device_count
+            print(f'{format_name:<8}{device_count:>10}{elapsed:>10.3f}{elapsed / device_count * 1e6:>12.2f}')
+
+if __name__ == "__main__":
+    bench_device_index()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Parser benchmark suite
+Generates synthetic topologies in every supported text format and as
+Packet Tracer-style XML, then measures parse throughput and peak memory.
+Results are saved as JSON so runs can be compared.
+
+Usage: python bench_parser.py [--sizes 1000 10000] [--formats dash xml] [--output results.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import main
+from main import NetworkParser
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+DEVICE_TYPES = ["Router", "Switch", "PC", "Server"]
+
+
+def device_ip(i):
+    return f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+
+
+def device_name(i):
+    # Names must not start with a simple-format keyword (Router, PC, Node, ...)
+    # or the link formats would read them as device declarations
+    return f"Core{i}"
+
+
+def generate_structured(device_count):
+    lines = ["# Network Topology Export", ""]
+    for i in range(device_count):
+        lines += [
+            f"Device ID: {device_name(i)}",
+            f"Device Type: {DEVICE_TYPES[i % 4]}",
+            f"IP Address: {device_ip(i)}",
+            "",
+        ]
+    return '\n'.join(lines)
+
+
+def generate_enterprise(device_count):
+    lines = ["[Devices]"]
+    for i in range(device_count):
+        lines += [f"{DEVICE_TYPES[i % 4]}: {device_name(i)}", f"  IP: {device_ip(i)}", "  Model: 2911"]
+    lines += ["", "[Connections]"]
+    lines += [f"{device_name(i)} Gi0/0 <-> {device_name(i + 1)} Gi0/1" for i in range(device_count - 1)]
+    return '\n'.join(lines)
+
+
+def generate_tabular(device_count):
+    lines = ["# name|type|ip"]
+    lines += [f"{device_name(i)}|{DEVICE_TYPES[i % 4]}|{device_ip(i)}" for i in range(device_count)]
+    return '\n'.join(lines)
+
+
+def generate_dash(device_count):
+    return '\n'.join(f"{device_name(i)} - {device_name(i + 1)}" for i in range(device_count - 1))
+
+
+def generate_word(device_count):
+    return '\n'.join(f"{device_name(i)} connects to {device_name(i + 1)}" for i in range(device_count - 1))
+
+
+def generate_xml(device_count):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>', '<network>', '  <devices>']
+    for i in range(device_count):
+        parts.append(f'    <device name="{device_name(i)}" type="{DEVICE_TYPES[i % 4]}">'
+                     f'<interface name="FastEthernet0/0"><ipAddress>{device_ip(i)}</ipAddress></interface></device>')
+    parts += ['  </devices>', '  <links>']
+    parts += [f'    <link source="{device_name(i)}" target="{device_name(i + 1)}" />' for i in range(device_count - 1)]
+    parts += ['  </links>', '</network>']
+    return '\n'.join(parts)
+
+
+GENERATORS = {
+    "structured": generate_structured,
+    "enterprise": generate_enterprise,
+    "tabular": generate_tabular,
+    "dash": generate_dash,
+    "word": generate_word,
+    "xml": generate_xml,
+}
+
+
+def parse(format_name, content):
+    parser = NetworkParser(compact=True)
+    if format_name == "xml":
+        return parser.parse_xml_file(content)
+    return parser.parse_txt_file(content)
+
+
+def bench_one(format_name, device_count):
+    content = GENERATORS[format_name](device_count)
+    line_count = content.count('\n') + 1
+    size_mb = len(content.encode('utf-8')) / 2**20
+
+    # Timed without tracemalloc, which slows allocation down considerably
+    gc.collect()
+    start = time.perf_counter()
+    topology = parse(format_name, content)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    parse(format_name, content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "format": format_name,
+        "devices": device_count,
+        "parsed_devices": topology.device_count,
+        "parsed_links": topology.link_count,
+        "lines": line_count,
+        "size_mb": round(size_mb, 3),
+        "seconds": round(elapsed, 4),
+        "lines_per_second": round(line_count / elapsed),
+        "mb_per_second": round(size_mb / elapsed, 2),
+        # Memory of this process only; worker processes of a parallel parse are not traced
+        "peak_memory_mb": round(peak / 2**20, 2),
+        "parallel": format_name != "xml" and len(content) >= main.PARALLEL_PARSE_THRESHOLD,
+    }
+
+
+def bench_parser(sizes, formats, output):
+    results = []
+    print(f'{"format":<12}{"devices":>10}{"MB":>9}{"seconds":>10}{"lines/s":>12}{"MB/s":>8}{"peak MB":>10}')
+    for format_name in formats:
+        for device_count in sizes:
+            result = bench_one(format_name, device_count)
+            results.append(result)
+            print(f'{format_name:<12}{device_count:>10}{result["size_mb"]:>9.1f}{result["seconds"]:>10.3f}'
+                  f'{result["lines_per_second"]:>12}{result["mb_per_second"]:>8.1f}{result["peak_memory_mb"]:>10.1f}')
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults saved to {output}')
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the network topology parsers")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    arg_parser.add_argument("--formats", nargs="+", choices=list(GENERATORS), default=list(GENERATORS))
+    arg_parser.add_argument("--output", default="bench_parser_results.json")
+    args = arg_parser.parse_args()
+    bench_parser(args.sizes, args.formats, args.output)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PKT structure scan against the previous implementation on
+large binary lab files with embedded device names, IPs and connections
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from typing import Optional
+
+import xml_backend
+from pkt_converter import PKTConverter
+
+SIZES_MB = [5, 20, 40]
+DEVICE_COUNT = 500
+
+
+def legacy_parse_pkt_structure(self, pkt_file_path: str) -> Optional[str]:
+    """_parse_pkt_structure as it was before the shared scan, for comparison"""
+    try:
+        with open(pkt_file_path, 'rb') as f:
+            content = f.read()
+        
+        devices = []
+        connections = []
+        
+        # PKT files often contain structured data with specific markers
+        # Look for common patterns in PKT file format
+        
+        # Method 1: Look for XML-like structures embedded in binary
+        xml_pattern = re.compile(b'<[^>]+>[^<]*</[^>]+>', re.MULTILINE)
+        xml_matches = xml_pattern.findall(content)
+        
+        for match in xml_matches:
+            try:
+                xml_str = match.decode('utf-8', errors='ignore')
+                if any(keyword in xml_str.lower() for keyword in ['device', 'router', 'switch', 'pc']):
+                    # Try to parse as XML fragment
+                    try:
+                        elem = xml_backend.backend.fromstring(xml_str)
+                        device_info = self._extract_device_from_xml(elem)
+                        if device_info:
+                            devices.append(device_info)
+                    except:
+                        continue
+            except:
+                continue
+        
+        # Method 2: Look for JSON-like structures
+        json_pattern = re.compile(b'\\{[^{}]*"[^"]*"[^{}]*\\}', re.MULTILINE)
+        json_matches = json_pattern.findall(content)
+        
+        for match in json_matches:
+            try:
+                json_str = match.decode('utf-8', errors='ignore')
+                json_data = json.loads(json_str)
+                device_info = self._extract_device_from_json(json_data)
+                if device_info:
+                    devices.append(device_info)
+            except:
+                continue
+        
+        # Method 3: Enhanced string extraction with pattern matching
+        device_patterns = [
+            b'Router[0-9]+',
+            b'Switch[0-9]+', 
+            b'PC[0-9]+',
+            b'Server[0-9]+',
+            b'Hub[0-9]+',
+            b'[A-Z][a-z]+[0-9]+',
+        ]
+        
+        for pattern in device_patterns:
+            matches = re.findall(pattern, content)
+            for match in matches:
+                try:
+                    device_name = match.decode('ascii')
+                    if device_name not in [d['name'] for d in devices]:
+                        devices.append({
+                            'name': device_name,
+                            'type': self._guess_device_type(device_name),
+                            'ip': self._generate_ip_for_device(len(devices))
+                        })
+                except:
+                    continue
+        
+        # Method 4: Look for IP addresses and associate with devices
+        ip_pattern = re.compile(b'\\b(?:[0-9]{1,3}\\.){3}[0-9]{1,3}\\b')
+        ip_matches = ip_pattern.findall(content)
+        
+        valid_ips = []
+        for ip_match in ip_matches:
+            try:
+                ip_str = ip_match.decode('ascii')
+                # Validate IP format
+                parts = ip_str.split('.')
+                if all(0 <= int(part) <= 255 for part in parts):
+                    valid_ips.append(ip_str)
+            except:
+                continue
+        
+        # Associate IPs with devices
+        for i, device in enumerate(devices):
+            if i < len(valid_ips):
+                device['ip'] = valid_ips[i]
+        
+        # Method 5: Look for connection patterns
+        # PKT files often store connection info as device pairs
+        connection_patterns = [
+            re.compile(b'([A-Za-z0-9]+)\\s*->\\s*([A-Za-z0-9]+)'),
+            re.compile(b'([A-Za-z0-9]+)\\s*-\\s*([A-Za-z0-9]+)'),
+            re.compile(b'connect\\s+([A-Za-z0-9]+)\\s+([A-Za-z0-9]+)', re.IGNORECASE),
+        ]
+        
+        for pattern in connection_patterns:
+            matches = pattern.findall(content)
+            for match in matches:
+                try:
+                    from_device = match[0].decode('ascii')
+                    to_device = match[1].decode('ascii')
+                    
+                    # Check if both devices exist
+                    device_names = [d['name'] for d in devices]
+                    if from_device in device_names and to_device in device_names:
+                        connections.append({
+                            'from': from_device,
+                            'to': to_device
+                        })
+                except:
+                    continue
+        
+        # Generate some default connections if none found
+        if not connections and len(devices) > 1:
+            # Create a simple linear topology for demonstration
+            for i in range(len(devices) - 1):
+                connections.append({
+                    'from': devices[i]['name'],
+                    'to': devices[i + 1]['name']
+                })
+        
+        if devices:
+            return self._create_xml_from_devices(devices, connections)
+        
+        return None
+        
+    except Exception as e:
+        print(f"PKT structure parsing error: {e}")
+        return None
+
+
+def build_lab_file(size_mb, rng):
+    """Random bytes with device records and connections scattered through them"""
+    types = ["Router", "Switch", "PC", "Server"]
+    names = [f"{types[i % 4]}{i}" for i in range(DEVICE_COUNT)]
+    parts = []
+    size = 0
+    while size < size_mb * 2**20:
+        name = rng.choice(names)
+        record = f"\x00{name}\x00{rng.randint(1, 254)}.{rng.randint(0, 255)}.1.{rng.randint(1, 254)}\x00"
+        if rng.random() < 0.1:
+            record += f"{name} - {rng.choice(names)}\x00"
+        parts.append(rng.randbytes(rng.randint(50, 400)))
+        parts.append(record.encode())
+        size += len(parts[-2]) + len(parts[-1])
+    return b"".join(parts)
+
+def timed(function, *args):
+    start = time.perf_counter()
+    # Both implementations print on errors; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args)
+    return result, time.perf_counter() - start
+
+def bench_pkt_scan():
+    rng = random.Random(0)
+    converter = PKTConverter()
+    print(f'{"MB":>4}{"previous s":>12}{"scan s":>10}{"speedup":>9}')
+    try:
+        for size_mb in SIZES_MB:
+            content = build_lab_file(size_mb, rng)
+            with tempfile.NamedTemporaryFile(suffix=".pkt", delete=False) as f:
+                f.write(content)
+                path = f.name
+            try:
+                expected, legacy_seconds = timed(legacy_parse_pkt_structure, converter, path)
+                result, seconds = timed(lambda: converter._finish(converter._parse_pkt_structure(content), False))
+                assert result == expected
+                print(f"{size_mb:>4}{legacy_seconds:>12.2f}{seconds:>10.2f}{legacy_seconds / seconds:>8.1f}x")
+            finally:
+                os.unlink(path)
+    finally:
+        converter.cleanup()
+
+if __name__ == "__main__":
+    bench_pkt_scan()
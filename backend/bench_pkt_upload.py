@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Compare two ways of handing a spooled PKT upload to a conversion worker:
+reading it into memory and writing a temporary file for the worker to read,
+as /upload used to, against reading it straight into shared memory
+"""
+
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from bench_pkt_scan import build_lab_file
+from pkt_converter import ConversionPool
+from pkt_decoder import encode_pkt
+from test_pkt_decoder import packet_tracer_xml
+
+ROUNDS = 3
+
+def build_uploads():
+    yield "decoded", encode_pkt(packet_tracer_xml(20_000, True))
+    yield "scanned", build_lab_file(5, random.Random(0))
+
+def through_temp_file(pool, upload):
+    content = upload.read()
+    upload.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pkt') as temp_file:
+        temp_file.write(content)
+        temp_pkt_path = temp_file.name
+    try:
+        return pool.convert(temp_pkt_path)
+    finally:
+        os.unlink(temp_pkt_path)
+
+def through_shared_memory(pool, upload):
+    return pool.convert_file(upload, os.fstat(upload.fileno()).st_size)
+
+def measure(function, pool, upload):
+    """Best time of a few rounds, and the most memory this process held at once"""
+    seconds = []
+    for _ in range(ROUNDS):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = function(pool, upload)
+        seconds.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, min(seconds), peak
+
+def bench_pkt_upload():
+    pool = ConversionPool(size=1, timeout=300)
+    pool.start()
+    print(f'{"upload":<9}{"MB":>6}{"temp file s":>13}{"peak MB":>9}{"shared s":>10}{"peak MB":>9}')
+    try:
+        for name, content in build_uploads():
+            with tempfile.TemporaryFile() as upload:
+                upload.write(content)
+                upload.seek(0)
+                expected, file_seconds, file_peak = measure(through_temp_file, pool, upload)
+                result, shared_seconds, shared_peak = measure(through_shared_memory, pool, upload)
+                assert result == expected
+            print(f'{name:<9}{len(content) / 2**20:>6.1f}{file_seconds:>13.3f}{file_peak / 2**20:>9.1f}'
+                  f'{shared_seconds:>10.3f}{shared_peak / 2**20:>9.1f}')
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    bench_pkt_upload()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Measure memory held by parse results: the compact Topology against the
+list-of-dicts response shape, using tracemalloc
+"""
+
+import gc
+import tracemalloc
+
+from main import NetworkParser
+
+SIZES = [10_000, 100_000, 300_000]
+
+def build_mesh(device_count):
+    """Dash-format links: a chain plus a second link per device, so links outnumber devices"""
+    lines = [f'Core{i} - Core{i + 1}' for i in range(device_count - 1)]
+    lines += [f'Core{i} - Core{(i * 7 + 3) % device_count}' for i in range(device_count)]
+    return '\n'.join(lines)
+
+def measure(content, compact):
+    gc.collect()
+    tracemalloc.start()
+    result = NetworkParser(compact=compact).parse_txt_file(content)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak
+
+def bench_topology_memory():
+    print(f'{"devices":>9}{"links":>9}{"dicts MB":>11}{"compact MB":>12}{"peak dicts":>12}{"peak compact":>14}')
+    for device_count in SIZES:
+        content = build_mesh(device_count)
+
+        as_dicts, dicts_retained, dicts_peak = measure(content, compact=False)
+        topology, compact_retained, compact_peak = measure(content, compact=True)
+        assert topology.to_dict() == as_dicts
+
+        print(f'{topology.device_count:>9}{topology.link_count:>9}'
+              f'{dicts_retained / 2**20:>11.1f}{compact_retained / 2**20:>12.1f}'
+              f'{dicts_peak / 2**20:>12.1f}{compact_peak / 2**20:>14.1f}')
+
+if __name__ == "__main__":
+    bench_topology_memory()
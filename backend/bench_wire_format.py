@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare the /upload response formats on large topologies: payload size,
+time to encode on the server and time to decode back into records
+"""
+
+import json
+import time
+
+import wire_format
+from main import _iter_upload_ndjson, _upload_json_response
+from topology import Topology
+
+LINK_COUNTS = [10_000, 100_000, 300_000]
+
+def build_topology(link_count):
+    types = ["Router", "Switch", "PC", "Server"]
+    topology = Topology()
+    for i in range(link_count + 1):
+        topology.append_device(f"{types[i % 4]}{i}", types[i % 4], f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")
+    for i in range(link_count):
+        topology.append_link(f"{types[i % 4]}{i}", f"{types[(i + 1) % 4]}{i + 1}")
+    return topology
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def decode_ndjson(body):
+    result = {"devices": [], "links": []}
+    for line in body.splitlines():
+        value = json.loads(line)
+        for key in result:
+            result[key].extend(value.get(key, ()))
+    return result
+
+def decode_msgpack(body):
+    columns = wire_format.msgpack.unpackb(body)
+    strings = columns["strings"]
+    devices = columns["devices"]
+    return [{"name": strings[n], "type": strings[t], "ip": strings[i]}
+            for n, t, i in zip(devices["name"], devices["type"], devices["ip"])]
+
+def bench_wire_format():
+    formats = [
+        ("json", lambda t, m: _upload_json_response(t, m).body, json.loads),
+        ("ndjson", lambda t, m: b"".join(_iter_upload_ndjson(t, m)), decode_ndjson),
+        ("columnar", wire_format.encode_columnar, wire_format.decode_columnar),
+    ]
+    if wire_format.msgpack is not None:
+        formats.append(("msgpack", wire_format.encode_msgpack, decode_msgpack))
+
+    print(f'{"format":<10}{"links":>9}{"MB":>8}{"encode s":>10}{"decode s":>10}')
+    for link_count in LINK_COUNTS:
+        topology = build_topology(link_count)
+        metadata = {"devices_count": topology.device_count, "links_count": topology.link_count}
+        for name, encode, decode in formats:
+            body, encode_seconds = timed(encode, topology, metadata)
+            _, decode_seconds = timed(decode, body)
+            print(f'{name:<10}{link_count:>9}{len(body) / 2**20:>8.1f}{encode_seconds:>10.3f}{decode_seconds:>10.3f}')
+
+if __name__ == "__main__":
+    bench_wire_format()
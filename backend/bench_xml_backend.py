@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Compare the XML backends on large converted PKT output: building and
+serializing the XML in PKTConverter, then parsing it with parse_xml_file
+"""
+
+import time
+
+import xml_backend
+from main import NetworkParser
+from pkt_converter import PKTConverter
+
+SIZES = [10_000, 100_000, 300_000]
+
+def build_devices(device_count):
+    types = ["Router", "Switch", "PC", "Server"]
+    devices = [
+        {"name": f"{types[i % 4]}{i}", "type": types[i % 4], "ip": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"}
+        for i in range(device_count)
+    ]
+    connections = [{"from": devices[i]["name"], "to": devices[i + 1]["name"]} for i in range(device_count - 1)]
+    return devices, connections
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def bench_xml_backend():
+    print(f'Available backends: {", ".join(xml_backend.BACKENDS)}')
+    print(f'{"backend":<13}{"devices":>9}{"MB":>8}{"serialize s":>13}{"parse s":>10}')
+    converter = PKTConverter()
+    try:
+        for device_count in SIZES:
+            devices, connections = build_devices(device_count)
+            expected = None
+            for name in xml_backend.BACKENDS:
+                xml_backend.use(name)
+                xml_content, serialize_seconds = timed(converter._create_xml_from_devices, devices, connections)
+                topology, parse_seconds = timed(NetworkParser(compact=True).parse_xml_file, xml_content)
+
+                # Both backends must agree on what the output contains
+                parsed = (list(topology.iter_devices()), list(topology.iter_links()))
+                assert expected is None or parsed == expected
+                expected = parsed
+
+                print(f'{name:<13}{device_count:>9}{len(xml_content) / 2**20:>8.1f}'
+                      f'{serialize_seconds:>13.3f}{parse_seconds:>10.3f}')
+    finally:
+        converter.cleanup()
+        xml_backend.use()
+
+if __name__ == "__main__":
+    bench_xml_backend()
@@ -0,0 +1,148 @@
+"""
+Content sniffer
+Classifies an upload from its first few KB of raw bytes, before anything is
+decoded: ZIP archives, Packet Tracer containers, other binary files, XML and
+plain text, together with the encoding text should be decoded with. Uploads
+are routed on this rather than on their filename extension alone.
+"""
+
+import codecs
+import re
+from typing import BinaryIO, Optional, Tuple
+
+from pkt_decoder import looks_like_pkt
+
+# Bytes read from the start of an upload
+SNIFF_BYTES = 8 * 1024
+# Bytes read from the end, for the Packet Tracer header check
+SNIFF_TAIL_BYTES = 16
+# Past this share of control bytes, nulls included, content is binary
+BINARY_CONTROL_RATIO = 0.01
+# Past this share of bytes above 0x7F, content that isn't UTF-8 is binary
+# unless it reads as accented text
+BINARY_HIGH_BYTE_RATIO = 0.3
+# Share of the non-ASCII characters that must be letters for that
+ACCENTED_LETTER_RATIO = 0.8
+
+# C0 controls other than whitespace and escape
+_CONTROL_BYTES = bytes(range(0x09)) + bytes(range(0x0E, 0x1B)) + bytes(range(0x1C, 0x20))
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+
+_ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06", b"PK\x07\x08")
+_BINARY_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a", b"GIF89a",
+    b"%PDF-",
+    b"\x1f\x8b",  # gzip
+    b"7z\xbc\xaf\x27\x1c",
+    b"Rar!\x1a\x07",
+    b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",  # OLE, old Office documents
+    b"\x7fELF",
+    b"SQLite format 3\x00",
+)
+# Longest first, so UTF-32 LE isn't taken for UTF-16 LE
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_XML_DECLARATION_ENCODING = re.compile(rb'<\?xml[^>]*?\sencoding\s*=\s*["\']([A-Za-z][\w.:-]*)["\']')
+_XML_START = re.compile(r'\s*<[A-Za-z_:?!]')
+
+
+def sniff_content(head: bytes, tail: bytes = b"", size: Optional[int] = None) -> Tuple[str, Optional[str]]:
+    """Classify content from its first bytes; returns (kind, encoding).
+
+    kind is "zip", "pkt", "binary", "xml" or "text"; encoding is only set
+    for the last two. tail and size, the last bytes and the full length,
+    are needed to recognise Packet Tracer files. head is everything when
+    size is not given.
+    """
+    if size is None:
+        size = len(head)
+    if head.startswith(_ZIP_SIGNATURES):
+        return "zip", None
+    if head.startswith(_BINARY_SIGNATURES):
+        return "binary", None
+
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return _text_kind(head, encoding), encoding
+
+    encoding = _undeclared_encoding(head, complete=len(head) >= size)
+    controls = len(head) - len(head.translate(None, _CONTROL_BYTES))
+    high_bytes = len(head) - len(head.translate(None, _HIGH_BYTES))
+    # A stray control byte is tolerated, but not a null; text outside UTF-16
+    # and UTF-32 never has one
+    if (b"\x00" in head or controls > max(1, len(head) * BINARY_CONTROL_RATIO)
+            or encoding != "utf-8" and high_bytes > len(head) * BINARY_HIGH_BYTE_RATIO
+            and not _reads_as_accented_text(head, encoding)):
+        if len(head) >= SNIFF_TAIL_BYTES and len(tail) >= SNIFF_TAIL_BYTES and looks_like_pkt(head, tail, size):
+            return "pkt", None
+        return "binary", None
+
+    kind = _text_kind(head, encoding)
+    if kind == "xml":
+        encoding = _declared_encoding(head) or encoding
+    return kind, encoding
+
+
+def sniff_file(f: BinaryIO, size: int) -> Tuple[str, Optional[str]]:
+    """sniff_content for an open file of size bytes, left rewound"""
+    f.seek(0)
+    head = f.read(SNIFF_BYTES)
+    if size > len(head):
+        f.seek(max(size - SNIFF_TAIL_BYTES, 0))
+        tail = f.read(SNIFF_TAIL_BYTES)
+    else:
+        tail = head[-SNIFF_TAIL_BYTES:]
+    f.seek(0)
+    return sniff_content(head, tail, size)
+
+
+def _undeclared_encoding(head: bytes, complete: bool) -> str:
+    """UTF-8 when the head decodes as UTF-8, else Windows-1252 when it decodes
+    as that, else Latin-1, which decodes anything"""
+    try:
+        # A character cut off at the end of the head is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head, complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        head.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin1"
+
+
+def _reads_as_accented_text(head: bytes, encoding: str) -> bool:
+    """Whether the non-ASCII characters are mostly letters, as in accented
+    names, rather than the symbols and controls random bytes decode to"""
+    accented = [char for char in head.decode(encoding, "replace") if char > "\x7f"]
+    letters = sum(char.isalpha() for char in accented)
+    return letters >= len(accented) * ACCENTED_LETTER_RATIO
+
+
+def _declared_encoding(head: bytes) -> Optional[str]:
+    """The encoding named in an XML declaration, when Python knows it.
+
+    A declaration that was read as single bytes can't be right about a
+    UTF-16 or UTF-32 document without a BOM, so those are ignored.
+    """
+    match = _XML_DECLARATION_ENCODING.match(head.lstrip())
+    if not match:
+        return None
+    try:
+        encoding = codecs.lookup(match.group(1).decode("ascii")).name
+    except LookupError:
+        return None
+    return None if encoding.startswith(("utf-16", "utf-32")) else encoding
+
+
+def _text_kind(head: bytes, encoding: str) -> str:
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(head)
+    return "xml" if _XML_START.match(text) else "text"
@@ -0,0 +1,135 @@
+"""
+Background jobs
+Slow conversions and parses run here instead of holding their request open:
+a job is put on a bounded queue, a fixed number of workers on the event loop
+take jobs off it, and a finished job's outcome is kept until it expires.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class QueueFull(Exception):
+    """There is no room for another queued job"""
+
+
+class Job:
+    """One unit of queued work and, once it ran, its result or error.
+
+    status goes from "queued" to "running" to "done" or "failed".
+    queue_seconds and run_seconds are measured when the job starts and ends.
+    """
+
+    def __init__(self, kind: str, filename: Optional[str], work: Callable[[], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.status = "queued"
+        self.created_at = time.time()
+        self.queue_seconds = None
+        self.run_seconds = None
+        self.result = None
+        self.error = None
+        self._work = work
+        self._queued_at = time.perf_counter()
+        self._finished_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status fields for the API; the result and error are left to the caller"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at,
+            "queue_seconds": self.queue_seconds,
+            "run_seconds": self.run_seconds,
+        }
+
+    async def _run(self):
+        started = time.perf_counter()
+        self.queue_seconds = started - self._queued_at
+        self.status = "running"
+        try:
+            self.result = await self._work()
+            self.status = "done"
+        except BaseException as e:
+            self.error = e
+            self.status = "failed"
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self._finished_at = time.perf_counter()
+            self.run_seconds = self._finished_at - started
+            self._work = None
+
+
+class JobQueue:
+    """Runs jobs on `workers` tasks with up to `max_queued` jobs waiting.
+
+    submit() raises QueueFull rather than letting the backlog grow. Finished
+    jobs are forgotten `ttl` seconds after they finish. start() and stop()
+    tie the workers to the running event loop.
+    """
+
+    def __init__(self, workers: int, max_queued: int, ttl: float):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        # Finished job ids, oldest first, for expiry
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self):
+        self._queue = asyncio.Queue(self.max_queued)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def full(self) -> bool:
+        return self._queue is None or self._queue.full()
+
+    def submit(self, kind: str, filename: Optional[str], work: Callable[[], Awaitable[Any]]) -> Job:
+        """Queue work, a coroutine function taking no arguments"""
+        if self._queue is None:
+            raise RuntimeError("job queue is not running")
+        self._expire()
+        job = Job(kind, filename, work)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(f"{self.max_queued} jobs are already queued") from None
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job, or None when it is unknown or has expired"""
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await job._run()
+            finally:
+                self._finished[job.id] = job._finished_at
+
+    def _expire(self):
+        deadline = time.perf_counter() - self.ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > deadline:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
@@ -1,13 +1,32 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, Request, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import xml.etree.ElementTree as ET
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import re
 import json
-from typing import Dict, List, Any
+import asyncio
+import multiprocessing
+import multiprocessing.forkserver
+import codecs
+import functools
+import hashlib
+import zlib
+from collections import OrderedDict, deque
+from itertools import chain, islice, repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Iterable, Iterator, AsyncIterable, BinaryIO, Optional, Tuple, Union
 import os
+import shutil
+import time
 import tempfile
-from pkt_converter import PKTConverter
+import threading
+from content_sniffer import sniff_file
+from jobs import JobQueue, QueueFull
+from metrics import PROMETHEUS_MEDIA_TYPE, REGISTRY, Counter, Gauge, Histogram
+from pkt_converter import conversion_pool, discover_tools
+from topology import Topology
+from upload_cache import UploadCache
+from wire_format import COLUMNAR_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, NDJSON_MEDIA_TYPE, choose_media_type, encode_columnar, encode_msgpack
+import xml_backend
 
 app = FastAPI(title="Network Status Viewer API", version="1.0.0")
 
@@ -20,266 +39,750 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Line rules for text topology exports, in the order the parser tries them.
+# Each rule is one alternative of a single compiled pattern, so a line is
+# classified with one match() call instead of a cascade of separate regexes.
+_IP = r'\d+\.\d+\.\d+\.\d+'
+
+_SKIP_LINE_RULES = [
+    ("comment", r'(?:\#|//|;)'),
+    ("skip_section", r'.*?(?=[rmisop\[])(?:routing table|mac address table|interfaces:|spanning tree|ospf enabled'
+                     r'|\[protocols\]|\[simulation summary\]|ping test:|packet loss:)'),
+    ("section_header", r'\[.*\]\Z'),
+]
+
+_DEVICE_HEADER_RULES = [
+    # Format 6: Enterprise format (Router: R1, Switch: S1, PC: PC-Sales1)
+    ("enterprise_device", r'(?P<enterprise_type>Router|Switch|PC|Server|Hub|Bridge|Host|Firewall|AP):\s*(?P<enterprise_name>.+)'),
+    # Format 1: Structured format (Device ID: xxx)
+    ("device_id", r'Device\s*(?:ID|Name):\s*(?P<device_id_name>.+)'),
+]
+
+# Attribute lines only apply while a device block is open
+_DEVICE_ATTRIBUTE_RULES = [
+    ("device_type", r'(?:Device\s*)?Type:\s*(?P<device_type_value>.+)'),
+    ("ip_address", r'IP\s*(?:Address)?:\s*(?P<ip_address_value>' + _IP + r')'),
+    ("ip_cidr", r'.*?(?=i)IP:\s*(?P<ip_cidr_value>' + _IP + r')'),
+    ("ip_anywhere", r'.*?(?=\d)(?P<ip_anywhere_value>' + _IP + r')'),
+    ("connected_to", r'Connected\s*(?:To|Device):\s*(?P<connected_to_value>.+)'),
+    # Inside a device block, only lines mentioning a connection fall through
+    ("device_body", r'(?!.*?(?=[<cl])(?:<->|connects|connected|link))'),
+]
+
+_CONNECTION_RULES = [
+    # Connection with arrows (R1 GigabitEthernet0/0 <-> S1 FastEthernet0/1)
+    ("connection_arrow", r'(?=.*?<->).*?(?P<arrow_from>[A-Za-z0-9\-_]+).*?<->.*?(?P<arrow_to>[A-Za-z0-9\-_]+)'),
+    # Format 5: Tabular format (device_name | type | ip)
+    ("tabular", r'(?=.*\|)(?P<tabular_name>[A-Za-z0-9\-_]+)\s*[\|\t]\s*(?P<tabular_type>[A-Za-z]+)'
+                r'\s*[\|\t]?\s*(?P<tabular_ip>' + _IP + r')?'),
+    # Format 2: Simple device declarations, at most three words
+    ("simple_device", r'(?=\S+(?:\s+\S+){0,2}\Z)(?P<simple_type>Router|Switch|PC|Server|Hub|Bridge|Host|Node|Device)'
+                      r'\s*(?P<simple_name>[A-Za-z0-9\-_]+)\s*(?P<simple_ip>' + _IP + r')?'),
+    # Format 3: Network notation (Router1 - Switch1), at most five words
+    ("connection_dash", r'(?=\S+(?:\s+\S+){0,4}\Z)(?P<dash_from>[A-Za-z0-9\-_]+)\s*[\-\–\—]\s*(?P<dash_to>[A-Za-z0-9\-_\.]+)'),
+    # Format 4: Connection with "connects to" or similar
+    ("connection_word", r'(?P<word_from>[A-Za-z0-9\-_]+)\s+(?:connects?\s+to|connected\s+to|links?\s+to|attached\s+to)'
+                        r'\s+(?P<word_to>[A-Za-z0-9\-_]+)'),
+]
+
+_IP_PATTERN = re.compile(r'(' + _IP + r')')
+_IP_ONLY_PATTERN = re.compile(_IP + r'\Z')
+
+
+class _LineClassifier:
+    """Ordered line rules compiled into one alternation.
+
+    Alternatives are tried left to right, so the first rule that matches wins
+    just like an if/elif cascade, and ``lastgroup`` names that rule. When a
+    rule's handler declines a line, ``resume`` continues with the rules after it.
+    """
+
+    def __init__(self, rules):
+        self._positions = {kind: index for index, (kind, _) in enumerate(rules)}
+        self._patterns = [
+            re.compile('|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in rules[start:]), re.IGNORECASE)
+            for start in range(len(rules))
+        ]
+        self.match = self._patterns[0].match
+
+    def resume(self, line: str, kind: str):
+        start = self._positions[kind] + 1
+        if start == len(self._patterns):
+            return None
+        return self._patterns[start].match(line)
+
+
+_TOP_LEVEL_LINES = _LineClassifier(_SKIP_LINE_RULES + _DEVICE_HEADER_RULES + _CONNECTION_RULES)
+_DEVICE_BLOCK_LINES = _LineClassifier(
+    _SKIP_LINE_RULES + _DEVICE_HEADER_RULES + _DEVICE_ATTRIBUTE_RULES + _CONNECTION_RULES
+)
+
+# Fast paths for files that stick to one format. Each shape is anchored to
+# the whole line and only admits lines the full cascade above would give the
+# same rule and groups, so any line outside the shapes simply goes through
+# the full cascade and the output does not depend on the format guess.
+_NAME = r'[A-Za-z0-9_-]+'
+_INTERFACE = r'(?:FastEthernet|GigabitEthernet|Serial|Ethernet|Fa|Gi|Se|Et)[0-9/]+'
+_SIMPLE_TYPES = r'(?:Router|Switch|PC|Server|Hub|Bridge|Host|Node|Device)'
+
+_FAST_SHAPES = {
+    "comment": r'(?:\#|//|;)',
+    "section_header": r'\[.*\]\Z',
+    "enterprise_device": r'(?P<enterprise_type>Router|Switch|PC|Server|Hub|Bridge|Host|Firewall|AP):[ \t]*'
+                         r'(?P<enterprise_name>[A-Za-z0-9_.-]+)\Z',
+    "device_id": r'Device[ \t]*(?:ID|Name):[ \t]*(?P<device_id_name>[A-Za-z0-9_.-]+)\Z',
+    "device_type": r'(?:Device[ \t]*)?Type:[ \t]*(?![A-Za-z]*(?:routing table|spanning tree|ospf enabled))'
+                   r'(?P<device_type_value>[A-Za-z]+(?:[ \t][A-Za-z]+)?)\Z',
+    "ip_address": r'IP[ \t]*(?:Address)?:[ \t]*(?P<ip_address_value>' + _IP + r')\Z',
+    # Attribute lines with nothing the cascade would act on inside a device
+    # block: no header prefix, no dots (so no IPs), no connection words
+    "device_body": r'(?!(?:Router|Switch|PC|Server|Hub|Bridge|Host|Firewall|AP):|Device|Type:)'
+                   r'(?:[^.<cl]|c(?!onnect)|l(?!ink))*\Z',
+    "connection_arrow": r'(?P<arrow_from>' + _NAME + r')(?:[ \t]+' + _INTERFACE + r')?[ \t]*<->[ \t]*'
+                        r'(?P<arrow_to>' + _NAME + r')(?:[ \t]+' + _INTERFACE + r')?\Z',
+    "tabular": r'(?P<tabular_name>' + _NAME + r')\|(?P<tabular_type>[A-Za-z]+)\|(?P<tabular_ip>' + _IP + r')?\Z',
+    # "Router1", "Router1 192.168.1.1" and "Router0 - Switch0" are all simple
+    # declarations to the cascade, which tries them before dash links
+    "simple_device": r'(?P<simple_type>' + _SIMPLE_TYPES + r')(?P<simple_name>' + _NAME + r')'
+                     r'(?:[ \t]+(?P<simple_ip>' + _IP + r')|[ \t]+[-–—][ \t]+[A-Za-z0-9_.-]+)?\Z',
+    "connection_dash": r'(?!' + _SIMPLE_TYPES + r')(?P<dash_from>[A-Za-z0-9_]+)[ \t]+[-–—][ \t]*'
+                       r'(?P<dash_to>[A-Za-z0-9_.-]+)\Z',
+    "connection_word": r'(?P<word_from>[A-Za-z0-9_]+)[ \t]+(?:connects?|connected|links?|attached)[ \t]+to[ \t]+'
+                       r'(?P<word_to>' + _NAME + r')\Z',
+}
+
+def _fast_lines(*kinds):
+    return _LineClassifier([(kind, _FAST_SHAPES[kind]) for kind in ("comment", "section_header") + kinds])
+
+# Format -> (shapes outside a device block, shapes inside one)
+_FORMAT_FAST_LINES = {
+    "enterprise": (
+        _fast_lines("enterprise_device", "connection_arrow"),
+        _fast_lines("enterprise_device", "ip_address", "device_body", "connection_arrow"),
+    ),
+    "structured": (
+        _fast_lines("device_id"),
+        _fast_lines("device_id", "device_type", "ip_address", "device_body"),
+    ),
+    "tabular": (_fast_lines("tabular", "simple_device", "connection_dash"), None),
+    "dash": (_fast_lines("connection_dash", "simple_device"), None),
+    "simple": (_fast_lines("simple_device", "connection_word"), None),
+}
+
+# How much of the start of a text file the format sniffer looks at
+SNIFF_CHARS = 4096
+
+_SNIFF_SIGNATURES = {
+    "enterprise": re.compile(r'(?:Router|Switch|PC|Server|Hub|Bridge|Host|Firewall|AP):\s*\S', re.IGNORECASE),
+    "structured": re.compile(r'Device\s*(?:ID|Name):', re.IGNORECASE),
+    "tabular": re.compile(r'[^|]+\|'),
+    "dash": re.compile(r'\S+\s*[-–—]\s*\S+\Z'),
+    "simple": re.compile(r'(?:' + _SIMPLE_TYPES + r'\S*(?:\s+' + _IP + r')?|\S+\s+(?:connects?|connected|links?|attached)\s+to\s+\S+)\Z',
+                         re.IGNORECASE),
+}
+
+
+def _sniff_txt_format(head: str) -> Optional[str]:
+    """Guess the single format a text export uses from its first lines.
+
+    Returns None for mixed or unrecognised content. Device-block formats are
+    recognised by their headers; line formats must account for at least
+    half of the content lines.
+    """
+    counts = dict.fromkeys(_SNIFF_SIGNATURES, 0)
+    content_lines = 0
+    # The last line may be cut off mid-way
+    for line in head.split('\n')[:-1] if len(head) >= SNIFF_CHARS else head.split('\n'):
+        line = line.strip()
+        if not line or line[0] in '#/;[':
+            continue
+        content_lines += 1
+        for format_name, signature in _SNIFF_SIGNATURES.items():
+            if signature.match(line):
+                counts[format_name] += 1
+    
+    if counts["enterprise"] and counts["structured"]:
+        return None
+    for format_name in ("enterprise", "structured"):
+        if counts[format_name]:
+            return format_name
+    
+    line_format = max(("tabular", "dash", "simple"), key=counts.get)
+    if counts[line_format] and counts[line_format] * 2 >= content_lines:
+        return line_format
+    return None
+
+
+# Text exports at least this many characters long are parsed in parallel
+PARALLEL_PARSE_THRESHOLD = int(os.environ.get("PARALLEL_PARSE_THRESHOLD", 8 * 1024 * 1024))
+# Worker processes for parallel parsing; defaults to one per CPU
+PARALLEL_PARSE_WORKERS = int(os.environ.get("PARALLEL_PARSE_WORKERS", 0)) or os.cpu_count() or 1
+# Smallest block handed to a worker
+PARALLEL_MIN_BLOCK_SIZE = 256 * 1024
+
+# Lines that could be device headers; _is_device_header has the final say
+_DEVICE_HEADER_CANDIDATE = re.compile(r'^[^\S\n]*(?P<line>(?:(?:Router|Switch|PC|Server|Hub|Bridge|Host|Firewall|AP):'
+                                      r'|Device[^\S\n]*(?:ID|Name):)[^\n]*)', re.IGNORECASE | re.MULTILINE)
+_parse_pool = None
+
+
+def _device_header_at(content: str, start: int) -> int:
+    """Offset of the first line at or after start that opens a device block, -1 if none"""
+    for candidate in _DEVICE_HEADER_CANDIDATE.finditer(content, start):
+        if _is_device_header(candidate.group("line").strip()):
+            return candidate.start()
+    return -1
+
+
+def _is_device_header(line: str) -> bool:
+    match = _TOP_LEVEL_LINES.match(line)
+    return match is not None and match.lastgroup in ("enterprise_device", "device_id")
+
+
+def _split_txt_blocks(content: str, block_size: int) -> List[str]:
+    """Split a text export into blocks of about block_size that parse independently.
+
+    Blocks only end right before a device header, because that is the one
+    line that closes the open device block whatever came before it. Section
+    markers don't close a block, so they are not safe places to cut. Before
+    the first header no block is open and any line boundary will do.
+    """
+    first_header = _device_header_at(content, 0)
+    if first_header < 0:
+        first_header = len(content)
+
+    blocks = []
+    start = 0
+    while len(content) - start > block_size:
+        target = start + block_size
+        if target < first_header:
+            cut = content.find('\n', target, first_header) + 1 or first_header
+        else:
+            cut = _device_header_at(content, target)
+            if cut < 0:
+                break
+        blocks.append(content[start:cut])
+        start = cut
+    blocks.append(content[start:])
+    return blocks
+
+
+def _get_parse_pool():
+    """The worker processes for parallel parsing and BLOCKING_EXECUTOR="process".
+
+    Workers start from a fork server rather than being forked from this
+    process and its request threads. The app creates the pool at startup
+    and shuts it down with the app; direct callers get it on first use.
+    """
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARALLEL_PARSE_WORKERS,
+                                          mp_context=multiprocessing.get_context("forkserver"))
+    return _parse_pool
+
+
+# Text uploads at least this many bytes long are parsed incrementally
+INCREMENTAL_PARSE_THRESHOLD = int(os.environ.get("INCREMENTAL_PARSE_THRESHOLD", 1024 * 1024))
+# Source text, in characters, whose parsed blocks are kept for reuse
+INCREMENTAL_CACHE_CHARS = int(os.environ.get("INCREMENTAL_CACHE_CHARS", 64 * 1024 * 1024))
+# On average one in this many candidate lines ends an incremental block
+INCREMENTAL_ANCHOR_EVERY = 64
+
+
+def _is_anchor(line: str) -> bool:
+    return zlib.crc32(line.encode()) % INCREMENTAL_ANCHOR_EVERY == 0
+
+
+def _split_anchored_blocks(content: str) -> List[str]:
+    """Split a text export into independently parsable blocks at content-defined points.
+
+    Cut points are the same kind of safe boundaries _split_txt_blocks uses,
+    but chosen by a checksum of the line there rather than by position, so
+    an edit only moves the boundaries next to it.
+    """
+    return list(_iter_anchored_blocks(_iter_text_lines([content]))) or [content]
+
+
+def _iter_text_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """Lines of text arriving in pieces, each with its newline"""
+    partial = ''
+    for piece in pieces:
+        lines = (partial + piece).split('\n')
+        partial = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if partial:
+        yield partial
+
+
+def _decode_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[str]:
+    """Text decoded from byte chunks, one piece per chunk"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', True)
+
+
+def _iter_anchored_blocks(lines: Iterable[str]) -> Iterator[str]:
+    """The blocks _split_anchored_blocks cuts, from lines as they arrive.
+
+    Before the first device header a block ends after any anchor line; the
+    first header starts a block, and after it only headers that are anchors do.
+    """
+    block = []
+    seen_header = False
+    for line in lines:
+        candidate = _DEVICE_HEADER_CANDIDATE.match(line)
+        if candidate is not None:
+            header = candidate.group("line").strip()
+            if _is_device_header(header):
+                if block and (not seen_header or _is_anchor(header)):
+                    yield ''.join(block)
+                    block = []
+                seen_header = True
+        block.append(line)
+        if not seen_header and line.endswith('\n') and _is_anchor(line[:-1]):
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def _block_key(block: str) -> bytes:
+    return hashlib.blake2b(block.encode(), digest_size=16).digest()
+
+
+class TxtBlockCache:
+    """Parsed text blocks keyed by a hash of their content.
+
+    Bounded by the total length of the blocks' source text; the least
+    recently used blocks are dropped first.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._chars = 0
+        # Uploads are parsed on several threads at once
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: bytes, size: int, result):
+        with self._lock:
+            if key in self._entries or size > self.max_chars:
+                return
+            self._entries[key] = (size, result)
+            self._chars += size
+            while self._chars > self.max_chars:
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self._chars -= evicted_size
+
+
+# Block results shared by all uploads
+_txt_block_cache = TxtBlockCache(INCREMENTAL_CACHE_CHARS)
+
+
+# Response-shaped dict, or the Topology itself for NetworkParser(compact=True)
+ParseResult = Union[Dict[str, Any], Topology]
+
+
 class NetworkParser:
-    def __init__(self):
-        self.devices = []
-        self.links = []
+    def __init__(self, compact: bool = False):
+        # With compact=True the parse methods return the Topology itself and
+        # leave expanding it into response dicts to the caller
+        self.compact = compact
+        self.topology = Topology()
+        self._current_device = None
+        self._handlers = None
+        self._fallback_ips = None
+        self._ip_fills = None
+        self._partial_line = ''
+        self._fast_lines = None
+        # Text format picked by the sniffer, None when mixed or unknown
+        self.detected_format = None
+        # Blocks taken from the cache by the last incremental parse
+        self.reused_blocks = 0
     
-    def parse_txt_file(self, content: str) -> Dict[str, Any]:
+    def parse_txt_file(self, content: str) -> ParseResult:
         """Parse text file content from any network topology format"""
-        self.devices = []
-        self.links = []
-        
-        lines = content.split('\n')
-        current_device = None
-        
-        # Comprehensive patterns for multiple formats
-        # Format 1: Structured format (Device ID: xxx)
-        device_id_pattern = re.compile(r'Device\s*(?:ID|Name):\s*(.+)', re.IGNORECASE)
-        device_type_pattern = re.compile(r'(?:Device\s*)?Type:\s*(.+)', re.IGNORECASE)
-        ip_address_pattern = re.compile(r'IP\s*(?:Address)?:\s*(\d+\.\d+\.\d+\.\d+)', re.IGNORECASE)
-        connected_to_pattern = re.compile(r'Connected\s*(?:To|Device):\s*(.+)', re.IGNORECASE)
-        
-        # Format 6: Enterprise format (Router: R1, Switch: S1, PC: PC-Sales1)
-        enterprise_device_pattern = re.compile(r'^(Router|Switch|PC|Server|Hub|Bridge|Host|Firewall|AP):\s*(.+)', re.IGNORECASE)
-        connection_arrow_pattern = re.compile(r'([A-Za-z0-9\-_]+).*?<->.*?([A-Za-z0-9\-_]+)', re.IGNORECASE)
-        
-        # Format 2: Simple device declarations
-        simple_device_pattern = re.compile(r'^(Router|Switch|PC|Server|Hub|Bridge|Host|Node|Device)\s*([A-Za-z0-9\-_]+)\s*(\d+\.\d+\.\d+\.\d+)?', re.IGNORECASE)
-        
-        # Format 3: Network notation (Router1 - Switch1)
-        connection_dash_pattern = re.compile(r'^([A-Za-z0-9\-_]+)\s*[\-\–\—]\s*([A-Za-z0-9\-_\.]+)', re.IGNORECASE)
-        
-        # Format 4: Connection with "connects to" or similar
-        connection_word_pattern = re.compile(r'^([A-Za-z0-9\-_]+)\s+(?:connects?\s+to|connected\s+to|links?\s+to|attached\s+to)\s+([A-Za-z0-9\-_]+)', re.IGNORECASE)
-        
-        # Format 5: Tabular format (device_name | type | ip)
-        tabular_pattern = re.compile(r'^([A-Za-z0-9\-_]+)\s*[\|\t]\s*([A-Za-z]+)\s*[\|\t]?\s*(\d+\.\d+\.\d+\.\d+)?', re.IGNORECASE)
-        
-        # General patterns
-        ip_pattern = re.compile(r'(\d+\.\d+\.\d+\.\d+)')
-        device_name_pattern = re.compile(r'([A-Za-z][A-Za-z0-9\-_]*[0-9]+|[A-Za-z]+)', re.IGNORECASE)
-        interface_pattern = re.compile(r'(FastEthernet|GigabitEthernet|Serial|Ethernet|Fa|Gi|Se|Et)\s*(\d+/\d+|\d+)', re.IGNORECASE)
+        if PARALLEL_PARSE_WORKERS > 1 and len(content) >= PARALLEL_PARSE_THRESHOLD:
+            return self.parse_txt_parallel(content)
+
+        self._begin_txt()
+        self._use_format(_sniff_txt_format(content[:SNIFF_CHARS]))
+        self._feed_txt_lines(content.split('\n'))
+        return self._finish_txt(content)
+
+    def parse_txt_parallel(self, content: str, block_size: Optional[int] = None) -> ParseResult:
+        """Parse a large text export in device-aligned blocks across worker processes.
+
+        The result is the same as parsing the content in one go.
+        """
+        if block_size is None:
+            block_size = max(len(content) // (PARALLEL_PARSE_WORKERS * 4) + 1, PARALLEL_MIN_BLOCK_SIZE)
+        blocks = _split_txt_blocks(content, block_size)
+        # Blocks are parsed with the format sniffed from the start of the file
+        format_name = _sniff_txt_format(content[:SNIFF_CHARS])
+
+        if len(blocks) == 1:
+            results = [_parse_txt_block(blocks[0], format_name)]
+        else:
+            results = _get_parse_pool().map(_parse_txt_block, blocks, repeat(format_name))
+        return self._merge_txt_blocks(format_name, results)
+
+    def parse_txt_incremental(self, content: str, block_cache: "TxtBlockCache") -> ParseResult:
+        """Parse a text export, reusing block results from earlier parses.
+
+        The content is split into device blocks at content-defined points, so
+        editing a few devices only changes the blocks around them. Blocks
+        found in block_cache are not parsed again; the number of reused
+        blocks is left in ``reused_blocks``.
+        """
+        blocks = _split_anchored_blocks(content)
+        keys = [_block_key(block) for block in blocks]
+        results = [block_cache.get(key) for key in keys]
+        changed = [i for i, result in enumerate(results) if result is None]
+        self.reused_blocks = len(blocks) - len(changed)
+
+        changed_blocks = [blocks[i] for i in changed]
+        format_name = _sniff_txt_format(content[:SNIFF_CHARS])
+        if (PARALLEL_PARSE_WORKERS > 1 and len(changed) > 1
+                and sum(map(len, changed_blocks)) >= PARALLEL_PARSE_THRESHOLD):
+            chunksize = max(len(changed) // (PARALLEL_PARSE_WORKERS * 4), 1)
+            parsed = _get_parse_pool().map(_parse_txt_block, changed_blocks, repeat(format_name), chunksize=chunksize)
+        else:
+            parsed = map(_parse_txt_block, changed_blocks, repeat(format_name))
+        for i, result in zip(changed, parsed):
+            results[i] = result
+            block_cache.put(keys[i], len(blocks[i]), result)
+
+        return self._merge_txt_blocks(format_name, results)
+
+    def parse_txt_stream_incremental(self, chunks: Iterable[bytes], encoding: str = 'utf-8',
+                                     block_cache: Optional["TxtBlockCache"] = None, size: int = 0) -> ParseResult:
+        """Like parse_txt_incremental, for a text export delivered as byte chunks.
+
+        Blocks are cut from the decoded text as it arrives and looked up or
+        parsed one at a time, so only the current block's text is held, plus
+        the text of blocks waiting for a worker when an upload of size bytes
+        or more is parsed in parallel. The results of every block are kept
+        until they are merged, as in the whole-content parse.
+        """
+        if block_cache is None:
+            block_cache = _txt_block_cache
+        pieces = _decode_chunks(chunks, encoding)
+        # The format is sniffed from the start of the text, before any block is parsed
+        head = ''
+        for piece in pieces:
+            head += piece
+            if len(head) >= SNIFF_CHARS:
+                break
+        format_name = _sniff_txt_format(head[:SNIFF_CHARS])
+
+        pool = _get_parse_pool() if PARALLEL_PARSE_WORKERS > 1 and size >= PARALLEL_PARSE_THRESHOLD else None
+        results = []
+        # (index, key, size, future) of blocks handed to the pool, oldest first
+        pending = deque()
+
+        def collect(index, key, block_size, future):
+            results[index] = future.result()
+            block_cache.put(key, block_size, results[index])
+
+        self.reused_blocks = 0
+        for block in _iter_anchored_blocks(_iter_text_lines(chain([head], pieces))):
+            key = _block_key(block)
+            result = block_cache.get(key)
+            if result is not None:
+                self.reused_blocks += 1
+            elif pool is None:
+                result = _parse_txt_block(block, format_name)
+                block_cache.put(key, len(block), result)
+            else:
+                pending.append((len(results), key, len(block), pool.submit(_parse_txt_block, block, format_name)))
+                if len(pending) > PARALLEL_PARSE_WORKERS * 2:
+                    collect(*pending.popleft())
+            results.append(result)
+        while pending:
+            collect(*pending.popleft())
+
+        if not results:
+            results.append(_parse_txt_block('', format_name))
+        return self._merge_txt_blocks(format_name, results)
+
+    def _merge_txt_blocks(self, format_name: Optional[str], results) -> ParseResult:
+        """Combine block results, in file order, into what a whole-file parse returns"""
+        self._begin_txt()
+        self._use_format(format_name)
+        self._handlers = None
+        topology = self.topology
+        fallback_ips = []
+        for block, ip_fills, block_ips in results:
+            # Devices seen in earlier blocks keep their first definition; later
+            # blocks can only give them an IP they don't have yet
+            known = [name for name in ip_fills if topology.has_device(name)]
+            topology.merge(block)
+            for name in known:
+                topology.fill_device_ip(name, ip_fills[name])
+            fallback_ips.extend(block_ips)
+
+        self._fallback_ips = fallback_ips
+        return self._finish_txt()
+
+    def _parse_block(self, block: str, format_name: Optional[str]):
+        """Parse one block of a parallel or incremental parse.
+
+        Returns the block's topology, the first IP each device was linked
+        with (for devices an earlier block already defined) and, when the
+        block has no devices, its IPs for the fallback.
+        """
+        self._begin_txt()
+        self._ip_fills = {}
+        self._use_format(format_name)
+        self._feed_txt_lines(block.split('\n'))
+        self._close_device()
+        self.topology.release_link_index()
+        block_ips = [] if self.topology.device_count else _IP_PATTERN.findall(block)
+        return self.topology, self._ip_fills, block_ips
+
+    def parse_txt_stream(self, chunks: Iterable[bytes], encoding: str = 'utf-8') -> ParseResult:
+        """Parse a text export delivered as byte chunks, decoding incrementally"""
+        decoder = self._begin_txt_stream(encoding)
+        for chunk in chunks:
+            self._feed_txt_chunk(decoder, chunk)
+        return self._finish_txt_stream(decoder)
+    
+    async def parse_txt_stream_async(self, chunks: AsyncIterable[bytes], encoding: str = 'utf-8') -> ParseResult:
+        """Parse a text export from an async source of byte chunks as they arrive"""
+        decoder = self._begin_txt_stream(encoding)
+        async for chunk in chunks:
+            self._feed_txt_chunk(decoder, chunk)
+        return self._finish_txt_stream(decoder)
+    
+    def _begin_txt(self):
+        """Reset parser state before a text parse"""
+        self.topology = Topology()
+        self._current_device = None
+        self._handlers = self._line_handlers()
+        # Whole-content parses re-scan the content for the IP fallback instead
+        self._fallback_ips = None
+        # Only recorded for the blocks of a parallel parse
+        self._ip_fills = None
+        self._fast_lines = None
+        self.detected_format = None
+    
+    def _use_format(self, format_name: Optional[str]):
+        """Route lines through the fast shapes of a sniffed format first"""
+        self.detected_format = format_name
+        self._fast_lines = _FORMAT_FAST_LINES.get(format_name)
+    
+    def _begin_txt_stream(self, encoding: str):
+        """Reset parser state and return an incremental decoder for a streamed parse"""
+        self._begin_txt()
+        self._partial_line = ''
+        self._fallback_ips = []
+        self._sniffed = False
+        return codecs.getincrementaldecoder(encoding)()
+    
+    def _feed_txt_chunk(self, decoder, chunk: bytes, final: bool = False):
+        """Decode a chunk and parse every complete line; a trailing partial line waits for the next chunk"""
+        text = self._partial_line + decoder.decode(chunk, final)
+        if not self._sniffed:
+            # Hold text back until there is enough to guess the format from
+            if len(text) < SNIFF_CHARS and not final:
+                self._partial_line = text
+                return
+            self._use_format(_sniff_txt_format(text[:SNIFF_CHARS]))
+            self._sniffed = True
         
+        lines = text.split('\n')
+        self._partial_line = '' if final else lines.pop()
+        self._feed_txt_lines(lines)
+    
+    def _finish_txt_stream(self, decoder) -> ParseResult:
+        self._feed_txt_chunk(decoder, b'', final=True)
+        return self._finish_txt()
+    
+    def _feed_txt_lines(self, lines: Iterable[str]):
+        """Classify and handle each line, carrying the open device block across calls"""
+        handlers = self._handlers
+        fast_lines = self._fast_lines
         for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#') or line.startswith('//') or line.startswith(';'):
-                continue
-            
-            # Skip sections that are not device definitions
-            if any(skip_word in line.lower() for skip_word in [
-                'routing table', 'mac address table', 'interfaces:', 'spanning tree', 'ospf enabled',
-                '[routing table', '[protocols]', '[simulation summary]', 'ping test:', 'packet loss:'
-            ]):
-                continue
-            
-            # Skip section headers but continue processing
-            if line.startswith('[') and line.endswith(']'):
-                section = line.lower()
-                if 'connections' in section:
-                    # We're entering the connections section
-                    pass
-                continue
-            
-            # Try different parsing approaches in order of specificity
-            
-            # 1. Enterprise format (Router: R1, Switch: S1, PC: PC-Sales1) - HIGHEST PRIORITY
-            enterprise_device_match = enterprise_device_pattern.match(line)
-            if enterprise_device_match:
-                # Save previous device if it exists
-                if current_device and current_device["name"]:
-                    self.devices.append(current_device.copy())
-                
-                device_type = enterprise_device_match.group(1).strip()
-                device_name = enterprise_device_match.group(2).strip()
-                
-                current_device = {
-                    "name": device_name,
-                    "type": self._normalize_device_type(device_type),
-                    "ip": ""
-                }
-                continue
-            
-            # 2. Structured format (Device ID: xxx)
-            device_id_match = device_id_pattern.match(line)
-            if device_id_match:
-                # Save previous device if it exists
-                if current_device and current_device["name"]:
-                    self.devices.append(current_device.copy())
-                
-                current_device = {
-                    "name": device_id_match.group(1).strip(),
-                    "type": "Unknown",
-                    "ip": ""
-                }
-                continue
-            
-            # Handle structured format attributes
-            if current_device:
-                device_type_match = device_type_pattern.match(line)
-                if device_type_match:
-                    device_type = device_type_match.group(1).strip()
-                    current_device["type"] = self._normalize_device_type(device_type)
-                    continue
-                
-                # Look for IP addresses in various formats
-                ip_match = ip_address_pattern.match(line)
-                if ip_match:
-                    current_device["ip"] = ip_match.group(1)
-                    continue
-                
-                # Look for IP in "IP: x.x.x.x/xx" format
-                ip_cidr_match = re.search(r'IP:\s*(\d+\.\d+\.\d+\.\d+)', line, re.IGNORECASE)
-                if ip_cidr_match:
-                    current_device["ip"] = ip_cidr_match.group(1)
-                    continue
-                
-                # Look for IP addresses anywhere in the line when in device context
-                ip_anywhere = re.search(r'(\d+\.\d+\.\d+\.\d+)', line)
-                if ip_anywhere and not current_device["ip"]:
-                    # Make sure it's not a network address or subnet mask
-                    potential_ip = ip_anywhere.group(1)
-                    # Skip common network addresses and invalid IPs
-                    if not (potential_ip.endswith('.0') or potential_ip.endswith('.255') or 
-                           potential_ip.startswith('255.') or potential_ip == '0.0.0.0'):
-                        current_device["ip"] = potential_ip
-                        continue
-                
-                connected_match = connected_to_pattern.match(line)
-                if connected_match:
-                    connection_info = connected_match.group(1).strip()
-                    target_device = connection_info.split(" - ")[0].strip() if " - " in connection_info else connection_info.split()[0]
-                    self.links.append({
-                        "from": current_device["name"],
-                        "to": target_device
-                    })
-                    continue
-                
-                # If we're in a device section, skip other parsing for most lines
-                # except for connection lines
-                if not any(conn_word in line.lower() for conn_word in ['<->', 'connects', 'connected', 'link']):
-                    continue
-            
-            # Connection patterns with arrows (R1 GigabitEthernet0/0 <-> S1 FastEthernet0/1)
-            connection_arrow_match = connection_arrow_pattern.search(line)
-            if connection_arrow_match:
-                device1 = connection_arrow_match.group(1).strip()
-                device2 = connection_arrow_match.group(2).strip()
-                
-                if len(device1) <= 20 and len(device2) <= 20:
-                    self._ensure_device_exists(device1)
-                    self._ensure_device_exists(device2)
-                    self.links.append({"from": device1, "to": device2})
-                continue
-            
-            # 3. Tabular format (device | type | ip) - check before simple patterns
-            tabular_match = tabular_pattern.match(line)
-            if tabular_match and '|' in line:  # Ensure it's actually tabular
-                device_name = tabular_match.group(1).strip()
-                device_type = tabular_match.group(2).strip()
-                device_ip = tabular_match.group(3) if tabular_match.group(3) else ""
-                
-                # Skip header row
-                if device_name.lower() != 'device' and device_type.lower() != 'type':
-                    self.devices.append({
-                        "name": device_name,
-                        "type": self._normalize_device_type(device_type),
-                        "ip": device_ip
-                    })
-                continue
+            if self._fallback_ips is not None:
+                # IPs are only needed if the whole stream turns out to have no devices
+                if self.topology.device_count or self._current_device:
+                    self._fallback_ips = None
+                else:
+                    self._fallback_ips.extend(_IP_PATTERN.findall(line))
             
-            # 4. Simple device declarations (Router1, Switch0, etc.) - but be more specific
-            simple_device_match = simple_device_pattern.match(line)
-            if simple_device_match and len(line.split()) <= 3:  # Avoid matching long lines
-                device_type = simple_device_match.group(1)
-                device_name = f"{device_type}{simple_device_match.group(2)}"
-                device_ip = simple_device_match.group(3) if simple_device_match.group(3) else ""
-                
-                self.devices.append({
-                    "name": device_name,
-                    "type": self._normalize_device_type(device_type),
-                    "ip": device_ip
-                })
+            line = line.strip()
+            if not line:
                 continue
             
-            # 5. Connection patterns (Router1 - Switch1) - only if line is short and simple
-            if len(line.split()) <= 5:  # Only for simple connection lines
-                connection_dash_match = connection_dash_pattern.match(line)
-                if connection_dash_match:
-                    device1 = connection_dash_match.group(1).strip()
-                    device2 = connection_dash_match.group(2).strip()
-                    
-                    # Check if device2 is an IP address
-                    if re.match(r'^\d+\.\d+\.\d+\.\d+$', device2):
-                        # This is device - IP format, add device with IP
-                        self._ensure_device_exists_with_ip(device1, device2)
-                    else:
-                        # This is device - device connection
-                        if len(device1) <= 20 and len(device2) <= 20 and not any(c in device1 + device2 for c in '.,;:()[]{}'):
-                            self._ensure_device_exists(device1)
-                            self._ensure_device_exists(device2)
-                            self.links.append({"from": device1, "to": device2})
+            if fast_lines is not None:
+                fast = fast_lines[1] if self._current_device else fast_lines[0]
+                match = fast.match(line) if fast is not None else None
+                if match is not None:
+                    handlers[match.lastgroup](match)
                     continue
             
-            # 6. Connection word patterns (Router1 connects to Switch1)
-            connection_word_match = connection_word_pattern.match(line)
-            if connection_word_match:
-                device1 = connection_word_match.group(1).strip()
-                device2 = connection_word_match.group(2).strip()
-                
-                if len(device1) <= 20 and len(device2) <= 20:
-                    self._ensure_device_exists(device1)
-                    self._ensure_device_exists(device2)
-                    self.links.append({"from": device1, "to": device2})
-                continue
+            classifier = _DEVICE_BLOCK_LINES if self._current_device else _TOP_LEVEL_LINES
+            match = classifier.match(line)
+            while match is not None and not handlers[match.lastgroup](match):
+                match = classifier.resume(line, match.lastgroup)
+    
+    def _finish_txt(self, content: Optional[str] = None) -> ParseResult:
+        """Close the last device block and apply the IP fallback"""
+        self._handlers = None
         
         # Add the last device if it exists
-        if current_device and current_device["name"]:
-            self.devices.append(current_device.copy())
+        self._close_device()
         
         # If no devices found, try to extract from IP addresses (fallback)
-        if not self.devices:
-            ips = ip_pattern.findall(content)
+        if not self.topology.device_count:
+            ips = _IP_PATTERN.findall(content) if content is not None else self._fallback_ips
             for i, ip in enumerate(set(ips)):
                 device_type = "PC" if ip.endswith(('.10', '.11', '.12', '.20', '.21', '.22')) else "Router"
-                self.devices.append({
-                    "name": f"{device_type}{i}",
-                    "type": device_type,
-                    "ip": ip
-                })
+                self.topology.add_device(f"{device_type}{i}", device_type, ip)
         
-        # If no devices found, try to extract from IP addresses (fallback)
-        if not self.devices:
-            ips = ip_pattern.findall(content)
-            for i, ip in enumerate(set(ips)):
-                device_type = "PC" if ip.endswith(('.10', '.11', '.12', '.20', '.21', '.22')) else "Router"
-                self.devices.append({
-                    "name": f"{device_type}{i}",
-                    "type": device_type,
-                    "ip": ip
-                })
+        self.topology.release_link_index()
+        return self._result()
+    
+    def _result(self) -> ParseResult:
+        return self.topology if self.compact else self.topology.to_dict()
+    
+    def _line_handlers(self) -> Dict[str, Any]:
+        """Map each line rule to its handler; a handler returns False to decline the line"""
+        skip = lambda match: True
+        return {
+            "comment": skip,
+            "skip_section": skip,
+            "section_header": skip,
+            "device_body": skip,
+            "enterprise_device": self._on_enterprise_device,
+            "device_id": self._on_device_id,
+            "device_type": self._on_device_type,
+            "ip_address": self._on_ip_address,
+            "ip_cidr": self._on_ip_cidr,
+            "ip_anywhere": self._on_ip_anywhere,
+            "connected_to": self._on_connected_to,
+            "connection_arrow": self._on_connection_arrow,
+            "tabular": self._on_tabular,
+            "simple_device": self._on_simple_device,
+            "connection_dash": self._on_connection_dash,
+            "connection_word": self._on_connection_word,
+        }
+    
+    def _close_device(self):
+        """Add the device whose block is open, if any"""
+        device = self._current_device
+        if device and device["name"]:
+            self.topology.add_device(device["name"], device["type"], device["ip"])
+    
+    def _start_device(self, name: str, device_type: str):
+        """Close the current device block and open a new one"""
+        self._close_device()
+        self._current_device = {"name": name, "type": device_type, "ip": ""}
+    
+    def _on_enterprise_device(self, match) -> bool:
+        device_type = match.group("enterprise_type").strip()
+        self._start_device(match.group("enterprise_name").strip(), self._normalize_device_type(device_type))
+        return True
+    
+    def _on_device_id(self, match) -> bool:
+        self._start_device(match.group("device_id_name").strip(), "Unknown")
+        return True
+    
+    def _on_device_type(self, match) -> bool:
+        self._current_device["type"] = self._normalize_device_type(match.group("device_type_value").strip())
+        return True
+    
+    def _on_ip_address(self, match) -> bool:
+        self._current_device["ip"] = match.group("ip_address_value")
+        return True
+    
+    def _on_ip_cidr(self, match) -> bool:
+        # IP in "IP: x.x.x.x/xx" format
+        self._current_device["ip"] = match.group("ip_cidr_value")
+        return True
+    
+    def _on_ip_anywhere(self, match) -> bool:
+        # Take the first IP in the line unless the device already has one or
+        # it looks like a network address or subnet mask
+        potential_ip = match.group("ip_anywhere_value")
+        if self._current_device["ip"] or (
+            potential_ip.endswith('.0') or potential_ip.endswith('.255') or
+            potential_ip.startswith('255.') or potential_ip == '0.0.0.0'
+        ):
+            return False
+        self._current_device["ip"] = potential_ip
+        return True
+    
+    def _on_connected_to(self, match) -> bool:
+        connection_info = match.group("connected_to_value").strip()
+        target_device = connection_info.split(" - ")[0].strip() if " - " in connection_info else connection_info.split()[0]
+        self.topology.add_link(self._current_device["name"], target_device)
+        return True
+    
+    def _on_connection_arrow(self, match) -> bool:
+        device1 = match.group("arrow_from").strip()
+        device2 = match.group("arrow_to").strip()
         
-        # Remove duplicate devices
-        unique_devices = []
-        seen_names = set()
-        for device in self.devices:
-            if device["name"] not in seen_names:
-                unique_devices.append(device)
-                seen_names.add(device["name"])
-        self.devices = unique_devices
+        if len(device1) <= 20 and len(device2) <= 20:
+            self._ensure_device_exists(device1)
+            self._ensure_device_exists(device2)
+            self.topology.add_link(device1, device2)
+        return True
+    
+    def _on_tabular(self, match) -> bool:
+        device_name = match.group("tabular_name").strip()
+        device_type = match.group("tabular_type").strip()
+        device_ip = match.group("tabular_ip") or ""
         
-        # Remove duplicate links
-        unique_links = []
-        seen_links = set()
-        for link in self.links:
-            link_key = (link["from"], link["to"])
-            reverse_key = (link["to"], link["from"])
-            if link_key not in seen_links and reverse_key not in seen_links:
-                unique_links.append(link)
-                seen_links.add(link_key)
-        self.links = unique_links
+        # Skip header row
+        if device_name.lower() != 'device' and device_type.lower() != 'type':
+            self.topology.add_device(device_name, self._normalize_device_type(device_type), device_ip)
+        return True
+    
+    def _on_simple_device(self, match) -> bool:
+        device_type = match.group("simple_type")
+        self.topology.add_device(
+            f"{device_type}{match.group('simple_name')}",
+            self._normalize_device_type(device_type),
+            match.group("simple_ip") or ""
+        )
+        return True
+    
+    def _on_connection_dash(self, match) -> bool:
+        device1 = match.group("dash_from").strip()
+        device2 = match.group("dash_to").strip()
+        
+        # Check if device2 is an IP address
+        if _IP_ONLY_PATTERN.match(device2):
+            # This is device - IP format, add device with IP
+            self._ensure_device_exists_with_ip(device1, device2)
+        # This is device - device connection
+        elif len(device1) <= 20 and len(device2) <= 20 and not any(c in device1 + device2 for c in '.,;:()[]{}'):
+            self._ensure_device_exists(device1)
+            self._ensure_device_exists(device2)
+            self.topology.add_link(device1, device2)
+        return True
+    
+    def _on_connection_word(self, match) -> bool:
+        device1 = match.group("word_from").strip()
+        device2 = match.group("word_to").strip()
         
-        return {"devices": self.devices, "links": self.links}
+        if len(device1) <= 20 and len(device2) <= 20:
+            self._ensure_device_exists(device1)
+            self._ensure_device_exists(device2)
+            self.topology.add_link(device1, device2)
+        return True
     
     def _normalize_device_type(self, device_type: str) -> str:
         """Normalize device type names to standard types"""
@@ -305,138 +808,749 @@ class NetworkParser:
             return device_type.title()
     
     def _ensure_device_exists(self, device_name: str):
-        """Ensure a device exists in the devices list, add if not present"""
-        for device in self.devices:
-            if device["name"] == device_name:
-                return
-        
-        # Try to guess device type from name
-        device_type = "Unknown"
-        name_lower = device_name.lower()
-        if 'router' in name_lower or name_lower.startswith('r'):
-            device_type = "Router"
-        elif 'switch' in name_lower or name_lower.startswith('sw'):
-            device_type = "Switch"
-        elif 'pc' in name_lower or name_lower.startswith('pc') or 'host' in name_lower:
-            device_type = "PC"
-        elif 'server' in name_lower:
-            device_type = "Server"
-        
-        self.devices.append({
-            "name": device_name,
-            "type": device_type,
-            "ip": ""
-        })
+        """Ensure a device exists in the topology, add if not present"""
+        if not self.topology.has_device(device_name):
+            self.topology.add_device(device_name, self._guess_type_from_name(device_name), "")
     
     def _ensure_device_exists_with_ip(self, device_name: str, ip_address: str):
         """Ensure a device exists and update its IP if needed"""
-        for device in self.devices:
-            if device["name"] == device_name:
-                if not device["ip"]:
-                    device["ip"] = ip_address
-                return
-        
-        # Create new device with IP
-        device_type = "Unknown"
+        if self._ip_fills is not None:
+            self._ip_fills.setdefault(device_name, ip_address)
+        if not self.topology.fill_device_ip(device_name, ip_address):
+            # Create new device with IP
+            self.topology.add_device(device_name, self._guess_type_from_name(device_name), ip_address)
+    
+    def _guess_type_from_name(self, device_name: str) -> str:
+        """Try to guess device type from name"""
         name_lower = device_name.lower()
         if 'router' in name_lower or name_lower.startswith('r'):
-            device_type = "Router"
+            return "Router"
         elif 'switch' in name_lower or name_lower.startswith('sw'):
-            device_type = "Switch"
+            return "Switch"
         elif 'pc' in name_lower or name_lower.startswith('pc') or 'host' in name_lower:
-            device_type = "PC"
+            return "PC"
         elif 'server' in name_lower:
-            device_type = "Server"
-        
-        self.devices.append({
-            "name": device_name,
-            "type": device_type,
-            "ip": ip_address
-        })
+            return "Server"
+        return "Unknown"
     
-    def parse_xml_file(self, content: str) -> Dict[str, Any]:
+    def parse_xml_file(self, content: str) -> ParseResult:
         """Parse XML file content from Cisco Packet Tracer"""
-        self.devices = []
-        self.links = []
-        
+        self._begin_xml()
+        for start in range(0, len(content), XML_FEED_SIZE):
+            self._feed_xml(content[start:start + XML_FEED_SIZE])
+        return self._finish_xml(content)
+    
+    def parse_xml_stream(self, chunks: Iterable[bytes], encoding: str = 'utf-8',
+                         reread: Optional[Callable[[], Iterable[bytes]]] = None) -> ParseResult:
+        """Parse an XML export delivered as byte chunks without building the whole tree.
+
+        A document that isn't well-formed falls back to the IPs in its text,
+        read in a second pass from reread(), or from chunks again when it
+        can be iterated twice.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        self._begin_xml()
+        for chunk in chunks:
+            self._feed_xml(decoder.decode(chunk))
+        self._feed_xml(decoder.decode(b'', True))
+        if reread is None and iter(chunks) is not chunks:
+            reread = lambda: chunks
+        return self._finish_xml(reread=reread, encoding=encoding)
+    
+    def _begin_xml(self):
+        """Reset parser state before an XML parse.
+
+        Device and link elements are handled when they close, in one pass;
+        everything outside them is dropped from the tree as soon as it closes,
+        so memory use doesn't grow with the size of the document.
+        """
+        self.topology = Topology()
+        self.detected_format = "xml"
+        self._xml = xml_backend.backend
+        self._xml_parser = self._xml.pull_parser()
+        self._xml_failed = False
+        self._xml_open = []
+        # (element, rows, index) of the device and link elements still open
+        self._xml_pending = []
+        # Rows per tag in document order, None for elements without a device
+        # or link. Whole-tree parsing used the first tag present, so rows of
+        # the preferred tags are moved to the topology and the others wait.
+        self._xml_rows = {tag: [] for tag in _XML_ROW_READERS}
+        self._xml_tags_seen = set()
+        # (tag, name, ip) of elements the no-devices fallback would turn into devices
+        self._xml_fallback = []
+    
+    def _feed_xml(self, text: str):
+        if self._xml_failed:
+            return
         try:
-            root = ET.fromstring(content)
-            
-            # Parse devices
-            for device in root.findall('.//device') or root.findall('.//Device'):
-                name = device.get('name') or device.get('Name') or device.find('name') or device.find('Name')
-                device_type = device.get('type') or device.get('Type') or device.find('type') or device.find('Type')
-                
-                if isinstance(name, ET.Element):
-                    name = name.text
-                if isinstance(device_type, ET.Element):
-                    device_type = device_type.text
-                
-                # Find IP address
-                ip = ""
-                ip_elem = device.find('.//ip') or device.find('.//IP') or device.find('.//ipAddress')
-                if ip_elem is not None:
-                    ip = ip_elem.text or ip_elem.get('address', '')
-                
-                if name and device_type:
-                    self.devices.append({
-                        "name": name,
-                        "type": device_type,
-                        "ip": ip or ""
-                    })
-            
-            # Parse links/connections
-            for link in root.findall('.//link') or root.findall('.//Link') or root.findall('.//connection'):
-                source = link.get('source') or link.get('Source') or link.get('from')
-                target = link.get('target') or link.get('Target') or link.get('to')
-                
-                if not source:
-                    source_elem = link.find('source') or link.find('Source') or link.find('from')
-                    if source_elem is not None:
-                        source = source_elem.text
-                
-                if not target:
-                    target_elem = link.find('target') or link.find('Target') or link.find('to')
-                    if target_elem is not None:
-                        target = target_elem.text
-                
-                if source and target:
-                    self.links.append({"from": source, "to": target})
-            
-            # If no specific structure found, try to extract any network-related info
-            if not self.devices:
-                # Look for any elements that might contain device info
-                for elem in root.iter():
-                    if elem.tag.lower() in ['router', 'switch', 'pc', 'server', 'host']:
-                        name = elem.get('name') or elem.get('id') or f"{elem.tag}_{len(self.devices)}"
-                        ip = elem.get('ip') or elem.get('address') or ""
-                        self.devices.append({
-                            "name": name,
-                            "type": elem.tag.title(),
-                            "ip": ip
-                        })
+            self._xml_parser.feed(text)
+            self._handle_xml_events()
+        except self._xml.ParseError:
+            self._xml_failed = True
+    
+    def _handle_xml_events(self):
+        open_elements = self._xml_open
+        pending = self._xml_pending
+        all_rows = self._xml_rows
+        for event, elem in self._xml_parser.read_events():
+            if event == 'start':
+                tag = elem.tag
+                if tag.lower() in _XML_FALLBACK_TAGS:
+                    self._xml_fallback.append(
+                        (tag, elem.get('name') or elem.get('id'), elem.get('ip') or elem.get('address') or ""))
+                # The root element itself is never a device or link
+                rows = all_rows.get(tag)
+                if rows is not None and open_elements:
+                    self._xml_tags_seen.add(tag)
+                    pending.append((elem, rows, len(rows)))
+                    rows.append(None)
+                open_elements.append(elem)
+                continue
             
-        except ET.ParseError as e:
+            open_elements.pop()
+            if pending and pending[-1][0] is elem:
+                _, rows, index = pending.pop()
+                rows[index] = _XML_ROW_READERS[elem.tag](self._xml, elem)
+                if not pending and len(rows) >= XML_FLUSH_ROWS:
+                    self._flush_xml_rows('device', 'link')
+            if not pending and open_elements:
+                # Nothing open needs this subtree any more
+                del open_elements[-1][:]
+    
+    def _flush_xml_rows(self, device_tag: Optional[str], link_tag: Optional[str]):
+        """Move finished rows of the tags whole-tree parsing would use into the topology"""
+        rows = self._xml_rows.get(device_tag)
+        if rows:
+            for row in rows:
+                if row is not None:
+                    self.topology.append_device(*row)
+            rows.clear()
+        rows = self._xml_rows.get(link_tag)
+        if rows:
+            for row in rows:
+                if row is not None:
+                    self.topology.append_link(*row)
+            rows.clear()
+    
+    def _finish_xml(self, content: Optional[str] = None,
+                    reread: Optional[Callable[[], Iterable[bytes]]] = None, encoding: str = 'utf-8') -> ParseResult:
+        if not self._xml_failed:
+            try:
+                self._xml_parser.close()
+                self._handle_xml_events()
+            except self._xml.ParseError:
+                self._xml_failed = True
+        self._xml_parser = None
+        
+        if self._xml_failed:
             # If XML parsing fails, try to extract some basic info
-            ip_pattern = re.compile(r'(\d+\.\d+\.\d+\.\d+)')
-            ips = ip_pattern.findall(content)
-            for i, ip in enumerate(set(ips)):
-                self.devices.append({
-                    "name": f"Device{i}",
-                    "type": "Unknown",
-                    "ip": ip
-                })
+            self.topology = Topology()
+            if content is not None:
+                ips = set(_IP_PATTERN.findall(content))
+            elif reread is not None:
+                ips = _scan_ips(reread(), encoding)
+            else:
+                ips = ()
+            for i, ip in enumerate(ips):
+                self.topology.append_device(f"Device{i}", "Unknown", ip)
+            return self._result()
+        
+        # Whole-tree parsing used the first device and link tags present
+        seen = self._xml_tags_seen
+        device_tag = next((tag for tag in _XML_DEVICE_TAGS if tag in seen), None)
+        link_tag = next((tag for tag in _XML_LINK_TAGS if tag in seen), None)
+        self._flush_xml_rows(device_tag, link_tag)
+        
+        # If no specific structure found, try to extract any network-related info
+        if not self.topology.device_count:
+            for tag, name, ip in self._xml_fallback:
+                self.topology.append_device(name or f"{tag}_{self.topology.device_count}", tag.title(), ip)
         
-        return {"devices": self.devices, "links": self.links}
+        return self._result()
+
+def _scan_ips(chunks: Iterable[bytes], encoding: str) -> set:
+    """The IPs in a byte stream, decoded and matched a line at a time"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    ips = set()
+    partial_line = ''
+    for chunk in chunks:
+        lines = (partial_line + decoder.decode(chunk)).split('\n')
+        partial_line = lines.pop()
+        for line in lines:
+            ips.update(_IP_PATTERN.findall(line))
+    ips.update(_IP_PATTERN.findall(partial_line + decoder.decode(b'', True)))
+    return ips
+
+# Device and link element tags, in the order whole-tree parsing looked for them
+_XML_DEVICE_TAGS = ('device', 'Device')
+_XML_LINK_TAGS = ('link', 'Link', 'connection')
+# Elements turned into devices when an XML export has no device elements
+_XML_FALLBACK_TAGS = {'router', 'switch', 'pc', 'server', 'host'}
+# Characters handed to the XML parser at a time
+XML_FEED_SIZE = 64 * 1024
+# Finished rows of the preferred tags are moved to the topology in batches of this size
+XML_FLUSH_ROWS = 1024
+
+
+def _first_found(xml, elem, paths):
+    """The first match for paths that has child elements, else the last path's match.
+
+    This is what a chain of finds joined with ``or`` picked, since an element
+    is truthy only when it has children; it is spelled out because lxml warns
+    about element truthiness and a leaf would otherwise depend on the backend.
+    """
+    found = None
+    for path in paths:
+        found = xml.find(elem, path)
+        if found is not None and len(found) > 0:
+            return found
+    return found
+
+
+def _xml_device_row(xml, device):
+    """(name, type, ip) of a closed device element, None if it has no name or type"""
+    name = device.get('name') or device.get('Name') or _first_found(xml, device, ('name', 'Name'))
+    device_type = device.get('type') or device.get('Type') or _first_found(xml, device, ('type', 'Type'))
+    
+    if xml.is_element(name):
+        name = name.text
+    if xml.is_element(device_type):
+        device_type = device_type.text
+    
+    # Find IP address
+    ip = ""
+    ip_elem = None
+    if len(device):
+        ip_elem = _first_found(xml, device, ('.//ip', './/IP', './/ipAddress'))
+    if ip_elem is not None:
+        ip = ip_elem.text or ip_elem.get('address', '')
+    
+    if name and device_type:
+        return name, device_type, ip or ""
+    return None
+
+
+def _xml_link_row(xml, link):
+    """(source, target) of a closed link element, None if either is missing"""
+    source = link.get('source') or link.get('Source') or link.get('from')
+    target = link.get('target') or link.get('Target') or link.get('to')
+    
+    if not source:
+        source_elem = _first_found(xml, link, ('source', 'Source', 'from'))
+        if source_elem is not None:
+            source = source_elem.text
+    
+    if not target:
+        target_elem = _first_found(xml, link, ('target', 'Target', 'to'))
+        if target_elem is not None:
+            target = target_elem.text
+    
+    if source and target:
+        return source, target
+    return None
+
+
+_XML_ROW_READERS = {
+    **{tag: _xml_device_row for tag in _XML_DEVICE_TAGS},
+    **{tag: _xml_link_row for tag in _XML_LINK_TAGS},
+}
+
+
+# Encodings tried in order for text uploads
+TEXT_ENCODINGS = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
+
+# Read size when streaming an upload into the parser
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# Where the endpoints run self-contained parsing work: "thread", or "process"
+# for the parallel parse pool. Work that needs the open upload, the shared
+# block cache or the PKT conversion workers always runs on a thread.
+BLOCKING_EXECUTOR = os.environ.get("BLOCKING_EXECUTOR", "thread")
+if BLOCKING_EXECUTOR not in ("thread", "process"):
+    raise ValueError(f"BLOCKING_EXECUTOR must be 'thread' or 'process', not {BLOCKING_EXECUTOR!r}")
+# Threads for blocking endpoint work; defaults to ThreadPoolExecutor's own choice
+BLOCKING_THREADS = int(os.environ.get("BLOCKING_THREADS", 0)) or None
+_blocking_threads = None
+
+# Devices or links per line of a streamed /upload response
+NDJSON_CHUNK_ROWS = 1000
+# The /upload response format depends on the Accept header
+_NEGOTIATED_HEADERS = {"Vary": "Accept"}
+# Files of one /upload/batch request processed at once
+BATCH_UPLOAD_CONCURRENCY = int(os.environ.get("BATCH_UPLOAD_CONCURRENCY", 4))
+
+# Background jobs (POST /jobs): jobs run at once, jobs waiting behind them
+# before new ones get 429, and seconds a finished job's result is kept
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 32))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 15 * 60))
+# Seconds a client turned away with 429 is asked to wait
+JOB_RETRY_AFTER = 5
+# A job's copy of its upload stays in memory up to this size
+JOB_SPOOL_BYTES = 1024 * 1024
+
+job_queue = JobQueue(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RESULT_TTL)
+
+# Reported by /metrics; PKT conversion strategies are measured in pkt_converter
+UPLOAD_STAGE_SECONDS = Histogram("upload_stage_seconds", "Time one stage of processing an upload took", ["stage"])
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes of uploaded files processed")
+UPLOAD_DEVICES = Counter("upload_devices_total", "Devices in the topologies uploads produced")
+UPLOAD_LINKS = Counter("upload_links_total", "Links in the topologies uploads produced")
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "How much later than asked the event loop last woke a sleeping task")
+# Seconds between event loop lag measurements
+EVENT_LOOP_LAG_INTERVAL = 0.5
+_event_loop_watch = None
+
+# Part of every upload cache key; bump it when conversion or parse output changes
+PARSER_VERSION = "1"
+# Bytes of pickled results kept in memory
+UPLOAD_CACHE_MEMORY_BYTES = int(os.environ.get("UPLOAD_CACHE_MEMORY_BYTES", 256 * 1024 * 1024))
+# Directory for the on-disk tier; no disk tier when unset
+UPLOAD_CACHE_DIR = os.environ.get("UPLOAD_CACHE_DIR") or None
+UPLOAD_CACHE_DISK_BYTES = int(os.environ.get("UPLOAD_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Converted XML and parse results of uploads seen before
+upload_cache = UploadCache(UPLOAD_CACHE_MEMORY_BYTES, UPLOAD_CACHE_DIR, UPLOAD_CACHE_DISK_BYTES)
+
+
+def _unsupported_encoding_error() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={
+            "error": "File encoding not supported",
+            "message": "This appears to be a binary file or uses an unsupported encoding",
+            "suggestion": "If this is a .pkt file, it will be processed with PKT conversion"
+        }
+    )
+
+
+def _binary_file_error() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={
+            "error": "Binary file detected",
+            "message": "This appears to be a binary file (possibly a .pkt file)",
+            "instructions": [
+                "If this is a Cisco Packet Tracer .pkt file:",
+                "1. Rename the file with .pkt extension and upload again",
+                "2. Or open the file in Cisco Packet Tracer",
+                "3. Export as Text (.txt) or XML (.xml)",
+                "4. Upload the exported file instead"
+            ]
+        }
+    )
+
+
+def _looks_binary(char_count: int, null_count: int) -> bool:
+    """Too many null characters; the start of the file was already sniffed"""
+    return char_count > 100 and null_count > char_count * 0.1
+
+
+def _text_encodings(encoding: Optional[str]) -> List[str]:
+    """The sniffed encoding, then the fallbacks it isn't"""
+    if encoding is None:
+        return TEXT_ENCODINGS
+    name = codecs.lookup(encoding).name
+    return [encoding] + [fallback for fallback in TEXT_ENCODINGS if codecs.lookup(fallback).name != name]
+
+
+def _routed_extension(file_extension: str, content_kind: str) -> str:
+    """The extension an upload is processed as, from what its bytes turned out to be"""
+    if content_kind in ("zip", "pkt"):
+        return '.pkt'
+    if file_extension == '.pkt':
+        # The PKT converter also scans unknown binaries and text-like content
+        # for devices, so a .pkt upload only skips it when it is plain XML
+        return '.xml' if content_kind == "xml" else '.pkt'
+    if content_kind == "binary":
+        raise _binary_file_error()
+    return '.xml' if content_kind == "xml" else '.txt'
+
+
+def _parse_txt_block(block: str, format_name: Optional[str]):
+    """Process pool entry point for block parses"""
+    return NetworkParser()._parse_block(block, format_name)
+
+
+def _get_blocking_threads():
+    global _blocking_threads
+    if _blocking_threads is None:
+        _blocking_threads = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="upload")
+    return _blocking_threads
+
+
+async def _run_in_thread(function, *args):
+    """Run blocking work on a thread so the event loop keeps serving other requests"""
+    return await asyncio.get_running_loop().run_in_executor(_get_blocking_threads(), function, *args)
+
+
+async def _run_stage(stage: str, function, *args):
+    """_run_in_thread, timed as one stage of processing an upload"""
+    with UPLOAD_STAGE_SECONDS.labels(stage).time():
+        return await _run_in_thread(function, *args)
+
+
+def _iter_stage(stage: str, iterable: Iterable[bytes]) -> Iterable[bytes]:
+    """The items of iterable, with the time spent producing them timed as one stage"""
+    timer = UPLOAD_STAGE_SECONDS.labels(stage)
+    iterator = iter(iterable)
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - start
+            yield item
+    finally:
+        timer.observe(seconds)
+
+
+async def _watch_event_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG.set(max(loop.time() - start - EVENT_LOOP_LAG_INTERVAL, 0.0))
+
+
+async def _run_blocking(function, *args):
+    """Run self-contained CPU work on the BLOCKING_EXECUTOR.
+
+    The function and its arguments must pickle when that is "process".
+    """
+    executor = _get_parse_pool() if BLOCKING_EXECUTOR == "process" else _get_blocking_threads()
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+def _upload_cache_key(kind: str, digest: str) -> str:
+    return f"{kind}-{PARSER_VERSION}-{digest}"
+
+
+def _hash_upload(upload: BinaryIO) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of a spooled upload, left rewound"""
+    upload.seek(0)
+    sha = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        sha.update(chunk)
+        size += len(chunk)
+    upload.seek(0)
+    return sha.hexdigest(), size
+
+
+def _result_etag(endpoint: str, digest: str, *representation: Optional[str]) -> str:
+    """A weak ETag for an endpoint's result for one upload.
+
+    The same bytes, parser version and representation (filename, media
+    type) always give the same topology. The body isn't byte-identical,
+    since the cache counters in the metadata change from one response to
+    the next, so the tag is weak.
+    """
+    sha = hashlib.sha256(f"{endpoint}\0{PARSER_VERSION}\0{digest}".encode())
+    for part in representation:
+        sha.update(b"\0" + str(part).encode("utf-8", "surrogatepass"))
+    return f'W/"{sha.hexdigest()[:32]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match names etag, or is *; compared weakly, as the header requires"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def _convert_pkt_upload(upload: BinaryIO, size: int, digest: str) -> Optional[str]:
+    """Convert a spooled PKT upload to XML in a conversion worker, or take it from the cache.
+
+    The spool is read straight into the worker's shared memory, with no
+    copy held here and no temporary file.
+    """
+    cache_key = _upload_cache_key("xml", digest)
+    xml_content = upload_cache.get(cache_key)
+    if xml_content is not None:
+        return xml_content
+    
+    xml_content = conversion_pool.convert_file(upload, size)
+    
+    if xml_content:
+        upload_cache.put(cache_key, xml_content)
+    return xml_content
+
+
+def _convert_pkt_upload_to_topology(upload: BinaryIO, size: int, digest: str) -> Union[Topology, str, None]:
+    """Convert a spooled PKT upload straight to a topology in a conversion worker.
+
+    XML is returned instead when that is what the conversion produced or
+    what an earlier /convert of the same file cached; None if it failed.
+    """
+    xml_content = upload_cache.get(_upload_cache_key("xml", digest))
+    if xml_content is not None:
+        return xml_content
+    return conversion_pool.convert_file(upload, size, as_topology=True)
+
+
+def _parse_converted_xml(xml_content: str):
+    """Parse the XML of a converted PKT file; returns the topology and the detected format"""
+    parser = NetworkParser(compact=True)
+    return parser.parse_xml_file(xml_content), parser.detected_format
+
+
+def _parse_converted_xml_stream(chunks: Iterable[bytes], encoding: str = 'utf-8',
+                                reread: Optional[Callable[[], Iterable[bytes]]] = None) -> Topology:
+    """Parse converted XML as it is produced, in a conversion worker"""
+    return NetworkParser(compact=True).parse_xml_stream(chunks, encoding, reread)
+
+
+# Archive XML members are parsed where they decompress, not sent back as XML
+conversion_pool.parse_xml_stream = _parse_converted_xml_stream
+
+
+class _TextUploadCheck:
+    """Collects the binary-content check inputs from raw chunks as they stream past.
+
+    Null bytes give the same answer as the decoded text for the single-byte
+    encodings and UTF-8; UTF-8 character counts exclude continuation bytes.
+    UTF-16 and UTF-32 text, which the sniffer only picks on a BOM, is made
+    of null bytes and isn't checked.
+    """
+    
+    def __init__(self, encoding: str):
+        name = codecs.lookup(encoding).name
+        self.utf8 = name in ('utf-8', 'utf-8-sig')
+        self.wide = name.startswith(('utf-16', 'utf-32'))
+        self.size = 0
+        self.chars = 0
+        self.nulls = 0
+    
+    def update(self, chunk: bytes):
+        self.size += len(chunk)
+        self.chars += len(chunk.translate(None, _UTF8_CONTINUATION_BYTES)) if self.utf8 else len(chunk)
+        if not self.wide:
+            self.nulls += chunk.count(b'\x00')
+    
+    def looks_binary(self) -> bool:
+        return _looks_binary(self.chars, self.nulls)
+
+
+def _read_upload_chunks(upload: BinaryIO, check: _TextUploadCheck):
+    while True:
+        chunk = upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        check.update(chunk)
+        yield chunk
+
+
+def _reread_upload(upload: BinaryIO) -> Iterable[bytes]:
+    """The spooled upload again from the start, for a parser's second pass"""
+    upload.seek(0)
+    return iter(lambda: upload.read(UPLOAD_CHUNK_SIZE), b'')
+
+
+def _parse_text_upload(upload: BinaryIO, parse_stream, encoding: Optional[str] = None):
+    """Stream a text or XML upload through one of the parser's stream methods chunk by chunk.
+
+    Runs on a thread, reading the spooled upload file directly. The body is
+    never held in memory as a whole. It is decoded with the sniffed encoding
+    when given; a decoding error restarts the stream with the next fallback
+    encoding. Returns what the parser returned and the upload size in bytes.
+    """
+    for encoding in _text_encodings(encoding):
+        upload.seek(0)
+        check = _TextUploadCheck(encoding)
+        try:
+            parsed = parse_stream(_read_upload_chunks(upload, check), encoding)
+        except UnicodeDecodeError:
+            continue
+        
+        if check.looks_binary():
+            raise _binary_file_error()
+        return parsed, check.size
+    
+    raise _unsupported_encoding_error()
+
+@app.on_event("startup")
+def start_parse_pool():
+    """Create the parse pool, and start its fork server, before the first upload"""
+    if BLOCKING_EXECUTOR == "process" or PARALLEL_PARSE_WORKERS > 1:
+        _get_parse_pool()
+        multiprocessing.forkserver.ensure_running()
+
+@app.on_event("shutdown")
+def stop_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown()
+        _parse_pool = None
+
+@app.on_event("startup")
+def start_conversion_pool():
+    """Probe for converter tools and start the PKT workers before the first upload"""
+    discover_tools()
+    conversion_pool.start()
+
+@app.on_event("shutdown")
+def stop_conversion_pool():
+    conversion_pool.close()
+
+@app.on_event("startup")
+def start_job_queue():
+    job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+@app.on_event("startup")
+def start_event_loop_watch():
+    global _event_loop_watch
+    _event_loop_watch = asyncio.ensure_future(_watch_event_loop_lag())
+
+@app.on_event("shutdown")
+def stop_event_loop_watch():
+    _event_loop_watch.cancel()
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "Network Status Viewer API is running"}
 
+@app.get("/metrics")
+async def metrics():
+    """Upload stage latencies, PKT conversion strategies, totals and event
+    loop lag, in the Prometheus text format"""
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload and parse network file (supports .txt, .xml, and .pkt files)"""
+async def upload_file(request: Request, file: UploadFile = File(...)):
+    """Upload and parse network file (supports .txt, .xml, and .pkt files).
+
+    The response format follows the Accept header, JSON by default:
+    - application/x-ndjson streams a metadata line, then devices and then
+      links in lines of up to NDJSON_CHUNK_ROWS, so neither side holds the
+      whole response at once
+    - application/x-topology-columnar is the binary columnar layout of
+      wire_format.encode_columnar, with a string table and id columns
+    - application/x-msgpack is the same columnar layout in MessagePack,
+      when msgpack is installed
+    
+    Responses carry an ETag; a request whose If-None-Match holds it gets
+    304 for the cost of hashing the upload, before anything is parsed.
+    """
+    media_type = choose_media_type(request.headers.get("accept"))
+    hashed = await _run_stage("read", _hash_upload, file.file)
+    headers = {**_NEGOTIATED_HEADERS, "ETag": _result_etag("upload", hashed[0], file.filename, media_type)}
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    topology, metadata = await _process_upload(file, hashed)
+    
+    if media_type == NDJSON_MEDIA_TYPE:
+        return StreamingResponse(
+            _iter_stage("encode", _iter_upload_ndjson(topology, metadata)), media_type=media_type, headers=headers)
+    
+    try:
+        # Large topologies take a while to serialize too
+        if media_type == COLUMNAR_MEDIA_TYPE:
+            body = await _run_stage("encode", encode_columnar, topology, metadata)
+        elif media_type == MSGPACK_MEDIA_TYPE:
+            body = await _run_stage("encode", encode_msgpack, topology, metadata)
+        else:
+            return await _run_stage("encode", _upload_json_response, topology, metadata, headers)
+        return Response(body, media_type=media_type, headers=headers)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error processing file: {str(e)}"
+        )
+
+
+@app.post("/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """Upload and parse many network files in one request.
+
+    Files are processed BATCH_UPLOAD_CONCURRENCY at a time. One NDJSON line
+    per file is streamed back as each finishes, holding its index in the
+    request and either the /upload response body or its error; a file that
+    fails doesn't stop the others.
+    """
+    slots = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+    
+    async def process(index: int, file: UploadFile) -> bytes:
+        async with slots:
+            line = {"index": index, "filename": file.filename}
+            try:
+                topology, metadata = await _process_upload(file)
+                line.update(status=200, result=await _run_stage("encode", _upload_body, topology, metadata))
+                return await _run_stage("encode", _ndjson_line, line)
+            except HTTPException as e:
+                line.update(status=e.status_code, error=e.detail)
+            except Exception as e:
+                line.update(status=500, error=f"Error processing file: {str(e)}")
+            line.pop("result", None)
+            return _ndjson_line(line)
+    
+    async def lines():
+        tasks = [asyncio.ensure_future(process(index, file)) for index, file in enumerate(files)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # The client went away; don't keep parsing for it
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def _ndjson_line(value: Any) -> bytes:
+    return (json.dumps(value, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _upload_body(topology: Topology, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """The /upload response body; the compact topology is only expanded here"""
+    result = topology.to_dict()
+    result["metadata"] = metadata
+    return result
+
+
+def _upload_json_response(topology: Topology, metadata: Dict[str, Any],
+                          headers: Dict[str, str] = _NEGOTIATED_HEADERS) -> JSONResponse:
+    return JSONResponse(_upload_body(topology, metadata), headers=headers)
+
+
+def _iter_upload_ndjson(topology: Topology, metadata: Dict[str, Any]) -> Iterable[bytes]:
+    """The /upload response as NDJSON lines, expanded a chunk at a time"""
+    yield _ndjson_line({"metadata": metadata})
+    for key, rows in (("devices", topology.iter_devices()), ("links", topology.iter_links())):
+        while True:
+            chunk = list(islice(rows, NDJSON_CHUNK_ROWS))
+            if not chunk:
+                break
+            yield _ndjson_line({key: chunk})
+
+
+async def _process_upload(file: UploadFile, hashed: Optional[Tuple[str, int]] = None):
+    """Parse one uploaded file; returns the topology and the response metadata.
+
+    hashed is the upload's _hash_upload result when the caller already has
+    it. Raises HTTPException on failure.
+    """
     
     # Validate file type
     if not file.filename:
@@ -445,33 +1559,43 @@ async def upload_file(file: UploadFile = File(...)):
     file_extension = os.path.splitext(file.filename)[1].lower()
     
     try:
-        # Read file content
-        content = await file.read()
         content_str = None
+        topology = None
+        parser = NetworkParser(compact=True)
+        
+        # Uploads seen before are answered from the cache
+        cached = None
+        encoding = None
+        if file_extension in ('.pkt', '.txt', '.xml'):
+            digest, file_size = hashed or await _run_stage("read", _hash_upload, file.file)
+            cache_key = _upload_cache_key(f"topology{file_extension}", digest)
+            cached = await _run_stage("cache", upload_cache.get, cache_key)
+            if cached is None:
+                # Processed as what the first bytes are, whatever the extension says
+                content_kind, encoding = await _run_stage("sniff", sniff_file, file.file, file_size)
+                file_extension = _routed_extension(file_extension, content_kind)
+        
+        if cached is not None:
+            topology, parser.detected_format, file_extension = cached
         
         # Handle PKT files with conversion
-        if file_extension == '.pkt':
+        elif file_extension == '.pkt':
             try:
-                # Save PKT file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pkt') as temp_file:
-                    temp_file.write(content)
-                    temp_pkt_path = temp_file.name
-                
-                # Convert PKT to XML
-                converter = PKTConverter()
-                xml_content = converter.convert_pkt_to_xml(temp_pkt_path)
+                # Convert PKT in a warm worker, to a topology when the converter can
+                converted = await _run_stage("convert", _convert_pkt_upload_to_topology, file.file, file_size, digest)
                 
-                if xml_content:
-                    content_str = xml_content
+                if isinstance(converted, Topology):
+                    topology = converted
+                    parser.detected_format = "xml"
+                    file_extension = '.xml'  # Reported as converted to XML
+                    conversion_success = True
+                elif converted:
+                    content_str = converted
                     file_extension = '.xml'  # Treat as XML for parsing
                     conversion_success = True
                 else:
                     conversion_success = False
                 
-                # Cleanup
-                converter.cleanup()
-                os.unlink(temp_pkt_path)
-                
                 if not conversion_success:
                     raise HTTPException(
                         status_code=400,
@@ -504,48 +1628,18 @@ async def upload_file(file: UploadFile = File(...)):
                     }
                 )
         
-        # Handle text and XML files
-        elif file_extension in ['.txt', '.xml']:
-            # Check if file might be binary (basic detection)
-            try:
-                content_str = content.decode('utf-8')
-            except UnicodeDecodeError:
-                # Try with different encodings
-                for encoding in ['latin1', 'cp1252', 'iso-8859-1']:
-                    try:
-                        content_str = content.decode(encoding)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                else:
-                    raise HTTPException(
-                        status_code=400,
-                        detail={
-                            "error": "File encoding not supported",
-                            "message": "This appears to be a binary file or uses an unsupported encoding",
-                            "suggestion": "If this is a .pkt file, it will be processed with PKT conversion"
-                        }
-                    )
-            
-            # Check for binary content patterns
-            if len(content_str) > 100 and (
-                content_str.count('\x00') > len(content_str) * 0.1 or  # Too many null bytes
-                any(ord(c) > 127 for c in content_str[:100])  # Non-ASCII characters at start
-            ):
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "error": "Binary file detected",
-                        "message": "This appears to be a binary file (possibly a .pkt file)",
-                        "instructions": [
-                            "If this is a Cisco Packet Tracer .pkt file:",
-                            "1. Rename the file with .pkt extension and upload again",
-                            "2. Or open the file in Cisco Packet Tracer",
-                            "3. Export as Text (.txt) or XML (.xml)",
-                            "4. Upload the exported file instead"
-                        ]
-                    }
-                )
+        # Large text files reuse blocks unchanged since an earlier upload;
+        # both kinds are parsed while they are read
+        elif file_extension == '.txt' and file_size >= INCREMENTAL_PARSE_THRESHOLD:
+            parse_stream = functools.partial(parser.parse_txt_stream_incremental, block_cache=_txt_block_cache, size=file_size)
+            topology, file_size = await _run_stage("parse_txt", _parse_text_upload, file.file, parse_stream, encoding)
+        
+        elif file_extension == '.txt':
+            topology, file_size = await _run_stage("parse_txt", _parse_text_upload, file.file, parser.parse_txt_stream, encoding)
+        
+        elif file_extension == '.xml':
+            parse_stream = functools.partial(parser.parse_xml_stream, reread=functools.partial(_reread_upload, file.file))
+            topology, file_size = await _run_stage("parse_xml", _parse_text_upload, file.file, parse_stream, encoding)
         
         else:
             raise HTTPException(
@@ -558,26 +1652,36 @@ async def upload_file(file: UploadFile = File(...)):
                 }
             )
         
-        # Parse based on file type
-        parser = NetworkParser()
-        if file_extension == '.xml':
-            result = parser.parse_xml_file(content_str)
-        else:
-            result = parser.parse_txt_file(content_str)
+        # Converted PKT files are parsed as XML
+        if topology is None:
+            with UPLOAD_STAGE_SECONDS.labels("parse_xml").time():
+                topology, parser.detected_format = await _run_blocking(_parse_converted_xml, content_str)
+        
+        if cached is None:
+            await _run_stage("cache", upload_cache.put, cache_key, (topology, parser.detected_format, file_extension))
+        
+        UPLOAD_BYTES.inc(file_size)
+        UPLOAD_DEVICES.inc(topology.device_count)
+        UPLOAD_LINKS.inc(topology.link_count)
         
         # Add metadata
         original_extension = os.path.splitext(file.filename)[1].lower()
-        result["metadata"] = {
+        metadata = {
             "filename": file.filename,
             "original_file_type": original_extension,
             "processed_as": file_extension,
-            "devices_count": len(result["devices"]),
-            "links_count": len(result["links"]),
-            "file_size": len(content),
-            "pkt_converted": original_extension == '.pkt' and file_extension == '.xml'
+            "detected_format": parser.detected_format or "unknown",
+            "devices_count": topology.device_count,
+            "links_count": topology.link_count,
+            "file_size": file_size,
+            "pkt_converted": original_extension == '.pkt' and file_extension == '.xml',
+            "unchanged_blocks_reused": parser.reused_blocks,
+            "cache_hit": cached is not None,
+            "cache_hits": upload_cache.hits,
+            "cache_misses": upload_cache.misses
         }
         
-        return JSONResponse(content=result)
+        return topology, metadata
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -589,8 +1693,25 @@ async def upload_file(file: UploadFile = File(...)):
         )
 
 @app.post("/convert")
-async def convert_pkt(file: UploadFile = File(...)):
-    """Convert PKT file to XML format"""
+async def convert_pkt(request: Request, file: UploadFile = File(...)):
+    """Convert PKT file to XML format.
+
+    Responses carry an ETag, and a matching If-None-Match gets 304 before
+    any conversion runs, as on /upload.
+    """
+    hashed = await _run_stage("read", _hash_upload, file.file)
+    headers = {"ETag": _result_etag("convert", hashed[0], file.filename)}
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=await _process_convert(file, hashed), headers=headers)
+
+
+async def _process_convert(file: UploadFile, hashed: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+    """Convert one uploaded PKT file; returns the /convert response body.
+
+    hashed is the upload's _hash_upload result when the caller already has
+    it. Raises HTTPException on failure.
+    """
     
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
@@ -609,30 +1730,19 @@ async def convert_pkt(file: UploadFile = File(...)):
         )
     
     try:
-        # Read file content
-        content = await file.read()
+        digest, file_size = hashed or await _run_stage("read", _hash_upload, file.file)
         
-        # Save PKT file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pkt') as temp_file:
-            temp_file.write(content)
-            temp_pkt_path = temp_file.name
-        
-        # Convert PKT to XML
-        converter = PKTConverter()
-        xml_content = converter.convert_pkt_to_xml(temp_pkt_path)
-        
-        # Cleanup
-        converter.cleanup()
-        os.unlink(temp_pkt_path)
+        # Convert PKT to XML in a warm worker
+        xml_content = await _run_stage("convert", _convert_pkt_upload, file.file, file_size, digest)
         
         if xml_content:
-            return JSONResponse(content={
+            return {
                 "success": True,
                 "xml": xml_content,
                 "message": "PKT file successfully converted to XML",
                 "original_filename": file.filename,
                 "conversion_method": "PTExplorer-based conversion"
-            })
+            }
         else:
             raise HTTPException(
                 status_code=400,
@@ -657,6 +1767,92 @@ async def convert_pkt(file: UploadFile = File(...)):
             }
         )
 
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...), kind: str = Form("upload")):
+    """Queue an upload parse ("upload") or PKT conversion ("convert") and
+    return its id at once; GET /jobs/{id} reports on it.
+
+    Answers 429 when JOB_QUEUE_SIZE jobs are already waiting.
+    """
+    if kind not in _JOB_KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "Unknown job kind",
+                "message": f"Job kind '{kind}' is not supported",
+                "supported_kinds": list(_JOB_KINDS)
+            }
+        )
+    if job_queue.full():
+        raise _job_queue_full_error()
+    
+    # The request's upload is closed once this response is sent
+    job_file = await _run_in_thread(_spool_upload, file)
+    try:
+        job = job_queue.submit(kind, file.filename, lambda: _JOB_KINDS[kind](job_file))
+    except QueueFull:
+        job_file.file.close()
+        raise _job_queue_full_error()
+    return JSONResponse(job.to_dict(), status_code=202, headers={"Location": f"/jobs/{job.id}"})
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """A job's status and timings, with its result once done or its error
+    (status code and detail, as the direct endpoint would answer) once failed.
+
+    Finished jobs are forgotten JOB_RESULT_TTL seconds after they finish.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    body = job.to_dict()
+    if job.status == "done" and job.kind == "upload":
+        body["result"] = await _run_in_thread(_upload_body, *job.result)
+    elif job.status == "done":
+        body["result"] = job.result
+    elif isinstance(job.error, HTTPException):
+        body["error"] = {"status_code": job.error.status_code, "detail": job.error.detail}
+    elif job.error is not None:
+        body["error"] = {"status_code": 500, "detail": f"Error processing file: {str(job.error)}"}
+    return body
+
+
+def _job_queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many queued jobs, try again later",
+        headers={"Retry-After": str(JOB_RETRY_AFTER)}
+    )
+
+
+def _spool_upload(file: UploadFile) -> UploadFile:
+    """A copy of an upload that outlives its request"""
+    copy = tempfile.SpooledTemporaryFile(max_size=JOB_SPOOL_BYTES)
+    file.file.seek(0)
+    shutil.copyfileobj(file.file, copy, UPLOAD_CHUNK_SIZE)
+    copy.seek(0)
+    return UploadFile(copy, size=file.size, filename=file.filename)
+
+
+async def _upload_job(file: UploadFile):
+    """The topology and metadata; expanded to the /upload body when fetched"""
+    try:
+        return await _process_upload(file)
+    finally:
+        file.file.close()
+
+
+async def _convert_job(file: UploadFile):
+    try:
+        return await _process_convert(file)
+    finally:
+        file.file.close()
+
+
+_JOB_KINDS = {"upload": _upload_job, "convert": _convert_job}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -5,74 +5,226 @@ Based on PTExplorer open-source implementation principles
 """
 
 import os
+import sys
+import io
+import codecs
 import json
+import shutil
 import subprocess
 import tempfile
-import xml.etree.ElementTree as ET
-from typing import Dict, Any, Optional
+import threading
+import time
+import importlib.util
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+import mmap
 import struct
 import zipfile
 from pathlib import Path
 
+import xml_backend
+from metrics import Counter, Histogram
+from topology import Topology
+from pkt_decoder import PKTDecodeError, iter_pkt_xml, read_topology
+
+# External converter commands, in the order they are tried
+TOOL_COMMANDS = [["pka2xml"], ["ptexplorer"]]
+# Module run as "python -m ptexplorer" when it is importable
+TOOL_MODULE = "ptexplorer"
+
+_tools = None
+
+
+def discover_tools() -> List[List[str]]:
+    """Commands of the external converters installed on this host, probed once per process"""
+    global _tools
+    if _tools is None:
+        tools = [command for command in TOOL_COMMANDS if shutil.which(command[0])]
+        if importlib.util.find_spec(TOOL_MODULE) is not None:
+            tools.append([sys.executable, "-m", TOOL_MODULE])
+        _tools = tools
+    return _tools
+
+
+class ExtractedTopology:
+    """Devices and connections a conversion method read from PKT content itself.
+
+    With ip_elements, IPs are written where the XML parser reads them;
+    otherwise only the ip attribute carries them and parsing drops them.
+    """
+
+    def __init__(self, devices: List[Dict[str, str]], connections: List[Dict[str, str]], ip_elements: bool = False):
+        self.devices = devices
+        self.connections = connections
+        self.ip_elements = ip_elements
+
+    def fits_xml(self) -> bool:
+        """False if the XML round trip would not give back the same strings.
+
+        That is when a string holds characters XML can't carry, so parsing
+        fails, or an <ipAddress> holds a carriage return, which ElementTree
+        writes unescaped and the parser reads back as a newline.
+        """
+        if self.ip_elements and any('\r' in device['ip'] for device in self.devices):
+            return False
+        strings = [value for device in self.devices for value in device.values()]
+        strings += [value for connection in self.connections for value in connection.values()]
+        return not any(_XML_INVALID_CHARACTER.search(value) for value in strings)
+
+    def to_topology(self) -> Topology:
+        """The topology NetworkParser.parse_xml_file gives for this converted to XML"""
+        topology = Topology()
+        for device in self.devices:
+            if device['name'] and device['type']:
+                topology.append_device(device['name'], device['type'], device['ip'] if self.ip_elements else "")
+        for connection in self.connections:
+            source = connection.get('from', '')
+            target = connection.get('to', '')
+            if source and target:
+                topology.append_link(source, target)
+        return topology
+
+
 class PKTConverter:
     """Converts PKT files to XML format using various methods"""
     
-    def __init__(self):
-        self.temp_dir = tempfile.mkdtemp()
+    def __init__(self, parse_xml_stream=None):
+        # Only created when an external converter needs files on disk
+        self.temp_dir = None
+        # Parses XML byte chunks into a Topology, called as
+        # parse_xml_stream(chunks, encoding, reread); with it, the XML member
+        # of an archive is parsed as it decompresses when a Topology is asked for
+        self.parse_xml_stream = parse_xml_stream
+        # (strategy, seconds, found anything) of each method tried, in order
+        self.attempts: List[Tuple[str, float, bool]] = []
     
     def convert_pkt_to_xml(self, pkt_file_path: str) -> Optional[str]:
         """
         Convert PKT file to XML format
         Returns XML string or None if conversion fails
         """
+        return self._convert_file(pkt_file_path, as_topology=False)
+    
+    def convert_pkt_bytes(self, data) -> Optional[str]:
+        """
+        Convert PKT content already in memory (bytes, memoryview or mmap)
+        Nothing is written to disk unless an external converter is installed
+        """
+        return self._convert_bytes(data, as_topology=False)
+    
+    def convert_pkt_to_topology(self, pkt_file_path: str) -> Union[Topology, str, None]:
+        """
+        Convert PKT file straight to a Topology, without writing XML to parse
+        XML from an external tool, or from an archive when there is no
+        parse_xml_stream, is returned as it is, for the caller to parse; None
+        if conversion fails
+        """
+        return self._convert_file(pkt_file_path, as_topology=True)
+    
+    def convert_pkt_bytes_to_topology(self, data) -> Union[Topology, str, None]:
+        """Like convert_pkt_to_topology, for content already in memory"""
+        return self._convert_bytes(data, as_topology=True)
+    
+    def _convert_file(self, pkt_file_path: str, as_topology: bool):
         try:
-            # Method 1: Try using pka2xml if available
-            xml_content = self._try_pka2xml(pkt_file_path)
-            if xml_content:
-                return xml_content
-            
-            # Method 2: Try extracting as ZIP (PKT files are sometimes ZIP-based)
-            xml_content = self._try_zip_extraction(pkt_file_path)
-            if xml_content:
-                return xml_content
-            
-            # Method 3: Try basic binary parsing
-            xml_content = self._try_binary_parsing(pkt_file_path)
-            if xml_content:
-                return xml_content
-                
-            return None
+            # Mapped once and shared by every method below
+            with open(pkt_file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    data = b''
+                else:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._finish(self._convert(data, pkt_file_path, as_topology), as_topology)
             
         except Exception as e:
             print(f"PKT conversion error: {e}")
             return None
     
-    def _try_pka2xml(self, pkt_file_path: str) -> Optional[str]:
-        """Try using pka2xml tool if available, or use built-in PKT parser"""
+    def _convert_bytes(self, data, as_topology: bool):
         try:
-            output_path = os.path.join(self.temp_dir, "output.xml")
+            return self._finish(self._convert(data, None, as_topology), as_topology)
             
-            # Try different possible command names
-            commands = ["pka2xml", "ptexplorer", "python -m ptexplorer"]
+        except Exception as e:
+            print(f"PKT conversion error: {e}")
+            return None
+    
+    def _finish(self, result, as_topology: bool):
+        """Turn what a conversion method found into XML, or into a Topology when asked"""
+        if not isinstance(result, ExtractedTopology):
+            return result
+        if as_topology and result.fits_xml():
+            return result.to_topology()
+        return self._create_xml_from_devices(result.devices, result.connections, result.ip_elements)
+    
+    def _convert(self, data, pkt_file_path: Optional[str], as_topology: bool = False):
+        # Method 1: Decode the Packet Tracer container natively
+        result = self._attempt("native", self._try_native_decoder, data)
+        if result:
+            return result
+        
+        # Method 2: Try using pka2xml if available, then the built-in structure parser
+        result = self._attempt("pka2xml", self._try_pka2xml, data, pkt_file_path)
+        if result:
+            return result
+        result = self._attempt("structure", self._parse_pkt_structure, data)
+        if result:
+            return result
+        
+        # Method 3: Try extracting as ZIP (PKT files are sometimes ZIP-based)
+        result = self._attempt("zip", self._try_zip_extraction, data, as_topology)
+        if result:
+            return result
+        
+        # Method 4: Try basic binary parsing
+        result = self._attempt("binary", self._try_binary_parsing, data)
+        if result:
+            return result
             
-            for cmd in commands:
+        return None
+    
+    def _attempt(self, strategy: str, method, *args):
+        """Run one conversion method, noting in attempts how long it took and whether it found anything"""
+        start = time.perf_counter()
+        result = method(*args)
+        self.attempts.append((strategy, time.perf_counter() - start, bool(result)))
+        return result
+    
+    def _get_temp_dir(self) -> str:
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp()
+        return self.temp_dir
+    
+    def _try_native_decoder(self, data) -> Optional[ExtractedTopology]:
+        """Decode the .pkt container and read the real topology from the XML inside"""
+        try:
+            devices, connections = read_topology(iter_pkt_xml(data))
+        except PKTDecodeError:
+            return None
+        
+        return ExtractedTopology(devices, connections, ip_elements=True)
+    
+    def _try_pka2xml(self, data, pkt_file_path: Optional[str]) -> Optional[str]:
+        """Try using pka2xml tool if available"""
+        try:
+            # Only the converter commands found on this host are tried
+            tools = discover_tools()
+            if tools:
+                output_path = os.path.join(self._get_temp_dir(), "output.xml")
+                if pkt_file_path is None:
+                    # The tools read a path, so content held in memory is written out once
+                    pkt_file_path = os.path.join(self._get_temp_dir(), "input.pkt")
+                    with open(pkt_file_path, 'wb') as f:
+                        f.write(data)
+            
+            for command in tools:
                 try:
-                    if cmd.startswith("python"):
-                        result = subprocess.run(
-                            [*cmd.split(), "-d", pkt_file_path, output_path],
-                            capture_output=True,
-                            text=True,
-                            check=True,
-                            timeout=30
-                        )
-                    else:
-                        result = subprocess.run(
-                            [cmd, "-d", pkt_file_path, output_path],
-                            capture_output=True,
-                            text=True,
-                            check=True,
-                            timeout=30
-                        )
+                    result = subprocess.run(
+                        [*command, "-d", pkt_file_path, output_path],
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                        timeout=30
+                    )
                     
                     if os.path.exists(output_path):
                         with open(output_path, "r", encoding="utf-8") as f:
@@ -81,156 +233,132 @@ class PKTConverter:
                 except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
                     continue
             
-            # If external tools fail, try built-in PKT parsing
-            return self._parse_pkt_structure(pkt_file_path)
+            return None
             
         except Exception:
             return None
     
-    def _try_zip_extraction(self, pkt_file_path: str) -> Optional[str]:
-        """Try extracting PKT file as ZIP archive"""
+    def _try_zip_extraction(self, data, as_topology: bool = False) -> Union[Topology, str, None]:
+        """Try extracting PKT file as ZIP archive.
+
+        The archive is read in place, without a copy. Members are tried
+        most promising first and streamed, so one that decompresses past
+        ZIP_MEMBER_MAX_BYTES or ZIP_MAX_RATIO is given up as soon as it
+        does. A member that fails moves on to the next one. With
+        as_topology and a parse_xml_stream, an XML member is parsed into a
+        Topology as it decompresses instead of being returned as XML.
+        """
         try:
-            with zipfile.ZipFile(pkt_file_path, 'r') as zip_ref:
-                # Look for XML or JSON files in the archive
-                for file_info in zip_ref.filelist:
-                    if file_info.filename.endswith(('.xml', '.json', '.txt')):
-                        content = zip_ref.read(file_info.filename)
-                        
+            # zipfile looks for the end record in the same place; checking
+            # first skips content that is not an archive
+            if _ZIP_END_SIGNATURE not in bytes(data[-_ZIP_END_SEARCH:]):
+                return None
+            
+            with _BufferFile(data) as archive, zipfile.ZipFile(archive, 'r') as zip_ref:
+                for file_info in _rank_zip_members(zip_ref.infolist()):
+                    try:
                         # If it's JSON, convert to XML
                         if file_info.filename.endswith('.json'):
-                            try:
-                                json_data = json.loads(content.decode('utf-8'))
-                                return self._json_to_xml(json_data)
-                            except:
-                                continue
+                            json_data = json.loads(''.join(_iter_member_text(zip_ref, file_info)))
+                            return self._json_to_xml(json_data)
                         
                         # If it's already XML
                         elif file_info.filename.endswith('.xml'):
-                            return content.decode('utf-8')
+                            if as_topology and self.parse_xml_stream is not None:
+                                # Read again from the archive if the parser needs a second pass
+                                reread = lambda file_info=file_info: _iter_member_bytes(zip_ref, file_info)
+                                return self.parse_xml_stream(reread(), 'utf-8', reread)
+                            return ''.join(_iter_member_text(zip_ref, file_info))
                         
                         # If it's text, try to parse as network config
                         elif file_info.filename.endswith('.txt'):
-                            text_content = content.decode('utf-8')
-                            return self._text_to_xml(text_content)
+                            return self._text_to_xml(_MemberLines(zip_ref, file_info))
+                    
+                    except Exception as e:
+                        print(f"Skipping archive member {file_info.filename}: {e}")
+                        continue
             
             return None
             
         except (zipfile.BadZipFile, Exception):
             return None
     
-    def _parse_pkt_structure(self, pkt_file_path: str) -> Optional[str]:
-        """Enhanced PKT file structure parsing"""
+    def _parse_pkt_structure(self, data) -> Optional[ExtractedTopology]:
+        """Enhanced PKT file structure parsing.
+
+        The content is searched for all candidates up front: XML and JSON
+        fragments, device names, IPs and connections. Names already taken
+        are tracked in a set.
+        """
         try:
-            with open(pkt_file_path, 'rb') as f:
-                content = f.read()
+            candidates = _scan_pkt_candidates(data)
             
             devices = []
-            connections = []
-            
-            # PKT files often contain structured data with specific markers
-            # Look for common patterns in PKT file format
+            device_names = set()
             
-            # Method 1: Look for XML-like structures embedded in binary
-            xml_pattern = re.compile(b'<[^>]+>[^<]*</[^>]+>', re.MULTILINE)
-            xml_matches = xml_pattern.findall(content)
+            def add_device(device_info):
+                devices.append(device_info)
+                device_names.add(device_info['name'])
             
-            for match in xml_matches:
+            # Method 1: XML-like structures embedded in binary
+            for match in candidates['xml']:
                 try:
                     xml_str = match.decode('utf-8', errors='ignore')
                     if any(keyword in xml_str.lower() for keyword in ['device', 'router', 'switch', 'pc']):
                         # Try to parse as XML fragment
                         try:
-                            elem = ET.fromstring(xml_str)
+                            elem = xml_backend.backend.fromstring(xml_str)
                             device_info = self._extract_device_from_xml(elem)
                             if device_info:
-                                devices.append(device_info)
+                                add_device(device_info)
                         except:
                             continue
                 except:
                     continue
             
-            # Method 2: Look for JSON-like structures
-            json_pattern = re.compile(b'\\{[^{}]*"[^"]*"[^{}]*\\}', re.MULTILINE)
-            json_matches = json_pattern.findall(content)
-            
-            for match in json_matches:
+            # Method 2: JSON-like structures
+            for match in candidates['json']:
                 try:
                     json_str = match.decode('utf-8', errors='ignore')
                     json_data = json.loads(json_str)
                     device_info = self._extract_device_from_json(json_data)
                     if device_info:
-                        devices.append(device_info)
+                        add_device(device_info)
                 except:
                     continue
             
-            # Method 3: Enhanced string extraction with pattern matching
-            device_patterns = [
-                b'Router[0-9]+',
-                b'Switch[0-9]+', 
-                b'PC[0-9]+',
-                b'Server[0-9]+',
-                b'Hub[0-9]+',
-                b'[A-Z][a-z]+[0-9]+',
-            ]
-            
-            for pattern in device_patterns:
-                matches = re.findall(pattern, content)
+            # Method 3: Device names, one name pattern after the other
+            for matches in candidates['names']:
                 for match in matches:
-                    try:
-                        device_name = match.decode('ascii')
-                        if device_name not in [d['name'] for d in devices]:
-                            devices.append({
-                                'name': device_name,
-                                'type': self._guess_device_type(device_name),
-                                'ip': self._generate_ip_for_device(len(devices))
-                            })
-                    except:
-                        continue
-            
-            # Method 4: Look for IP addresses and associate with devices
-            ip_pattern = re.compile(b'\\b(?:[0-9]{1,3}\\.){3}[0-9]{1,3}\\b')
-            ip_matches = ip_pattern.findall(content)
+                    device_name = match.decode('ascii')
+                    if device_name not in device_names:
+                        add_device({
+                            'name': device_name,
+                            'type': self._guess_device_type(device_name),
+                            'ip': self._generate_ip_for_device(len(devices))
+                        })
             
+            # Method 4: IP addresses, associated with devices in order
             valid_ips = []
-            for ip_match in ip_matches:
-                try:
-                    ip_str = ip_match.decode('ascii')
-                    # Validate IP format
-                    parts = ip_str.split('.')
-                    if all(0 <= int(part) <= 255 for part in parts):
-                        valid_ips.append(ip_str)
-                except:
-                    continue
+            for ip_match in candidates['ip']:
+                ip_str = ip_match.decode('ascii')
+                if all(int(part) <= 255 for part in ip_str.split('.')):
+                    valid_ips.append(ip_str)
             
-            # Associate IPs with devices
-            for i, device in enumerate(devices):
-                if i < len(valid_ips):
-                    device['ip'] = valid_ips[i]
-            
-            # Method 5: Look for connection patterns
-            # PKT files often store connection info as device pairs
-            connection_patterns = [
-                re.compile(b'([A-Za-z0-9]+)\\s*->\\s*([A-Za-z0-9]+)'),
-                re.compile(b'([A-Za-z0-9]+)\\s*-\\s*([A-Za-z0-9]+)'),
-                re.compile(b'connect\\s+([A-Za-z0-9]+)\\s+([A-Za-z0-9]+)', re.IGNORECASE),
-            ]
-            
-            for pattern in connection_patterns:
-                matches = pattern.findall(content)
-                for match in matches:
-                    try:
-                        from_device = match[0].decode('ascii')
-                        to_device = match[1].decode('ascii')
-                        
-                        # Check if both devices exist
-                        device_names = [d['name'] for d in devices]
-                        if from_device in device_names and to_device in device_names:
-                            connections.append({
-                                'from': from_device,
-                                'to': to_device
-                            })
-                    except:
-                        continue
+            for device, ip in zip(devices, valid_ips):
+                device['ip'] = ip
+            
+            # Method 5: Connections between known devices
+            connections = []
+            for matches in candidates['connections']:
+                for from_device, to_device in matches:
+                    from_device = from_device.decode('ascii')
+                    to_device = to_device.decode('ascii')
+                    if from_device in device_names and to_device in device_names:
+                        connections.append({
+                            'from': from_device,
+                            'to': to_device
+                        })
             
             # Generate some default connections if none found
             if not connections and len(devices) > 1:
@@ -242,7 +370,7 @@ class PKTConverter:
                     })
             
             if devices:
-                return self._create_xml_from_devices(devices, connections)
+                return ExtractedTopology(devices, connections)
             
             return None
             
@@ -289,18 +417,15 @@ class PKTConverter:
         """Generate a default IP address for a device"""
         return f"192.168.1.{index + 10}"
     
-    def _try_binary_parsing(self, pkt_file_path: str) -> Optional[str]:
+    def _try_binary_parsing(self, data) -> Optional[ExtractedTopology]:
         """Basic binary parsing to extract readable content"""
         try:
-            with open(pkt_file_path, 'rb') as f:
-                content = f.read()
-            
             # Look for common network device patterns in binary data
             devices = []
             connections = []
             
             # Extract ASCII strings that might be device names or IPs
-            ascii_strings = re.findall(b'[A-Za-z0-9._-]{3,20}', content)
+            ascii_strings = re.findall(b'[A-Za-z0-9._-]{3,20}', data)
             
             # Filter for potential device names and IPs
             for string in ascii_strings:
@@ -325,7 +450,7 @@ class PKTConverter:
                     continue
             
             if devices:
-                return self._create_xml_from_devices(devices, connections)
+                return ExtractedTopology(devices, connections)
             
             return None
             
@@ -346,68 +471,465 @@ class PKTConverter:
         else:
             return 'Generic'
     
+    def _build_xml(self, build) -> str:
+        """Build and serialize a tree with the XML backend.
+
+        lxml rejects tag names and text that ElementTree writes out as they
+        are, so those trees are built with ElementTree instead.
+        """
+        xml = xml_backend.backend
+        try:
+            return build(xml)
+        except ValueError:
+            if xml.name == "elementtree":
+                raise
+            return build(xml_backend.ElementTreeBackend())
+    
     def _json_to_xml(self, json_data: Dict[str, Any]) -> str:
         """Convert JSON data to XML format"""
-        root = ET.Element("network")
-        
-        def json_to_element(data, parent, name="item"):
-            if isinstance(data, dict):
-                elem = ET.SubElement(parent, name)
-                for key, value in data.items():
-                    json_to_element(value, elem, key)
-            elif isinstance(data, list):
-                for item in data:
-                    json_to_element(item, parent, name)
-            else:
-                elem = ET.SubElement(parent, name)
-                elem.text = str(data)
-        
-        json_to_element(json_data, root, "data")
+        def build(xml):
+            root = xml.Element("network")
+            
+            def json_to_element(data, parent, name="item"):
+                if isinstance(data, dict):
+                    elem = xml.SubElement(parent, name)
+                    for key, value in data.items():
+                        json_to_element(value, elem, key)
+                elif isinstance(data, list):
+                    for item in data:
+                        json_to_element(item, parent, name)
+                else:
+                    elem = xml.SubElement(parent, name)
+                    elem.text = str(data)
+            
+            json_to_element(json_data, root, "data")
+            
+            return xml.tostring(root)
         
-        return ET.tostring(root, encoding='unicode')
+        return self._build_xml(build)
     
-    def _text_to_xml(self, text_content: str) -> str:
-        """Convert text content to XML format"""
-        root = ET.Element("network")
-        devices_elem = ET.SubElement(root, "devices")
-        
-        lines = text_content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                device_elem = ET.SubElement(devices_elem, "device")
+    def _text_to_xml(self, lines: Iterable[str]) -> str:
+        """Convert lines of text content to XML format.
+
+        lines is read once per tree built, and the tree may be built twice,
+        so it has to be iterable more than once.
+        """
+        def build(xml):
+            root = xml.Element("network")
+            devices_elem = xml.SubElement(root, "devices")
+            
+            for line in map(str.strip, lines):
+                if not line or line.startswith('#'):
+                    continue
+                device_elem = xml.SubElement(devices_elem, "device")
                 device_elem.text = line
+            
+            return xml.tostring(root)
         
-        return ET.tostring(root, encoding='unicode')
+        return self._build_xml(build)
     
-    def _create_xml_from_devices(self, devices: list, connections: list) -> str:
-        """Create XML from extracted device and connection data"""
-        root = ET.Element("network")
-        
-        # Add devices
-        devices_elem = ET.SubElement(root, "devices")
-        for device in devices:
-            device_elem = ET.SubElement(devices_elem, "device")
-            device_elem.set("name", device['name'])
-            device_elem.set("type", device['type'])
-            device_elem.set("ip", device['ip'])
-        
-        # Add connections
-        connections_elem = ET.SubElement(root, "connections")
-        for connection in connections:
-            conn_elem = ET.SubElement(connections_elem, "connection")
-            conn_elem.set("from", connection.get('from', ''))
-            conn_elem.set("to", connection.get('to', ''))
+    def _create_xml_from_devices(self, devices: list, connections: list, ip_elements: bool = False) -> str:
+        """Create XML from extracted device and connection data.
+
+        With ip_elements, known IPs are also written as an <ipAddress> child,
+        which is where the XML parser reads them from.
+        """
+        def build(xml):
+            root = xml.Element("network")
+            
+            # Add devices
+            devices_elem = xml.SubElement(root, "devices")
+            for device in devices:
+                device_elem = xml.SubElement(devices_elem, "device")
+                device_elem.set("name", device['name'])
+                device_elem.set("type", device['type'])
+                device_elem.set("ip", device['ip'])
+                if ip_elements and device['ip']:
+                    xml.SubElement(device_elem, "ipAddress").text = device['ip']
+            
+            # Add connections
+            connections_elem = xml.SubElement(root, "connections")
+            for connection in connections:
+                conn_elem = xml.SubElement(connections_elem, "connection")
+                conn_elem.set("from", connection.get('from', ''))
+                conn_elem.set("to", connection.get('to', ''))
+            
+            return xml.tostring(root)
         
-        return ET.tostring(root, encoding='unicode')
+        return self._build_xml(build)
     
     def cleanup(self):
         """Clean up temporary files"""
-        try:
-            import shutil
+        if self.temp_dir is not None:
             shutil.rmtree(self.temp_dir, ignore_errors=True)
-        except:
-            pass
+            self.temp_dir = None
+
+# Worker processes kept warm for PKT conversions
+PKT_CONVERSION_WORKERS = int(os.environ.get("PKT_CONVERSION_WORKERS", 2))
+# Seconds one conversion may run before its worker is replaced
+PKT_CONVERSION_TIMEOUT = float(os.environ.get("PKT_CONVERSION_TIMEOUT", 120))
+
+PKT_STRATEGY_SECONDS = Histogram(
+    "pkt_conversion_strategy_seconds", "Time one PKT conversion strategy took", ["strategy"])
+PKT_STRATEGY_ATTEMPTS = Counter(
+    "pkt_conversion_strategy_attempts_total", "PKT conversion strategies tried, by whether they found a topology",
+    ["strategy", "outcome"])
+
+
+def _conversion_worker_main(connection, tools, parse_xml_stream=None):
+    """Run conversions sent over a pipe until the pipe closes.
+
+    Each request names its content, either a file path or the name and
+    size of a shared memory block holding it, and whether to return a
+    Topology instead of XML. The reply is the result and the converter's
+    attempts, for the metrics kept in the parent.
+    """
+    global _tools
+    _tools = tools
+    while True:
+        try:
+            source, as_topology = connection.recv()
+        except EOFError:
+            break
+        converter = PKTConverter(parse_xml_stream)
+        try:
+            if isinstance(source, str):
+                result = converter._convert_file(source, as_topology)
+            else:
+                result = _convert_shared_memory(converter, *source, as_topology)
+        finally:
+            converter.cleanup()
+        connection.send((result, converter.attempts))
+
+
+def _convert_shared_memory(converter: PKTConverter, name: str, size: int, as_topology: bool):
+    block = shared_memory.SharedMemory(name)
+    try:
+        data = block.buf[:size]
+        try:
+            return converter._convert_bytes(data, as_topology)
+        finally:
+            data.release()
+    finally:
+        block.close()
+
+
+# Workers start from a fork server, not forked from the API's threads
+_WORKER_CONTEXT = multiprocessing.get_context("forkserver")
+
+
+class _ConversionWorker:
+    """One warm worker process"""
+
+    def __init__(self, tools, parse_xml_stream=None):
+        self.connection, child_connection = _WORKER_CONTEXT.Pipe()
+        self.process = _WORKER_CONTEXT.Process(
+            target=_conversion_worker_main, args=(child_connection, tools, parse_xml_stream), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+    def convert(self, request, timeout: float):
+        self.connection.send(request)
+        if not self.connection.poll(timeout):
+            raise TimeoutError(f"PKT conversion took longer than {timeout} seconds")
+        return self.connection.recv()
+
+    def stop(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class ConversionPool:
+    """Warm worker processes that PKT conversions are sent to, each with a time limit.
+
+    A worker that times out or dies is replaced; the others keep running.
+    """
+
+    def __init__(self, size: int = PKT_CONVERSION_WORKERS, timeout: float = PKT_CONVERSION_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle: List[_ConversionWorker] = []
+        # Handed to each worker's PKTConverter; must pickle, so a module-level function
+        self.parse_xml_stream = None
+
+    def start(self):
+        """Start all workers now instead of on first use"""
+        with self._lock:
+            while len(self._idle) < self.size:
+                self._idle.append(self._new_worker())
+
+    def _new_worker(self) -> _ConversionWorker:
+        # Workers attach to the shared memory blocks this process creates;
+        # with one resource tracker for both, a block is only forgotten
+        # when this process unlinks it
+        resource_tracker.ensure_running()
+        return _ConversionWorker(discover_tools(), self.parse_xml_stream)
+
+    def convert(self, pkt_file_path: str, as_topology: bool = False):
+        """Convert a PKT file in a worker; None if conversion failed or timed out.
+
+        Gives XML, or with as_topology what PKTConverter.convert_pkt_to_topology
+        gives.
+        """
+        return self._convert((pkt_file_path, as_topology))
+
+    def convert_file(self, pkt_file: BinaryIO, size: int, as_topology: bool = False):
+        """Convert the PKT content of an open file in a worker, like convert.
+
+        The content is read once, straight into a shared memory block that
+        the worker converts in place; no file is written.
+        """
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            pkt_file.seek(0)
+            filled = 0
+            while filled < size:
+                count = pkt_file.readinto(block.buf[filled:size])
+                if not count:
+                    break
+                filled += count
+            pkt_file.seek(0)
+            return self._convert(((block.name, filled), as_topology))
+        finally:
+            block.close()
+            block.unlink()
+
+    def _convert(self, request):
+        with self._slots:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None or not worker.process.is_alive():
+                worker = self._new_worker()
+            
+            try:
+                xml_content, attempts = worker.convert(request, self.timeout)
+            except (TimeoutError, EOFError, OSError) as e:
+                print(f"PKT conversion worker error: {e}")
+                worker.stop()
+                return None
+            
+            with self._lock:
+                self._idle.append(worker)
+            for strategy, seconds, found in attempts:
+                PKT_STRATEGY_SECONDS.labels(strategy).observe(seconds)
+                PKT_STRATEGY_ATTEMPTS.labels(strategy, "hit" if found else "miss").inc()
+            return xml_content
+
+    def close(self):
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.stop()
+
+
+# Shared by the API endpoints
+conversion_pool = ConversionPool()
 
 # Import regex for binary parsing
 import re
+
+# Characters outside the XML 1.0 Char production
+_XML_INVALID_CHARACTER = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+
+# zipfile looks for the end-of-archive record in the last 22 bytes plus
+# a comment of up to 64 KiB
+_ZIP_END_SIGNATURE = zipfile.stringEndArchive
+_ZIP_END_SEARCH = zipfile.sizeEndCentDir + (1 << 16)
+
+# Most bytes one archive member may decompress to
+ZIP_MEMBER_MAX_BYTES = int(os.environ.get("ZIP_MEMBER_MAX_BYTES", 64 * 1024 * 1024))
+# Most decompressed bytes per compressed byte, for members past ZIP_RATIO_MIN_BYTES
+ZIP_MAX_RATIO = int(os.environ.get("ZIP_MAX_RATIO", 100))
+ZIP_RATIO_MIN_BYTES = 1024 * 1024
+ZIP_READ_SIZE = 64 * 1024
+# Archive members tried, best first
+_ZIP_MEMBER_EXTENSIONS = ('.xml', '.json', '.txt')
+
+
+class ZipMemberTooLarge(ValueError):
+    """An archive member decompresses past the size or ratio limit"""
+
+
+def _zip_member_limit(file_info: zipfile.ZipInfo) -> int:
+    """Most bytes a member may decompress to, given its compressed size"""
+    return min(ZIP_MEMBER_MAX_BYTES, max(file_info.compress_size * ZIP_MAX_RATIO, ZIP_RATIO_MIN_BYTES))
+
+
+def _rank_zip_members(members: List[zipfile.ZipInfo]) -> List[zipfile.ZipInfo]:
+    """The members worth trying, most promising first, from the central directory alone.
+
+    XML comes before JSON and text, members with content before empty ones,
+    and archive order breaks ties. Directories, encrypted members, macOS
+    resource forks and members whose declared size is already over the
+    limit are left out.
+    """
+    candidates = []
+    for index, file_info in enumerate(members):
+        name = file_info.filename
+        if not name.endswith(_ZIP_MEMBER_EXTENSIONS) or file_info.is_dir():
+            continue
+        if file_info.flag_bits & 0x1 or name.startswith('__MACOSX/') or os.path.basename(name).startswith('._'):
+            continue
+        if file_info.file_size > _zip_member_limit(file_info):
+            continue
+        rank = next(i for i, extension in enumerate(_ZIP_MEMBER_EXTENSIONS) if name.endswith(extension))
+        candidates.append((rank, file_info.file_size == 0, index, file_info))
+    return [file_info for *_, file_info in sorted(candidates, key=lambda candidate: candidate[:3])]
+
+
+def _iter_member_bytes(zip_ref: zipfile.ZipFile, file_info: zipfile.ZipInfo) -> Iterator[bytes]:
+    """A member's bytes as they decompress, stopping at the limits.
+
+    The declared sizes aren't trusted: the count is of bytes actually
+    decompressed.
+    """
+    limit = _zip_member_limit(file_info)
+    size = 0
+    with zip_ref.open(file_info) as member:
+        while True:
+            chunk = member.read(ZIP_READ_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise ZipMemberTooLarge(f"decompresses past {limit} bytes")
+            yield chunk
+
+
+def _iter_member_text(zip_ref: zipfile.ZipFile, file_info: zipfile.ZipInfo) -> Iterator[str]:
+    """Decode a member as UTF-8 while it decompresses, stopping at the limits"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in _iter_member_bytes(zip_ref, file_info):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', True)
+
+
+class _MemberLines:
+    """The lines of an archive member, decompressed again each time they are iterated"""
+
+    def __init__(self, zip_ref: zipfile.ZipFile, file_info: zipfile.ZipInfo):
+        self.zip_ref = zip_ref
+        self.file_info = file_info
+
+    def __iter__(self) -> Iterator[str]:
+        return _iter_lines(_iter_member_text(self.zip_ref, self.file_info))
+
+
+class _BufferFile(io.RawIOBase):
+    """A read-only file over bytes, a memoryview or an mmap, without copying them.
+
+    io.BytesIO copies anything but bytes; zipfile only needs read, seek and tell.
+    """
+
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self._view[self._position:self._position + len(buffer)]
+        count = len(chunk)
+        buffer[:count] = chunk
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"invalid whence {whence}")
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        # Shared memory and mmaps can't be closed while a view is held
+        self._view.release()
+        super().close()
+
+
+def _iter_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """Lines of text arriving in pieces, split as str.split('\\n') would"""
+    partial = ''
+    for piece in pieces:
+        lines = (partial + piece).split('\n')
+        partial = lines.pop()
+        yield from lines
+    yield partial
+
+# Candidates _parse_pkt_structure looks for. Each kind has its own search:
+# the regex engine tries every branch of a combined pattern at every
+# position, which measured slower than these searches one after the other.
+_PKT_XML_FRAGMENT = re.compile(rb'<[^>]+>[^<]*</[^>]+>')
+_PKT_JSON_FRAGMENT = re.compile(rb'\{[^{}]*"[^"]*"[^{}]*\}')
+# All device name patterns at once; each match is sorted into the patterns
+# it satisfies by _PKT_NAME_PREFIXES and the capitalized-word rule
+_PKT_DEVICE_NAME = re.compile(rb'(?:Router|Switch|PC|Server|Hub)[0-9]+|[A-Z][a-z]+[0-9]+')
+_PKT_NAME_PREFIXES = [b'Router', b'Switch', b'PC', b'Server', b'Hub']
+_PKT_IP = re.compile(rb'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')
+# Arrow and dash connections are found from their separator, which the
+# regex engine can jump to, and the first device is read backwards from there
+_PKT_CONNECTION_TAILS = [
+    re.compile(rb'->\s*([A-Za-z0-9]+)'),
+    re.compile(rb'-\s*([A-Za-z0-9]+)'),
+]
+_PKT_CONNECT_COMMAND = re.compile(rb'connect\s+([A-Za-z0-9]+)\s+([A-Za-z0-9]+)', re.IGNORECASE)
+_ALNUM_BYTES = frozenset(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789')
+_SPACE_BYTES = frozenset(b' \t\n\r\x0b\x0c')
+
+
+def _find_connections(content, tail) -> list:
+    """The (device, device) pairs a findall of device, separator, device would return"""
+    pairs = []
+    last_end = 0
+    for match in tail.finditer(content):
+        end = match.start()
+        while end > 0 and content[end - 1] in _SPACE_BYTES:
+            end -= 1
+        start = end
+        while start > 0 and content[start - 1] in _ALNUM_BYTES:
+            start -= 1
+        # Needs a first device, and must not reuse the second device of the last pair
+        if start == end or start < last_end:
+            continue
+        pairs.append((bytes(content[start:end]), match.group(1)))
+        last_end = match.end()
+    return pairs
+
+
+def _scan_pkt_candidates(content) -> Dict[str, list]:
+    """Every candidate in a PKT file's bytes, grouped the way _parse_pkt_structure uses them"""
+    # One list per device name pattern, in the order names are taken from them
+    names = [[] for _ in range(len(_PKT_NAME_PREFIXES) + 1)]
+    for name in _PKT_DEVICE_NAME.findall(content):
+        letters = name.rstrip(b'0123456789')
+        if letters in _PKT_NAME_PREFIXES:
+            names[_PKT_NAME_PREFIXES.index(letters)].append(name)
+        if letters[1:].islower():
+            names[-1].append(name)
+    
+    return {
+        'xml': _PKT_XML_FRAGMENT.findall(content),
+        'json': _PKT_JSON_FRAGMENT.findall(content),
+        'names': names,
+        'ip': _PKT_IP.findall(content),
+        'connections': [
+            *(_find_connections(content, tail) for tail in _PKT_CONNECTION_TAILS),
+            _PKT_CONNECT_COMMAND.findall(content),
+        ],
+    }
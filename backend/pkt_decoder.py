@@ -0,0 +1,425 @@
+"""
+Native PKT decoder
+Decodes the Packet Tracer .pkt container the way pka2xml does, without an
+external binary, and reads devices and links from the XML inside.
+
+Files from Packet Tracer 5 are XOR-obfuscated and zlib-compressed. Newer
+files add a reversed XOR layer and Twofish in EAX mode around that. The
+input is decoded in fixed-size slices of a memoryview and the decompressed
+XML is handed on as it comes out of zlib, so the whole file is passed over
+once and the XML is never held in memory as a whole.
+"""
+
+import re
+import struct
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import xml_backend
+
+
+class PKTDecodeError(ValueError):
+    """The data is not a .pkt container this decoder understands"""
+
+
+# Slice of the input decoded at a time; a multiple of 256, so every slice
+# lines up with the period of the XOR key streams, and of the cipher block
+DECODE_CHUNK_SIZE = 64 * 1024
+
+# Key and EAX nonce Packet Tracer encrypts with
+PKT_KEY = bytes([137] * 16)
+PKT_IV = bytes([16] * 16)
+# Length of the EAX tag at the end of the encrypted data
+EAX_TAG_SIZE = 16
+
+_MASK32 = 0xFFFFFFFF
+
+
+# Twofish, as in the specification, for the one 128-bit key in use
+
+_Q0_NIBBLES = (
+    (8, 1, 7, 13, 6, 15, 3, 2, 0, 11, 5, 9, 14, 12, 10, 4),
+    (14, 12, 11, 8, 1, 2, 3, 5, 15, 4, 10, 6, 7, 0, 9, 13),
+    (11, 10, 5, 14, 6, 13, 9, 0, 12, 8, 15, 3, 2, 4, 7, 1),
+    (13, 7, 15, 4, 1, 2, 6, 14, 9, 11, 3, 0, 8, 5, 12, 10),
+)
+_Q1_NIBBLES = (
+    (2, 8, 11, 13, 15, 7, 6, 14, 3, 1, 9, 4, 0, 10, 12, 5),
+    (1, 14, 2, 11, 4, 12, 3, 7, 6, 13, 10, 5, 15, 9, 0, 8),
+    (4, 12, 7, 5, 1, 6, 9, 10, 0, 14, 13, 8, 2, 11, 3, 15),
+    (11, 9, 5, 1, 12, 3, 13, 14, 6, 4, 7, 15, 2, 0, 8, 10),
+)
+_MDS = ((0x01, 0xEF, 0x5B, 0x5B), (0x5B, 0xEF, 0xEF, 0x01), (0xEF, 0x5B, 0x01, 0xEF), (0xEF, 0x01, 0xEF, 0x5B))
+_RS = (
+    (0x01, 0xA4, 0x55, 0x87, 0x5A, 0x58, 0xDB, 0x9E),
+    (0xA4, 0x56, 0x82, 0xF3, 0x1E, 0xC6, 0x68, 0xE5),
+    (0x02, 0xA1, 0xFC, 0xC1, 0x47, 0xAE, 0x3D, 0x19),
+    (0xA4, 0x55, 0x87, 0x5A, 0x58, 0xDB, 0x9E, 0x03),
+)
+_MDS_POLY = 0x169
+_RS_POLY = 0x14D
+
+
+def _gf_mul(a: int, b: int, poly: int) -> int:
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a <<= 1
+        if a & 0x100:
+            a ^= poly
+        b >>= 1
+    return result
+
+
+def _q_table(nibbles) -> List[int]:
+    def ror4(x):
+        return (x >> 1 | x << 3) & 15
+
+    table = []
+    for x in range(256):
+        a, b = x >> 4, x & 15
+        a, b = a ^ b, (a ^ ror4(b) ^ a << 3) & 15
+        a, b = nibbles[0][a], nibbles[1][b]
+        a, b = a ^ b, (a ^ ror4(b) ^ a << 3) & 15
+        a, b = nibbles[2][a], nibbles[3][b]
+        table.append(b << 4 | a)
+    return table
+
+
+_Q0 = _q_table(_Q0_NIBBLES)
+_Q1 = _q_table(_Q1_NIBBLES)
+
+
+def _rol(x: int, n: int) -> int:
+    return (x << n | x >> (32 - n)) & _MASK32
+
+
+def _key_dependent_sbox(position: int, l0: int, l1: int):
+    """Byte substitution of h() for one byte position and a two-word key list"""
+    k0 = [l0 >> shift & 255 for shift in (0, 8, 16, 24)]
+    k1 = [l1 >> shift & 255 for shift in (0, 8, 16, 24)]
+    q_in, q_mid, q_out = ((_Q0, _Q0, _Q1), (_Q1, _Q0, _Q0), (_Q0, _Q1, _Q1), (_Q1, _Q1, _Q0))[position]
+    return lambda x: q_out[q_mid[q_in[x] ^ k1[position]] ^ k0[position]]
+
+
+def _mds_column(position: int, value: int) -> int:
+    return sum(_gf_mul(_MDS[row][position], value, _MDS_POLY) << 8 * row for row in range(4))
+
+
+def _h(x: int, l0: int, l1: int) -> int:
+    result = 0
+    for position in range(4):
+        result ^= _mds_column(position, _key_dependent_sbox(position, l0, l1)(x >> 8 * position & 255))
+    return result
+
+
+def _gf_mul_row(row, chunk: bytes) -> int:
+    result = 0
+    for coefficient, value in zip(row, chunk):
+        result ^= _gf_mul(coefficient, value, _RS_POLY)
+    return result
+
+
+class _Twofish:
+    """Twofish encryption with a 128-bit key, using fully keyed lookup tables"""
+
+    def __init__(self, key: bytes):
+        m = struct.unpack('<4I', key)
+        even, odd = (m[0], m[2]), (m[1], m[3])
+
+        s = []
+        for half in range(2):
+            chunk = key[8 * half:8 * half + 8]
+            s.append(sum(
+                _gf_mul_row(_RS[row], chunk) << 8 * row for row in range(4)
+            ))
+
+        self.k = []
+        for i in range(20):
+            a = _h(2 * i * 0x01010101, *even)
+            b = _rol(_h((2 * i + 1) * 0x01010101, *odd), 8)
+            self.k.append((a + b) & _MASK32)
+            self.k.append(_rol((a + 2 * b) & _MASK32, 9))
+
+        # g() with S = (S1, S0): one table per input byte, MDS folded in
+        self.tables = [
+            [_mds_column(position, sbox(x)) for x in range(256)]
+            for position, sbox in ((p, _key_dependent_sbox(p, s[1], s[0])) for p in range(4))
+        ]
+
+    def encrypt_words(self, a: int, b: int, c: int, d: int) -> Tuple[int, int, int, int]:
+        t0, t1, t2, t3 = self.tables
+        k = self.k
+        a ^= k[0]
+        b ^= k[1]
+        c ^= k[2]
+        d ^= k[3]
+        for r in range(8, 40, 4):
+            x = t0[a & 255] ^ t1[a >> 8 & 255] ^ t2[a >> 16 & 255] ^ t3[a >> 24]
+            y = t0[b >> 24] ^ t1[b & 255] ^ t2[b >> 8 & 255] ^ t3[b >> 16 & 255]
+            c ^= (x + y + k[r]) & _MASK32
+            c = c >> 1 | (c & 1) << 31
+            d = ((d << 1 | d >> 31) & _MASK32) ^ ((x + 2 * y + k[r + 1]) & _MASK32)
+            x = t0[c & 255] ^ t1[c >> 8 & 255] ^ t2[c >> 16 & 255] ^ t3[c >> 24]
+            y = t0[d >> 24] ^ t1[d & 255] ^ t2[d >> 8 & 255] ^ t3[d >> 16 & 255]
+            a ^= (x + y + k[r + 2]) & _MASK32
+            a = a >> 1 | (a & 1) << 31
+            b = ((b << 1 | b >> 31) & _MASK32) ^ ((x + 2 * y + k[r + 3]) & _MASK32)
+        return c ^ k[4], d ^ k[5], a ^ k[6], b ^ k[7]
+
+    def encrypt_block(self, block: bytes) -> bytes:
+        return struct.pack('<4I', *self.encrypt_words(*struct.unpack('<4I', block)))
+
+
+# EAX mode: CTR encryption from an OMAC of the nonce. The tag is not
+# checked; zlib's own checksum catches a wrong or damaged decryption.
+
+def _omac_nonce(cipher: _Twofish, nonce: bytes) -> int:
+    """OMAC of [0]_16 || nonce, the initial CTR counter"""
+    def double(x):
+        x <<= 1
+        return (x ^ 0x87) & (1 << 128) - 1 if x >> 128 else x
+
+    def encrypt(x):
+        return int.from_bytes(cipher.encrypt_block(x.to_bytes(16, 'big')), 'big')
+
+    k1 = double(encrypt(0))
+    return encrypt(encrypt(0) ^ int.from_bytes(nonce, 'big') ^ k1)
+
+
+_pkt_cipher = None
+
+
+def _get_pkt_cipher() -> Tuple[_Twofish, int]:
+    """The Packet Tracer cipher and initial counter, built on first use"""
+    global _pkt_cipher
+    if _pkt_cipher is None:
+        cipher = _Twofish(PKT_KEY)
+        _pkt_cipher = (cipher, _omac_nonce(cipher, PKT_IV))
+    return _pkt_cipher
+
+
+def _ctr_keystream(cipher: _Twofish, counter: int, block_count: int) -> bytes:
+    encrypt_words = cipher.encrypt_words
+    unpack = struct.Struct('<4I').unpack
+    pack = struct.Struct('<4I').pack
+    out = []
+    for block in range(counter, counter + block_count):
+        out.append(pack(*encrypt_words(*unpack((block & (1 << 128) - 1).to_bytes(16, 'big')))))
+    return b''.join(out)
+
+
+def _xor(data, key_stream) -> bytes:
+    """XOR of two byte strings of the same length, in C speed through ints"""
+    size = len(data)
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(key_stream[:size], 'little')).to_bytes(size, 'little')
+
+
+def _length_stream(length: int, multiplier: int = 1) -> bytes:
+    """Bytes (length - i * multiplier) mod 256 for i in one decode chunk"""
+    period = bytes((length - i * multiplier) & 255 for i in range(256))
+    return period * (DECODE_CHUNK_SIZE // 256)
+
+
+# Decoding
+
+def _looks_compressed(header: bytes, input_size: int) -> bool:
+    """A 4-byte big-endian size followed by a zlib stream header"""
+    if len(header) < 6:
+        return False
+    size = int.from_bytes(header[:4], 'big')
+    cmf, flg = header[4], header[5]
+    return cmf & 0x0F == 8 and (cmf << 8 | flg) % 31 == 0 and 0 < size <= input_size * 1032
+
+
+def _old_format_chunks(data: memoryview) -> Iterator[bytes]:
+    """Packet Tracer 5: byte i XORed with (length - i)"""
+    key_stream = _length_stream(len(data))
+    for start in range(0, len(data), DECODE_CHUNK_SIZE):
+        yield _xor(data[start:start + DECODE_CHUNK_SIZE], key_stream)
+
+
+def _new_format_chunks(data: memoryview) -> Iterator[bytes]:
+    """Packet Tracer 6 and later: reversed XOR, Twofish-EAX, then XOR again"""
+    length = len(data)
+    ciphertext_size = length - EAX_TAG_SIZE
+    cipher, counter = _get_pkt_cipher()
+    # Both XOR layers combined: (length - i * length) before decryption,
+    # (ciphertext size - i) after it
+    key_stream = _xor(_length_stream(length, length), _length_stream(ciphertext_size))
+    for start in range(0, ciphertext_size, DECODE_CHUNK_SIZE):
+        end = min(start + DECODE_CHUNK_SIZE, ciphertext_size)
+        # Reading the input from the end is the first layer
+        reversed_slice = bytes(data[length - end:length - start])[::-1]
+        block_count = (end - start + 15) // 16
+        ctr = _ctr_keystream(cipher, counter + start // 16, block_count)
+        yield _xor(_xor(reversed_slice, key_stream), ctr)
+
+
+def _first_bytes_new_format(tail, length: int) -> bytes:
+    """The first decoded bytes of a new-format file, from its last 16 bytes"""
+    if length < EAX_TAG_SIZE + 16:
+        return b''
+    cipher, counter = _get_pkt_cipher()
+    end = len(tail)
+    head = bytes((tail[end - 1 - i] ^ (length - i * length) ^ (length - EAX_TAG_SIZE - i)) & 255 for i in range(16))
+    return _xor(head, _ctr_keystream(cipher, counter, 1))
+
+
+def looks_like_pkt(head: bytes, tail: bytes, length: int) -> bool:
+    """Whether a file of length bytes, starting with head and ending with
+    tail (at least 16 bytes each), is a .pkt container in either format"""
+    old_header = bytes((byte ^ (length - i)) & 255 for i, byte in enumerate(head[:6]))
+    return (_looks_compressed(old_header, length)
+            or _looks_compressed(_first_bytes_new_format(tail[-16:], length), length))
+
+
+def iter_pkt_xml(data) -> Iterator[bytes]:
+    """Decode a .pkt file and yield the XML inside as it is decompressed.
+
+    Accepts any bytes-like object. Raises PKTDecodeError when the data is
+    not a container in either format or does not decompress cleanly.
+    """
+    data = memoryview(data).cast('B')
+    if _looks_compressed(_xor(data[:6], _length_stream(len(data))), len(data)):
+        chunks = _old_format_chunks(data)
+    elif _looks_compressed(_first_bytes_new_format(data[-16:], len(data)), len(data)):
+        chunks = _new_format_chunks(data)
+    else:
+        raise PKTDecodeError("not a Packet Tracer file")
+    return _decompress(chunks)
+
+
+def _decompress(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj()
+    expected_size = None
+    output_size = 0
+    try:
+        for chunk in chunks:
+            if expected_size is None:
+                expected_size = int.from_bytes(chunk[:4], 'big')
+                chunk = chunk[4:]
+            output = decompressor.decompress(chunk)
+            if output:
+                output_size += len(output)
+                yield output
+        output = decompressor.flush()
+    except zlib.error as e:
+        raise PKTDecodeError(f"corrupt Packet Tracer file: {e}") from e
+    output_size += len(output)
+    if not decompressor.eof or output_size != expected_size:
+        raise PKTDecodeError("truncated Packet Tracer file")
+    if output:
+        yield output
+
+
+def decode_pkt(data) -> bytes:
+    """The whole XML document inside a .pkt file"""
+    return b''.join(iter_pkt_xml(data))
+
+
+def encode_pkt(xml: bytes, old_format: bool = False) -> bytes:
+    """Pack an XML document the way Packet Tracer saves it"""
+    compressed = len(xml).to_bytes(4, 'big') + zlib.compress(xml)
+    if old_format:
+        length = len(compressed)
+        return bytes(byte ^ (length - i) & 255 for i, byte in enumerate(compressed))
+
+    size = len(compressed)
+    obfuscated = bytes(byte ^ (size - i) & 255 for i, byte in enumerate(compressed))
+    cipher, counter = _get_pkt_cipher()
+    ciphertext = _xor(obfuscated, _ctr_keystream(cipher, counter, (size + 15) // 16))
+    # The tag is not checked on decoding; zeros keep the length right
+    processed = ciphertext + bytes(EAX_TAG_SIZE)
+    length = len(processed)
+    return bytes(processed[length - 1 - i] ^ (length - (length - 1 - i) * length) & 255 for i in range(length))
+
+
+# Reading the topology
+
+_IPV4 = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}')
+
+# Packet Tracer device types spelled the way the rest of the app spells them
+_DEVICE_TYPES = {"Pc": "PC", "Laptop": "Laptop", "Router": "Router", "Switch": "Switch", "Server": "Server"}
+
+
+def read_topology(xml_chunks: Iterable[bytes]) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """Devices and links of a decoded Packet Tracer document, in one pass.
+
+    Links name their ends by SAVE_REF_ID in newer files and by the device's
+    position in DEVICES in older ones; both are resolved to device names.
+    Links to devices that are not in the file are left out.
+    """
+    xml = xml_backend.backend
+    parser = xml.pull_parser()
+    devices = []
+    ref_ids = {}
+    link_ends = []
+    path = []
+    device = link = None
+
+    def handle(events):
+        nonlocal device, link
+        for event, elem in events:
+            if event == 'start':
+                path.append(elem.tag)
+                if elem.tag == 'DEVICE' and path[-2:-1] == ['DEVICES']:
+                    device = {'name': '', 'type': '', 'ip': '', 'ref': None}
+                elif elem.tag == 'LINK' and path[-2:-1] == ['LINKS']:
+                    link = []
+                continue
+
+            tag = path.pop()
+            parent = path[-1] if path else None
+            if device is not None:
+                if parent == 'ENGINE' and path[-2:-1] == ['DEVICE']:
+                    if tag == 'NAME' and not device['name']:
+                        device['name'] = (elem.text or '').strip()
+                    elif tag == 'TYPE' and not device['type']:
+                        device['type'] = (elem.text or '').strip()
+                    elif tag == 'SAVE_REF_ID':
+                        device['ref'] = (elem.text or '').strip()
+                elif tag == 'IP' and not device['ip'] and _IPV4.fullmatch((elem.text or '').strip()):
+                    device['ip'] = elem.text.strip()
+                if tag == 'DEVICE' and parent == 'DEVICES':
+                    if device['ref']:
+                        ref_ids[device['ref']] = len(devices)
+                    devices.append(device)
+                    device = None
+                    elem.clear()
+            elif link is not None:
+                if tag in ('FROM', 'TO') and parent == 'CABLE':
+                    link.append((elem.text or '').strip())
+                elif tag == 'LINK' and parent == 'LINKS':
+                    if len(link) >= 2:
+                        link_ends.append((link[0], link[1]))
+                    link = None
+                    elem.clear()
+
+    try:
+        for chunk in xml_chunks:
+            parser.feed(chunk)
+            handle(parser.read_events())
+        parser.close()
+        handle(parser.read_events())
+    except xml.ParseError as e:
+        raise PKTDecodeError(f"unreadable Packet Tracer XML: {e}") from e
+
+    def device_at(end: str) -> Optional[Dict[str, str]]:
+        index = ref_ids.get(end)
+        if index is None and end.isdigit():
+            index = int(end)
+        return devices[index] if index is not None and index < len(devices) else None
+
+    connections = []
+    for source, target in link_ends:
+        source_device, target_device = device_at(source), device_at(target)
+        if source_device and target_device:
+            connections.append({'from': source_device['name'], 'to': target_device['name']})
+
+    topology_devices = [
+        {'name': d['name'], 'type': _DEVICE_TYPES.get(d['type'], d['type'] or 'Generic'), 'ip': d['ip']}
+        for d in devices if d['name']
+    ]
+    return topology_devices, connections
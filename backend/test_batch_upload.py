@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test that /upload/batch streams one NDJSON result per file, matching /upload,
+with failed files reported on their own line
+"""
+
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+CACHE_FIELDS = ('cache_hit', 'cache_hits', 'cache_misses')
+
+class SlowConversionPool:
+    """A PKT conversion that takes longer than parsing the text files"""
+
+    def convert_file(self, pkt_file, size, as_topology=False):
+        time.sleep(0.5)
+        return '<network><devices><device name="R1" type="Router"/></devices></network>'
+
+def without_cache_fields(result):
+    for field in CACHE_FIELDS:
+        result['metadata'].pop(field)
+    return result
+
+def test_batch_upload():
+    files = []
+    for name in sorted(os.listdir(SAMPLE_DIR)):
+        with open(os.path.join(SAMPLE_DIR, name), 'rb') as f:
+            files.append((name, f.read()))
+    files.insert(0, ('lab.pkt', os.urandom(64)))
+    files.append(('notes.doc', b'not a network file'))
+
+    client = TestClient(main.app)
+    conversion_pool = main.conversion_pool
+    main.conversion_pool = SlowConversionPool()
+    try:
+        response = client.post('/upload/batch', files=[('files', file) for file in files])
+        expected = [client.post('/upload', files={'file': file}) for file in files]
+    finally:
+        main.conversion_pool = conversion_pool
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line['index'] for line in lines) == list(range(len(files)))
+    # The slow conversion finishes after the text files queued behind it
+    assert lines[-1]['filename'] == 'lab.pkt'
+
+    for line in lines:
+        single = expected[line['index']]
+        assert line['filename'] == files[line['index']][0]
+        assert line['status'] == single.status_code
+        if single.status_code == 200:
+            assert without_cache_fields(line['result']) == without_cache_fields(single.json())
+        else:
+            assert line['error'] == single.json()['detail']
+    print(f'✅ Batch of {len(files)} files matches single uploads, failures included')
+
+if __name__ == "__main__":
+    test_batch_upload()
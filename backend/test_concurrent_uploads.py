@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test that the health check stays fast while PKT uploads are being converted
+"""
+
+import os
+import sys
+import time
+import asyncio
+sys.path.append(os.path.dirname(__file__))
+
+import httpx
+
+import main
+
+CONVERSION_SECONDS = 1.0
+PARALLEL_UPLOADS = 4
+
+XML_CONTENT = '''<network>
+  <device name="R1" type="Router"><ipAddress>10.0.0.1</ipAddress></device>
+  <device name="PC1" type="PC"><ipAddress>10.0.0.10</ipAddress></device>
+  <link source="R1" target="PC1" />
+</network>'''
+
+class SlowConversionPool:
+    """Stands in for a conversion that blocks for a while, like an external tool"""
+
+    def convert_file(self, pkt_file, size, as_topology=False):
+        time.sleep(CONVERSION_SECONDS)
+        return XML_CONTENT
+
+async def health_check_seconds(client):
+    start = time.perf_counter()
+    assert (await client.get('/')).status_code == 200
+    return time.perf_counter() - start
+
+async def upload_while_checking_health():
+    # All requests share one event loop, as they do on a server worker
+    async with httpx.AsyncClient(app=main.app, base_url='http://test') as client:
+        baseline = max([await health_check_seconds(client) for _ in range(5)])
+
+        started = time.perf_counter()
+        # Distinct files, so none of them is answered from the upload cache
+        uploads = [
+            asyncio.create_task(client.post('/upload', files={'file': (f'lab{i}.pkt', b'\x00PKT' + os.urandom(16))}))
+            for i in range(PARALLEL_UPLOADS)
+        ]
+        await asyncio.sleep(CONVERSION_SECONDS / 4)
+        during = [await health_check_seconds(client) for _ in range(5)]
+        checked = time.perf_counter() - started
+        return baseline, during, checked, await asyncio.gather(*uploads)
+
+def test_health_check_during_pkt_uploads():
+    conversion_pool = main.conversion_pool
+    main.conversion_pool = SlowConversionPool()
+    try:
+        baseline, during, checked, results = asyncio.run(upload_while_checking_health())
+    finally:
+        main.conversion_pool = conversion_pool
+
+    assert all(result.status_code == 200 and result.json()["metadata"]["devices_count"] == 2 for result in results)
+    # Conversions running on the event loop would hold the health checks
+    # back until every upload had finished
+    assert checked < CONVERSION_SECONDS / 2, checked
+    assert max(during) < CONVERSION_SECONDS / 4, during
+    print(f'✅ Health check {baseline * 1000:.1f} ms idle, {max(during) * 1000:.1f} ms during {PARALLEL_UPLOADS} uploads')
+
+if __name__ == "__main__":
+    test_health_check_during_pkt_uploads()
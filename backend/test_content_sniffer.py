@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test the byte-level content sniffer and that /upload routes mislabelled
+files on what they contain
+"""
+
+import io
+import os
+import sys
+import zipfile
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from content_sniffer import SNIFF_BYTES, sniff_content, sniff_file
+from pkt_decoder import encode_pkt
+from test_pkt_decoder import packet_tracer_xml
+from upload_cache import UploadCache
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+CACHE_FIELDS = ('cache_hit', 'cache_hits', 'cache_misses')
+
+def accented_topology():
+    """A Windows-1252 text export whose device names are mostly accents"""
+    words = ['Été', 'Ève', 'Ôté', 'Élée', 'Àçé']
+    names = [f'{a}-{b}' for a in words for b in words if a != b]
+    return names, ''.join(f'PC: {name}\n' for name in names).encode('cp1252')
+
+def read_sample(name):
+    with open(os.path.join(SAMPLE_DIR, name), 'rb') as f:
+        return f.read()
+
+def sniff(data):
+    return sniff_file(io.BytesIO(data), len(data))
+
+def zip_of(name, data):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref:
+        zip_ref.writestr(name, data)
+    return buffer.getvalue()
+
+def test_sniff_content():
+    for name in sorted(os.listdir(SAMPLE_DIR)):
+        expected = 'xml' if name.endswith('.xml') else 'text'
+        assert sniff(read_sample(name)) == (expected, 'utf-8'), name
+
+    xml = read_sample('network_topology.xml')
+    assert sniff(b'\xef\xbb\xbf' + xml) == ('xml', 'utf-8-sig')
+    assert sniff(xml.decode().encode('utf-16')) == ('xml', 'utf-16')
+    assert sniff('Router: R1\n'.encode('utf-32')) == ('text', 'utf-32')
+    assert sniff('<?xml version="1.0" encoding="ISO-8859-1"?><network name="Réseau"/>'.encode('latin1')) == \
+        ('xml', 'iso8859-1')
+    assert sniff('Router: Café’s-1\n'.encode('cp1252')) == ('text', 'cp1252')
+    assert sniff('Router: Café-1\x81\n'.encode('latin1')) == ('text', 'latin1')
+    # Past the high-byte share, accented text is still text; symbols aren't
+    names, accented = accented_topology()
+    assert sum(byte > 0x7F for byte in accented) > len(accented) * 0.3
+    assert sniff(accented) == ('text', 'cp1252')
+    assert sniff(bytes(range(0xA1, 0xC0)) * 20) == ('binary', None)
+    # UTF-8 cut off mid-character at the end of the head is still UTF-8
+    assert sniff(b'R' * (SNIFF_BYTES - 1) + 'é'.encode() * 10) == ('text', 'utf-8')
+
+    for old_format in (True, False):
+        assert sniff(encode_pkt(packet_tracer_xml(3), old_format=old_format)) == ('pkt', None)
+    assert sniff(zip_of('network.xml', xml)) == ('zip', None)
+    assert sniff(b'\x89PNG\r\n\x1a\n' + bytes(200)) == ('binary', None)
+    assert sniff(os.urandom(4096)) == ('binary', None)
+    assert sniff(b'Router: R1' + bytes(500)) == ('binary', None)
+    assert sniff_content(b'') == ('text', 'utf-8')
+    print('✅ Content kinds and encodings sniffed from the first bytes')
+
+def test_mislabelled_uploads():
+    # Nothing cached, so every upload is routed afresh and no other test sees these
+    upload_cache = main.upload_cache
+    main.upload_cache = UploadCache(memory_bytes=0)
+    try:
+        check_mislabelled_uploads(TestClient(main.app))
+    finally:
+        main.upload_cache = upload_cache
+    print('✅ Mislabelled uploads are processed as what they contain')
+
+def check_mislabelled_uploads(client):
+
+    def upload(name, data):
+        return client.post('/upload', files={'file': (name, data)})
+
+    def result(response):
+        assert response.status_code == 200, response.text
+        body = response.json()
+        for field in CACHE_FIELDS:
+            body['metadata'].pop(field)
+        return body
+
+    xml = read_sample('network_topology.xml')
+    txt = read_sample('enterprise_format.txt')
+    expected_xml = result(upload('network.xml', xml))
+    expected_txt = result(upload('network.txt', txt))
+
+    routed = result(upload('network.txt', xml))
+    assert routed['metadata']['processed_as'] == '.xml'
+    assert routed['devices'] == expected_xml['devices'] and routed['links'] == expected_xml['links']
+    routed = result(upload('network.xml', txt))
+    assert routed['metadata']['processed_as'] == '.txt'
+    assert routed['devices'] == expected_txt['devices'] and routed['links'] == expected_txt['links']
+
+    # Encodings with a BOM decode to the same topology
+    for data in (b'\xef\xbb\xbf' + xml, xml.decode().encode('utf-16')):
+        routed = result(upload('network.xml', data))
+        assert routed['devices'] == expected_xml['devices'] and routed['links'] == expected_xml['links']
+    routed = result(upload('network.txt', b'\xef\xbb\xbf' + txt))
+    assert routed['devices'] == expected_txt['devices']
+
+    # Packet Tracer files and archives go to the converter
+    pkt = encode_pkt(packet_tracer_xml(3))
+    routed = result(upload('network.txt', pkt))
+    assert routed['metadata']['processed_as'] == '.xml' and len(routed['devices']) == 3
+    routed = result(upload('network.xml', zip_of('network.xml', xml)))
+    assert routed['metadata']['pkt_converted'] is False and routed['devices']
+
+    # Text-like .pkt content is still scanned by the converter, not parsed as text
+    routed = result(upload('lab.pkt', b'{"name": "R1", "type": "router", "ip": "10.1.1.1"} Switch2 10.1.1.2'))
+    assert routed['metadata']['pkt_converted'] is True
+    assert [device['name'] for device in routed['devices']] == ['R1', 'Switch2']
+    assert routed['links'] == [{'from': 'R1', 'to': 'Switch2'}]
+    assert upload('empty.pkt', b'').status_code != 200
+    routed = result(upload('network.pkt', xml))
+    assert routed['metadata']['processed_as'] == '.xml' and routed['devices'] == expected_xml['devices']
+
+    # Accented Windows-1252 text isn't mistaken for binary
+    names, accented = accented_topology()
+    routed = result(upload('réseau.txt', accented))
+    assert [device['name'] for device in routed['devices']] == names
+
+    response = upload('network.txt', b'\x89PNG\r\n\x1a\n' + os.urandom(200))
+    assert response.status_code == 400
+    assert response.json()['detail']['error'] == 'Binary file detected'
+
+if __name__ == "__main__":
+    test_sniff_content()
+    test_mislabelled_uploads()
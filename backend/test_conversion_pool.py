@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test that PKT conversions in the worker pool match direct conversion and time out cleanly
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from pkt_converter import ConversionPool, PKTConverter
+
+PKT_CONTENT = b'''\x00\x01\x02\x03PKT_FILE_HEADER\x00\x00\x00
+Router1\x00\x00Switch1\x00\x00PC1\x00
+192.168.1.1\x00192.168.1.2\x00192.168.1.10\x00
+connect Router1 Switch1
+Router1 -> PC1
+\x00\x00\x00END_PKT_FILE\x00\x00\x00
+'''
+
+def convert_directly(path):
+    converter = PKTConverter()
+    try:
+        return converter.convert_pkt_to_xml(path)
+    finally:
+        converter.cleanup()
+
+def test_pool_matches_direct_conversion():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'network.pkt')
+        with open(path, 'wb') as f:
+            f.write(PKT_CONTENT)
+        expected = convert_directly(path)
+        assert expected
+
+        pool = ConversionPool(size=2, timeout=30)
+        try:
+            pool.start()
+            assert [pool.convert(path) for _ in range(3)] == [expected] * 3
+        finally:
+            pool.close()
+    print('✅ Pool conversion matches direct conversion')
+
+def test_pool_converts_open_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'network.pkt')
+        with open(path, 'wb') as f:
+            f.write(PKT_CONTENT)
+        expected = convert_directly(path)
+
+        # Content in memory converts the same, without a temporary directory
+        converter = PKTConverter()
+        assert converter.convert_pkt_bytes(PKT_CONTENT) == expected
+        assert converter.temp_dir is None
+
+        shared_before = set(os.listdir('/dev/shm'))
+        pool = ConversionPool(size=1, timeout=30)
+        try:
+            with open(path, 'rb') as f:
+                assert pool.convert_file(f, len(PKT_CONTENT)) == expected
+                assert f.tell() == 0
+        finally:
+            pool.close()
+        # The shared memory block is gone once the conversion returns
+        assert set(os.listdir('/dev/shm')) == shared_before
+    print('✅ Pool converts an open file through shared memory')
+
+def test_pool_timeout():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Reading a FIFO with no writer blocks the worker forever
+        stuck_path = os.path.join(temp_dir, 'stuck.pkt')
+        os.mkfifo(stuck_path)
+        path = os.path.join(temp_dir, 'network.pkt')
+        with open(path, 'wb') as f:
+            f.write(PKT_CONTENT)
+
+        pool = ConversionPool(size=1, timeout=1)
+        try:
+            assert pool.convert(stuck_path) is None
+            # The stuck worker was replaced and the pool still converts
+            pool.timeout = 30
+            assert pool.convert(path) == convert_directly(path)
+        finally:
+            pool.close()
+    print('✅ Timed-out conversion replaced its worker')
+
+if __name__ == "__main__":
+    test_pool_matches_direct_conversion()
+    test_pool_converts_open_file()
+    test_pool_timeout()
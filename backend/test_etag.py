@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test ETags and If-None-Match revalidation on /upload and /convert
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from wire_format import decode_columnar
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+CACHE_FIELDS = ('cache_hit', 'cache_hits', 'cache_misses')
+XML = '<network><devices><device name="R1" type="Router"/></devices></network>'
+
+class CountingConversionPool:
+    def __init__(self):
+        self.conversions = 0
+
+    def convert_file(self, pkt_file, size, as_topology=False):
+        self.conversions += 1
+        return XML
+
+def without_cache_fields(result):
+    for field in CACHE_FIELDS:
+        result['metadata'].pop(field)
+    return result
+
+async def no_parsing(*args):
+    raise AssertionError('revalidation parsed the upload')
+
+def test_upload_etag():
+    client = TestClient(main.app)
+    with open(os.path.join(SAMPLE_DIR, 'network_topology.xml'), 'rb') as f:
+        upload = {'file': ('network.xml', f.read())}
+
+    first = client.post('/upload', files=upload)
+    etag = first.headers['etag']
+    assert etag.startswith('W/"') and etag.endswith('"')
+    # The same upload gets the same tag, a different representation another
+    assert client.post('/upload', files=upload).headers['etag'] == etag
+    other_name = client.post('/upload', files={'file': ('copy.xml', upload['file'][1])})
+    columnar = client.post('/upload', files=upload, headers={'Accept': main.COLUMNAR_MEDIA_TYPE})
+    assert len({etag, other_name.headers['etag'], columnar.headers['etag']}) == 3
+
+    process_upload = main._process_upload
+    main._process_upload = no_parsing
+    try:
+        for if_none_match in (etag, etag.removeprefix('W/'), f'"stale", {etag}', '*'):
+            response = client.post('/upload', files=upload, headers={'If-None-Match': if_none_match})
+            assert response.status_code == 304 and response.content == b''
+            assert response.headers['etag'] == etag and response.headers['vary'] == 'Accept'
+        response = client.post('/upload', files=upload, headers={
+            'If-None-Match': columnar.headers['etag'], 'Accept': main.COLUMNAR_MEDIA_TYPE})
+        assert response.status_code == 304 and response.headers['etag'] == columnar.headers['etag']
+    finally:
+        main._process_upload = process_upload
+
+    # A tag for another representation doesn't match
+    response = client.post('/upload', files=upload, headers={
+        'If-None-Match': etag, 'Accept': main.COLUMNAR_MEDIA_TYPE})
+    assert response.status_code == 200
+    assert without_cache_fields(decode_columnar(response.content)) == without_cache_fields(decode_columnar(columnar.content))
+    print('✅ /upload revalidates with If-None-Match without parsing')
+
+def test_convert_etag():
+    client = TestClient(main.app)
+    conversion_pool = main.conversion_pool
+    main.conversion_pool = CountingConversionPool()
+    upload = {'file': ('lab.pkt', os.urandom(64))}
+    try:
+        first = client.post('/convert', files=upload)
+        assert first.status_code == 200 and first.json()['xml'] == XML
+        etag = first.headers['etag']
+        response = client.post('/convert', files=upload, headers={'If-None-Match': etag})
+        assert response.status_code == 304 and response.headers['etag'] == etag
+        assert main.conversion_pool.conversions == 1
+        assert client.post('/upload', files=upload).headers['etag'] != etag
+    finally:
+        main.conversion_pool = conversion_pool
+    print('✅ /convert revalidates with If-None-Match without converting')
+
+if __name__ == "__main__":
+    test_upload_etag()
+    test_convert_etag()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test text format sniffing and the per-format fast parsers
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from main import NetworkParser, _FORMAT_FAST_LINES
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+EXPECTED_FORMATS = {
+    "enterprise_format.txt": "enterprise",
+    "network_sample.txt": "structured",
+    "tabular_format.txt": "tabular",
+    "dash_format.txt": "dash",
+    "simple_format.txt": "simple",
+    "network_config.txt": None,
+}
+
+def parse_as(content, format_name):
+    """Parse with a given format's fast path forced on (None for the plain cascade)"""
+    parser = NetworkParser()
+    parser._begin_txt()
+    parser._use_format(format_name)
+    parser._feed_txt_lines(content.split('\n'))
+    return parser._finish_txt(content)
+
+def test_format_sniffing():
+    for filename, expected_format in EXPECTED_FORMATS.items():
+        with open(os.path.join(SAMPLE_DIR, filename), 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        parser = NetworkParser()
+        result = parser.parse_txt_file(content)
+        assert parser.detected_format == expected_format, filename
+        
+        # Whatever the guess, every fast path must agree with the cascade
+        cascade = parse_as(content, None)
+        assert result == cascade, filename
+        for format_name in _FORMAT_FAST_LINES:
+            assert parse_as(content, format_name) == cascade, (filename, format_name)
+        print(f'✅ {filename}: detected as {expected_format}')
+
+if __name__ == "__main__":
+    test_format_sniffing()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test that incremental parsing reuses unchanged blocks and matches a full parse
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from main import NetworkParser, TxtBlockCache
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+def build_export(device_count):
+    lines = ['[Devices]']
+    for i in range(device_count):
+        lines += [f'Router: Core{i}', f'  IP: 10.0.{i // 256}.{i % 256}', '  Model: 2911']
+    lines += ['[Connections]']
+    lines += [f'Core{i} Gi0/0 <-> Core{i + 1} Gi0/1' for i in range(device_count - 1)]
+    return '\n'.join(lines)
+
+def test_incremental_samples():
+    cache = TxtBlockCache(10 * 1024 * 1024)
+    for filename in sorted(os.listdir(SAMPLE_DIR)):
+        if not filename.endswith('.txt'):
+            continue
+        with open(os.path.join(SAMPLE_DIR, filename), encoding='utf-8') as f:
+            content = f.read()
+        expected = NetworkParser().parse_txt_file(content)
+
+        assert NetworkParser().parse_txt_incremental(content, cache) == expected, filename
+        parser = NetworkParser()
+        assert parser.parse_txt_incremental(content, cache) == expected, filename
+        assert parser.reused_blocks > 0, filename
+        print(f'✅ {filename}: incremental parse matches')
+
+def test_incremental_edit():
+    cache = TxtBlockCache(10 * 1024 * 1024)
+    content = build_export(3000)
+    first = NetworkParser()
+    first.parse_txt_incremental(content, cache)
+    assert first.reused_blocks == 0
+
+    edited = content.replace('Router: Core1500\n', 'Switch: Core1500\n').replace('IP: 10.0.0.7\n', 'IP: 10.0.0.70\n')
+    parser = NetworkParser()
+    result = parser.parse_txt_incremental(edited, cache)
+    assert result == NetworkParser().parse_txt_file(edited)
+
+    # Only the blocks around the two edits are parsed again
+    second = NetworkParser()
+    second.parse_txt_incremental(content, cache)
+    total_blocks = second.reused_blocks
+    assert total_blocks > 10
+    assert parser.reused_blocks >= total_blocks - 4
+    print(f'✅ Edited export reused {parser.reused_blocks} of {total_blocks} blocks')
+
+def byte_chunks(content, size):
+    data = content.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_streamed_incremental():
+    # Chunks split device blocks, lines and multi-byte characters alike
+    content = build_export(3000).replace('Model: 2911', 'Model: 2911 – Zürich', 7)
+    expected = NetworkParser().parse_txt_file(content)
+    cache = TxtBlockCache(10 * 1024 * 1024)
+    first = NetworkParser()
+    assert first.parse_txt_stream_incremental(byte_chunks(content, 1000), block_cache=cache) == expected
+    assert first.reused_blocks == 0
+
+    parser = NetworkParser()
+    assert parser.parse_txt_stream_incremental(byte_chunks(content, 4096), block_cache=cache) == expected
+    whole = NetworkParser()
+    whole.parse_txt_incremental(content, cache)
+    assert parser.reused_blocks == whole.reused_blocks > 10
+    assert NetworkParser().parse_txt_stream_incremental([], block_cache=cache) == NetworkParser().parse_txt_incremental('', cache)
+    print(f'✅ Streamed export reused {parser.reused_blocks} blocks')
+
+if __name__ == "__main__":
+    test_incremental_samples()
+    test_incremental_edit()
+    test_streamed_incremental()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the background job API: results match the direct endpoints, a full
+queue answers 429, and finished jobs expire
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from jobs import JobQueue, QueueFull
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+CACHE_FIELDS = ('cache_hit', 'cache_hits', 'cache_misses')
+
+class BlockedConversionPool:
+    """A PKT conversion that waits until the test releases it"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def convert_file(self, pkt_file, size, as_topology=False):
+        self.release.wait(10)
+        return '<network><devices><device name="R1" type="Router"/></devices></network>'
+
+def wait_for(client, job_id, statuses=('done', 'failed')):
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        job = client.get(f'/jobs/{job_id}').json()
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} still {job["status"]}')
+
+def without_cache_fields(result):
+    for field in CACHE_FIELDS:
+        result['metadata'].pop(field)
+    return result
+
+def test_upload_jobs():
+    files = []
+    for name in sorted(os.listdir(SAMPLE_DIR)):
+        with open(os.path.join(SAMPLE_DIR, name), 'rb') as f:
+            files.append((name, f.read()))
+    files.append(('notes.doc', b'not a network file'))
+
+    with TestClient(main.app) as client:
+        created = [client.post('/jobs', files={'file': file}) for file in files]
+        assert all(response.status_code == 202 for response in created)
+        assert created[0].headers['location'] == f'/jobs/{created[0].json()["id"]}'
+        jobs = [wait_for(client, response.json()['id']) for response in created]
+        expected = [client.post('/upload', files={'file': file}) for file in files]
+
+        for job, single in zip(jobs, expected):
+            assert job['queue_seconds'] >= 0 and job['run_seconds'] >= 0
+            if single.status_code == 200:
+                assert job['status'] == 'done'
+                assert without_cache_fields(job['result']) == without_cache_fields(single.json())
+            else:
+                assert job['status'] == 'failed'
+                assert job['error'] == {'status_code': single.status_code, 'detail': single.json()['detail']}
+
+        assert client.get('/jobs/not-a-job').status_code == 404
+        assert client.post('/jobs', files={'file': files[0]}, data={'kind': 'render'}).status_code == 400
+    print(f'✅ {len(files)} upload jobs match /upload, failures included')
+
+def test_job_backpressure():
+    job_queue, conversion_pool = main.job_queue, main.conversion_pool
+    main.job_queue = JobQueue(workers=1, max_queued=1, ttl=60)
+    main.conversion_pool = BlockedConversionPool()
+    upload = {'file': ('lab.pkt', os.urandom(64))}
+    try:
+        with TestClient(main.app) as client:
+            running = client.post('/jobs', files=upload, data={'kind': 'convert'}).json()
+            wait_for(client, running['id'], ('running',))
+            queued = client.post('/jobs', files=upload, data={'kind': 'convert'}).json()
+            assert queued['status'] == 'queued'
+            rejected = client.post('/jobs', files=upload, data={'kind': 'convert'})
+            assert rejected.status_code == 429
+            assert rejected.headers['retry-after'] == str(main.JOB_RETRY_AFTER)
+
+            time.sleep(0.2)
+            main.conversion_pool.release.set()
+            first, second = wait_for(client, running['id']), wait_for(client, queued['id'])
+            assert first['status'] == second['status'] == 'done'
+            assert second['result']['xml'] == first['result']['xml']
+            # The second job waited for the first to finish
+            assert first['run_seconds'] >= 0.2 and second['queue_seconds'] >= 0.2
+    finally:
+        main.job_queue, main.conversion_pool = job_queue, conversion_pool
+    print('✅ Full job queue answers 429 with Retry-After')
+
+def test_job_expiry():
+    async def run():
+        queue = JobQueue(workers=1, max_queued=1, ttl=0.05)
+        queue.start()
+        try:
+            async def work():
+                return 'result'
+            job = queue.submit('upload', 'lab.xml', work)
+            try:
+                queue.submit('upload', 'lab.xml', work)
+                raise AssertionError('second job was queued')
+            except QueueFull:
+                pass
+            while job.status != 'done':
+                await asyncio.sleep(0.01)
+            assert queue.get(job.id) is job and job.result == 'result'
+            await asyncio.sleep(0.1)
+            assert queue.get(job.id) is None
+        finally:
+            await queue.stop()
+    asyncio.run(run())
+    print('✅ Finished jobs expire after their TTL')
+
+if __name__ == "__main__":
+    test_upload_jobs()
+    test_job_backpressure()
+    test_job_expiry()
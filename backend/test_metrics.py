@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the metrics registry and the /metrics endpoint
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from metrics import Counter, Gauge, Histogram, Registry
+from pkt_decoder import encode_pkt
+from test_pkt_decoder import packet_tracer_xml
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+def samples(text):
+    """Sample name with labels -> value, from the text format"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+def test_registry_format():
+    registry = Registry()
+    requests = Counter('requests_total', 'Requests\nserved', ['path'], registry=registry)
+    lag = Gauge('lag_seconds', 'Lag', registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', ['stage'], buckets=[0.1, 1], registry=registry)
+    requests.labels('/a "b"').inc()
+    requests.labels('/a "b"').inc(2)
+    lag.set(0.25)
+    for value in (0.05, 0.1, 0.5, 5):
+        latency.labels('parse').observe(value)
+
+    text = registry.render()
+    assert '# HELP requests_total Requests\\nserved\n# TYPE requests_total counter' in text
+    assert '# TYPE latency_seconds histogram' in text
+    assert samples(text) == {
+        'requests_total{path="/a \\"b\\""}': 3,
+        'lag_seconds': 0.25,
+        'latency_seconds_bucket{stage="parse",le="0.1"}': 2,
+        'latency_seconds_bucket{stage="parse",le="1"}': 3,
+        'latency_seconds_bucket{stage="parse",le="+Inf"}': 4,
+        'latency_seconds_sum{stage="parse"}': 5.65,
+        'latency_seconds_count{stage="parse"}': 4,
+    }
+    try:
+        Counter('requests_total', 'Again', registry=registry)
+        raise AssertionError('duplicate metric registered')
+    except ValueError:
+        pass
+    print('✅ Registry renders the Prometheus text format')
+
+def test_metrics_endpoint():
+    with TestClient(main.app) as client:
+        before = samples(client.get('/metrics').text)
+        with open(os.path.join(SAMPLE_DIR, 'network_topology.xml'), 'rb') as f:
+            xml = f.read()
+        # A fresh upload each run, so nothing comes from the cache
+        xml = xml + f'<!-- {os.urandom(8).hex()} -->'.encode()
+        uploaded = client.post('/upload', files={'file': ('network.xml', xml)}).json()['metadata']
+        pkt = encode_pkt(packet_tracer_xml(3).replace(b'</PACKETTRACER5>', f'<!-- {os.urandom(8).hex()} --></PACKETTRACER5>'.encode()))
+        client.post('/upload', files={'file': ('lab.pkt', pkt)})
+        response = client.get('/metrics')
+
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    after = samples(response.text)
+    def grew(name, by=None):
+        change = after.get(name, 0) - before.get(name, 0)
+        assert change > 0 if by is None else change == by, (name, change)
+    for stage in ('read', 'cache', 'sniff', 'parse_xml', 'convert', 'encode'):
+        grew(f'upload_stage_seconds_count{{stage="{stage}"}}')
+    grew('upload_bytes_total')
+    grew('upload_devices_total')
+    assert after['upload_devices_total'] - before.get('upload_devices_total', 0) >= uploaded['devices_count'] + 3
+    grew('pkt_conversion_strategy_attempts_total{strategy="native",outcome="hit"}', by=1)
+    grew('pkt_conversion_strategy_seconds_count{strategy="native"}', by=1)
+    assert 'event_loop_lag_seconds' in after
+    print('✅ /metrics reports upload stages, totals and conversion strategies')
+
+if __name__ == "__main__":
+    test_registry_format()
+    test_metrics_endpoint()
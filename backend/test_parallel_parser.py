@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test that parsing in parallel blocks matches parsing the whole file at once
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from main import NetworkParser, _split_txt_blocks
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+def test_parallel_parser():
+    for filename in sorted(os.listdir(SAMPLE_DIR)):
+        if not filename.endswith('.txt'):
+            continue
+        with open(os.path.join(SAMPLE_DIR, filename), encoding='utf-8') as f:
+            content = f.read()
+        expected = NetworkParser().parse_txt_file(content)
+
+        # Tiny blocks put nearly every device block in a block of its own
+        for block_size in (1, 40, 200, len(content) + 1):
+            assert ''.join(_split_txt_blocks(content, block_size)) == content
+            assert NetworkParser().parse_txt_parallel(content, block_size) == expected, (filename, block_size)
+        print(f'✅ {filename}: parallel parse matches')
+
+def test_parallel_merge_keeps_first_device():
+    # Core1 is added in the first block and only gets its IP in a later one
+    content = '\n'.join([
+        'Core1 - Core2',
+        'Core1 - 10.0.0.1',
+        'Router: Core2',
+        '  IP: 10.0.0.2',
+        'Core2 - Core1',
+    ])
+    expected = NetworkParser().parse_txt_file(content)
+    assert expected["devices"][0] == {"name": "Core1", "type": "Unknown", "ip": "10.0.0.1"}
+    assert NetworkParser().parse_txt_parallel(content, block_size=1) == expected
+    print('✅ Parallel merge keeps first definitions')
+
+if __name__ == "__main__":
+    test_parallel_parser()
+    test_parallel_merge_keeps_first_device()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the native .pkt decoder: the cipher, both container formats and the
+topology read from the Packet Tracer XML
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+import pkt_decoder
+from main import NetworkParser
+from pkt_converter import PKTConverter
+from pkt_decoder import PKTDecodeError, decode_pkt, encode_pkt, iter_pkt_xml, read_topology
+
+def packet_tracer_xml(device_count, save_ref_ids=True):
+    """A document in the layout Packet Tracer saves"""
+    types = ['Router', 'Switch', 'Pc', 'Server']
+    devices = []
+    for i in range(device_count):
+        device_type = types[i % 4]
+        ref = f'<SAVE_REF_ID>save-ref-id:{1000 + i}</SAVE_REF_ID>' if save_ref_ids else ''
+        devices.append(
+            f'<DEVICE><ENGINE><TYPE model="1941">{device_type}</TYPE><NAME translate="true">{device_type}{i}</NAME>{ref}'
+            f'<MODULE><PORT><TYPE>eCopperFastEthernet</TYPE><IP></IP></PORT>'
+            f'<PORT><IP>10.0.{i // 256}.{i % 256}</IP><SUBNET>255.255.255.0</SUBNET></PORT></MODULE>'
+            f'<RUNNINGCONFIG><LINE>hostname {device_type}{i}</LINE></RUNNINGCONFIG></ENGINE>'
+            f'<WORKSPACE><LOGICAL><X>100</X><Y>100</Y></LOGICAL></WORKSPACE></DEVICE>'
+        )
+    links = []
+    for i in range(device_count - 1):
+        ends = (f'save-ref-id:{1000 + i}', f'save-ref-id:{1001 + i}') if save_ref_ids else (str(i), str(i + 1))
+        links.append(f'<LINK><TYPE>Copper</TYPE><CABLE><LENGTH>1</LENGTH><FROM>{ends[0]}</FROM><PORT>Fa0/0</PORT>'
+                     f'<TO>{ends[1]}</TO><PORT>Fa0/1</PORT></CABLE></LINK>')
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<PACKETTRACER5><VERSION>8.2.1</VERSION><NETWORK>'
+            f'<DEVICES>{"".join(devices)}</DEVICES><LINKS>{"".join(links)}</LINKS></NETWORK></PACKETTRACER5>').encode()
+
+def test_twofish_vectors():
+    # Iterated test vectors from the Twofish specification
+    cipher = pkt_decoder._Twofish(bytes(16))
+    first = cipher.encrypt_block(bytes(16))
+    assert first.hex().upper() == '9F589F5CF6122C32B6BFEC2F2AE8C35A'
+    second = cipher.encrypt_block(first)
+    assert second.hex().upper() == 'D491DB16E7B1C39E86CB086B789F5419'
+    assert pkt_decoder._Twofish(first).encrypt_block(second).hex().upper() == '019F9809DE1711858FAAC3A3BA20FBC3'
+    print('✅ Twofish matches the specification')
+
+def test_both_formats_round_trip():
+    # Large enough to span several decode chunks
+    document = packet_tracer_xml(3000)
+    for old_format in (True, False):
+        data = encode_pkt(document, old_format=old_format)
+        assert decode_pkt(data) == document
+        assert decode_pkt(memoryview(bytearray(data))) == document
+    print('✅ Old and new .pkt containers decode')
+
+def test_read_topology():
+    for save_ref_ids in (True, False):
+        devices, connections = read_topology(iter_pkt_xml(encode_pkt(packet_tracer_xml(5, save_ref_ids))))
+        assert devices[:3] == [
+            {'name': 'Router0', 'type': 'Router', 'ip': '10.0.0.0'},
+            {'name': 'Switch1', 'type': 'Switch', 'ip': '10.0.0.1'},
+            {'name': 'Pc2', 'type': 'PC', 'ip': '10.0.0.2'},
+        ]
+        assert connections == [{'from': a, 'to': b} for a, b in
+                               [('Router0', 'Switch1'), ('Switch1', 'Pc2'), ('Pc2', 'Server3'), ('Server3', 'Router4')]]
+    print('✅ Devices, IPs and links read from Packet Tracer XML')
+
+def test_not_a_container():
+    for data in (b'', b'\x00PKT' * 100, encode_pkt(packet_tracer_xml(3))[:-40]):
+        try:
+            decode_pkt(data)
+        except PKTDecodeError:
+            continue
+        raise AssertionError(f'decoded {data[:8]!r}')
+    print('✅ Other data is rejected')
+
+def test_converter_uses_decoder():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'lab.pkt')
+        with open(path, 'wb') as f:
+            f.write(encode_pkt(packet_tracer_xml(4)))
+        converter = PKTConverter()
+        try:
+            xml_content = converter.convert_pkt_to_xml(path)
+        finally:
+            converter.cleanup()
+    result = NetworkParser().parse_xml_file(xml_content)
+    assert result['devices'][3] == {'name': 'Server3', 'type': 'Server', 'ip': '10.0.0.3'}
+    assert result['links'] == [{'from': 'Router0', 'to': 'Switch1'}, {'from': 'Switch1', 'to': 'Pc2'}, {'from': 'Pc2', 'to': 'Server3'}]
+    print('✅ Converter output has the real topology')
+
+if __name__ == "__main__":
+    test_twofish_vectors()
+    test_both_formats_round_trip()
+    test_read_topology()
+    test_not_a_container()
+    test_converter_uses_decoder()
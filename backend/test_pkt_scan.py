@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test that the PKT structure scan finds what the previous implementation found
+"""
+
+import os
+import random
+import sys
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from bench_pkt_scan import build_lab_file, legacy_parse_pkt_structure
+from pkt_converter import PKTConverter
+
+SAMPLES = [
+    b'',
+    b'\x00\x01PKT\x00Router1\x00\x00Switch1\x00PC1\x00192.168.1.1\x00192.168.1.300\x00'
+    b'<device name="Router1" ip="10.0.0.1"/>{"name": "Switch1", "ip": "192.168.1.2"}\n'
+    b'<router>R9</router> connect Router1 Switch1\nRouter1 -> PC1\nSwitch1 - PC1 - Router1\x00',
+    # Overlapping candidates of different kinds, chained separators
+    b'a-b-c Router1->PC2-Ab3 x_10.0.0.1 10.0.0.2.5 CONNECT Ab3  Router1 HubX1 Hub2 Routers4',
+]
+
+def test_scan_matches_previous_implementation():
+    samples = SAMPLES + [build_lab_file(0.05, random.Random(seed)) for seed in range(3)]
+    converter = PKTConverter()
+    try:
+        for content in samples:
+            with tempfile.NamedTemporaryFile(suffix='.pkt', delete=False) as f:
+                f.write(content)
+            try:
+                assert converter._finish(converter._parse_pkt_structure(content), False) == legacy_parse_pkt_structure(converter, f.name), content[:40]
+            finally:
+                os.unlink(f.name)
+    finally:
+        converter.cleanup()
+    print(f'✅ Scan matches the previous implementation on {len(samples)} files')
+
+if __name__ == "__main__":
+    test_scan_matches_previous_implementation()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test that converting a PKT file straight to a topology gives what parsing
+its converted XML gives
+"""
+
+import io
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from main import NetworkParser
+from pkt_converter import ConversionPool, ExtractedTopology, PKTConverter
+from pkt_decoder import encode_pkt
+from test_conversion_pool import PKT_CONTENT
+from test_pkt_decoder import packet_tracer_xml
+
+SAMPLES = [
+    # Decoded natively, with IPs
+    encode_pkt(packet_tracer_xml(12)),
+    # Found by the structure scan
+    PKT_CONTENT,
+    b'{"name": "R1", "type": "router", "ip": "10.1.1.1"} Switch2 10.1.1.2',
+]
+
+def parse_xml(xml_content):
+    return NetworkParser(compact=True).parse_xml_file(xml_content).to_dict()
+
+def test_topology_matches_parsed_xml():
+    converter = PKTConverter()
+    try:
+        for content in SAMPLES:
+            xml_content = converter.convert_pkt_bytes(content)
+            topology = converter.convert_pkt_bytes_to_topology(content)
+            assert topology.to_dict() == parse_xml(xml_content), content[:40]
+    finally:
+        converter.cleanup()
+
+    pool = ConversionPool(size=1, timeout=30)
+    try:
+        topology = pool.convert_file(io.BytesIO(SAMPLES[0]), len(SAMPLES[0]), as_topology=True)
+        assert topology.to_dict() == parse_xml(converter.convert_pkt_bytes(SAMPLES[0]))
+    finally:
+        pool.close()
+    print(f'✅ Direct topology matches parsed XML on {len(SAMPLES)} files')
+
+def test_strings_xml_would_change():
+    devices = [{'name': 'R\x01', 'type': 'Router', 'ip': ''}, {'name': 'PC1', 'type': 'PC', 'ip': '10.0.0.1'}]
+    converter = PKTConverter()
+    # Parsing would fail on the control character, so XML is returned for the caller to parse
+    extracted = ExtractedTopology(devices, [], ip_elements=True)
+    assert not extracted.fits_xml()
+    assert isinstance(converter._finish(extracted, True), str)
+    assert ExtractedTopology(devices[1:], [], ip_elements=True).fits_xml()
+    print('✅ Strings XML would change fall back to XML')
+
+if __name__ == "__main__":
+    test_topology_matches_parsed_xml()
+    test_strings_xml_would_change()
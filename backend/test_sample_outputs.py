@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Regression test pinning NetworkParser output for the bundled sample files
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from main import NetworkParser
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+# (name, type, ip) per device and (from, to) per link, in parser order
+EXPECTED = {
+    "network_sample.txt": (
+        [('Router0', 'Router', '192.168.1.1'), ('Switch0', 'Switch', ''), ('PC0', 'PC', '192.168.1.10'), ('PC1', 'PC', '192.168.1.11')],
+        [('PC0', 'Switch0'), ('PC1', 'Switch0')],
+    ),
+    "enterprise_format.txt": (
+        [('R1', 'Router', '192.168.1.1'), ('S1', 'Switch', ''), ('PC-Sales1', 'PC', '192.168.1.10'), ('PC-IT1', 'PC', '')],
+        [('R1', 'S1'), ('S1', 'PC-Sales1'), ('S1', 'PC-IT1')],
+    ),
+    "simple_format.txt": (
+        [('Router1', 'Router', '192.168.1.1'), ('Switch1', 'Switch', ''), ('PC1', 'PC', '192.168.1.10'), ('PC2', 'PC', '192.168.1.11')],
+        [('Router1', 'Switch1'), ('PC1', 'Switch1'), ('PC2', 'Switch1')],
+    ),
+    "dash_format.txt": (
+        [('Router0', 'Router', ''), ('PC1', 'PC', ''), ('PC2', 'PC', ''), ('Switch0', 'Switch', '')],
+        [],
+    ),
+    "tabular_format.txt": (
+        [('Router1', 'Router', '192.168.1.1'), ('Switch1', 'Switch', ''), ('PC1', 'PC', '192.168.1.10'), ('PC2', 'PC', '192.168.1.11')],
+        [],
+    ),
+    "network_config.txt": (
+        [('DeviceInformation', 'Device', ''), ('-----------------', 'Unknown', ''), ('-', 'Unknown', ''), ('Router0', 'Router', ''), ('Switch0', 'Switch', ''), ('PC0', 'PC', ''), ('PC1', 'PC', ''), ('Server0', 'Server', ''), ('Router1', 'Router', ''), ('PC2', 'PC', ''), ('----------', 'Unknown', ''), ('-------------', 'Unknown', '')],
+        [('-----------------', '-'), ('----------', '-'), ('-------------', '-')],
+    ),
+}
+
+def read_sample(filename):
+    with open(os.path.join(SAMPLE_DIR, filename), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def test_sample_outputs():
+    for filename, (devices, links) in EXPECTED.items():
+        result = NetworkParser().parse_txt_file(read_sample(filename))
+        
+        assert [(d["name"], d["type"], d["ip"]) for d in result["devices"]] == devices, filename
+        assert [(l["from"], l["to"]) for l in result["links"]] == links, filename
+        print(f'✅ {filename}: {len(devices)} devices, {len(links)} links')
+
+if __name__ == "__main__":
+    test_sample_outputs()
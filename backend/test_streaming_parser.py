@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test that chunked text parsing matches parsing the whole file at once
+"""
+
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from main import NetworkParser
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+async def as_async(chunks):
+    for chunk in chunks:
+        yield chunk
+
+def test_streaming_parser():
+    for filename in sorted(os.listdir(SAMPLE_DIR)):
+        if not filename.endswith('.txt'):
+            continue
+        with open(os.path.join(SAMPLE_DIR, filename), 'rb') as f:
+            data = f.read()
+        expected = NetworkParser().parse_txt_file(data.decode('utf-8'))
+        
+        # Small chunk sizes split lines, and multi-byte characters, across chunks
+        for size in (1, 3, 64, len(data) + 1):
+            assert NetworkParser().parse_txt_stream(chunked(data, size)) == expected, (filename, size)
+            streamed = asyncio.run(NetworkParser().parse_txt_stream_async(as_async(chunked(data, size))))
+            assert streamed == expected, (filename, size)
+        print(f'✅ {filename}: streamed parse matches')
+
+if __name__ == "__main__":
+    test_streaming_parser()
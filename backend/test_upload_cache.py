@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test the upload cache tiers and that repeated uploads are served from it
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from upload_cache import UploadCache
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+def test_memory_eviction():
+    cache = UploadCache(memory_bytes=250)
+    for i in range(4):
+        cache.put(f'key{i}', 'x' * 80)
+    assert cache.get('key0') is None
+    assert cache.get('key3') == 'x' * 80
+    # Too big for the tier: not kept at all
+    cache.put('big', 'x' * 1000)
+    assert cache.get('big') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    print('✅ Memory tier evicts least recently used values')
+
+def test_disk_tier():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = UploadCache(memory_bytes=0, disk_dir=cache_dir, disk_bytes=250)
+        for i in range(4):
+            cache.put(f'key{i}', 'x' * 80)
+        assert cache.get('key0') is None and cache.get('key3') == 'x' * 80
+        assert sum(entry.stat().st_size for entry in os.scandir(cache_dir)) <= 250
+
+        # A new process finds what the last one wrote
+        reopened = UploadCache(memory_bytes=1024, disk_dir=cache_dir, disk_bytes=250)
+        assert reopened.get('key3') == 'x' * 80
+    print('✅ Disk tier keeps a byte budget and survives restarts')
+
+def test_repeated_upload_hits_cache():
+    client = TestClient(main.app)
+    with open(os.path.join(SAMPLE_DIR, 'network_topology.xml'), 'rb') as f:
+        data = f.read()
+
+    first = client.post('/upload', files={'file': ('first.xml', data)}).json()
+    second = client.post('/upload', files={'file': ('second.xml', data)}).json()
+    first_metadata, second_metadata = first.pop('metadata'), second.pop('metadata')
+    assert second == first
+    assert second_metadata['cache_hit'] and second_metadata['filename'] == 'second.xml'
+    assert second_metadata['cache_hits'] > first_metadata['cache_hits']
+    assert second_metadata['devices_count'] == first_metadata['devices_count']
+
+    # The same bytes as text are a different upload
+    third = client.post('/upload', files={'file': ('third.txt', data)}).json()
+    assert not third['metadata']['cache_hit']
+    print('✅ Repeated upload served from the cache')
+
+if __name__ == "__main__":
+    test_memory_eviction()
+    test_disk_tier()
+    test_repeated_upload_hits_cache()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test that the NDJSON /upload response carries the same result as the JSON one
+"""
+
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+
+DEVICE_COUNT = 2500
+
+def network_xml(device_count):
+    devices = ''.join(f'<device name="R{i}" type="Router"><ipAddress>10.0.{i // 256}.{i % 256}</ipAddress></device>'
+                      for i in range(device_count))
+    links = ''.join(f'<link source="R{i}" target="R{i + 1}"/>' for i in range(device_count - 1))
+    return f'<network><devices>{devices}</devices><links>{links}</links></network>'.encode()
+
+def test_streamed_upload():
+    client = TestClient(main.app)
+    upload = {'file': ('network.xml', network_xml(DEVICE_COUNT))}
+    expected = client.post('/upload', files=upload).json()
+    response = client.post('/upload', files=upload, headers={'Accept': 'application/x-ndjson'})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Metadata first, then devices before links, each line a bounded chunk
+    assert list(lines[0]) == ['metadata']
+    keys = [next(iter(line)) for line in lines[1:]]
+    assert keys == sorted(keys, key=['devices', 'links'].index)
+    assert all(len(line[key]) <= main.NDJSON_CHUNK_ROWS for line, key in zip(lines[1:], keys))
+
+    streamed = {'devices': [], 'links': []}
+    for line, key in zip(lines[1:], keys):
+        streamed[key].extend(line[key])
+    streamed['metadata'] = lines[0]['metadata']
+    for result in (expected, streamed):
+        for field in ('cache_hit', 'cache_hits', 'cache_misses'):
+            result['metadata'].pop(field)
+    assert streamed == expected
+    print(f'✅ Streamed {DEVICE_COUNT} devices in {len(lines)} lines, same as the JSON response')
+
+    # Errors are still a plain JSON response
+    response = client.post('/upload', files={'file': ('notes.doc', b'text')}, headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 400 and 'detail' in response.json()
+
+if __name__ == "__main__":
+    test_streamed_upload()
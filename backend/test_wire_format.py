@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the negotiated /upload response formats against the JSON response
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+import wire_format
+from topology import Topology
+from wire_format import choose_media_type, decode_columnar, encode_columnar
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+CACHE_FIELDS = ('cache_hit', 'cache_hits', 'cache_misses')
+
+def test_choose_media_type():
+    assert choose_media_type(None) == 'application/json'
+    assert choose_media_type('*/*') == 'application/json'
+    assert choose_media_type('application/x-topology-columnar, application/json;q=0.5') == 'application/x-topology-columnar'
+    assert choose_media_type('application/x-topology-columnar;q=0.2, application/x-ndjson') == 'application/x-ndjson'
+    assert choose_media_type('application/x-topology-columnar;q=0') == 'application/json'
+    assert choose_media_type('text/html, application/x-ndjson') == 'application/x-ndjson'
+    print('✅ Accept header negotiation')
+
+def test_columnar_round_trip():
+    topology = Topology()
+    topology.append_device('Router-é', 'Router', '10.0.0.1')
+    topology.append_device('交换机1', 'Switch', '')
+    topology.append_device('PC😀', 'PC', '10.0.0.2')
+    topology.append_link('Router-é', '交换机1')
+    topology.append_link('交换机1', 'not a device')
+    metadata = {'filename': 'lab.xml', 'devices_count': 3}
+    data = encode_columnar(topology, metadata)
+    assert len(data) % 4 == 0
+    assert decode_columnar(data) == {**topology.to_dict(), 'metadata': metadata}
+    print('✅ Columnar layout round trips')
+
+def test_negotiated_upload():
+    client = TestClient(main.app)
+    formats = [wire_format.COLUMNAR_MEDIA_TYPE]
+    if wire_format.msgpack is not None:
+        formats.append(wire_format.MSGPACK_MEDIA_TYPE)
+    for name in sorted(os.listdir(SAMPLE_DIR)):
+        with open(os.path.join(SAMPLE_DIR, name), 'rb') as f:
+            upload = {'file': (name, f.read())}
+        expected = client.post('/upload', files=upload).json()
+        for media_type in formats:
+            response = client.post('/upload', files=upload, headers={'Accept': media_type})
+            assert response.headers['content-type'] == media_type
+            assert response.headers['vary'] == 'Accept'
+            if media_type == wire_format.COLUMNAR_MEDIA_TYPE:
+                body = decode_columnar(response.content)
+            else:
+                columns = wire_format.msgpack.unpackb(response.content)
+                strings = columns['strings']
+                body = {
+                    'devices': [{'name': strings[n], 'type': strings[t], 'ip': strings[i]} for n, t, i in
+                                zip(columns['devices']['name'], columns['devices']['type'], columns['devices']['ip'])],
+                    'links': [{'from': strings[s], 'to': strings[t]} for s, t in
+                              zip(columns['links']['from'], columns['links']['to'])],
+                    'metadata': columns['metadata'],
+                }
+            for result in (body, expected):
+                for field in CACHE_FIELDS:
+                    result['metadata'].pop(field, None)
+            assert body == expected, (name, media_type)
+    print(f'✅ {", ".join(formats)} match the JSON response')
+
+if __name__ == "__main__":
+    test_choose_media_type()
+    test_columnar_round_trip()
+    test_negotiated_upload()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test that every available XML backend gives the same parse and converter output
+"""
+
+import os
+import sys
+import warnings
+sys.path.append(os.path.dirname(__file__))
+
+import xml_backend
+from main import NetworkParser
+from pkt_converter import PKTConverter
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+def parse_with(backend_name, content):
+    xml_backend.use(backend_name)
+    try:
+        return NetworkParser().parse_xml_file(content)
+    finally:
+        xml_backend.use()
+
+def test_backends_agree():
+    with open(os.path.join(SAMPLE_DIR, 'network_topology.xml'), encoding='utf-8') as f:
+        sample = f.read()
+
+    devices = [{'name': 'R1', 'type': 'Router', 'ip': '10.0.0.1'}, {'name': 'PC1', 'type': 'PC', 'ip': '10.0.0.10'}]
+    connections = [{'from': 'R1', 'to': 'PC1'}]
+    converter = PKTConverter()
+    try:
+        for name in xml_backend.BACKENDS:
+            xml_backend.use(name)
+            converted = converter._create_xml_from_devices(devices, connections)
+            # The parser reads IPs from child elements, not the ip attribute
+            assert parse_with(name, converted) == {
+                "devices": [{**device, "ip": ""} for device in devices],
+                "links": [{"from": "R1", "to": "PC1"}],
+            }, name
+            assert parse_with(name, sample) == parse_with("elementtree", sample), name
+            print(f'✅ {name} backend matches')
+    finally:
+        converter.cleanup()
+        xml_backend.use()
+
+def test_child_elements_agree():
+    # Leaf child elements are passed over for the next alternative, and the
+    # last alternative is used as found, without relying on element truthiness
+    content = """<network><devices>
+<device><name>R1</name><type>Router</type></device>
+<device name="R2" type="Router"><ip>10.0.0.1</ip><ipAddress>10.0.0.2</ipAddress></device>
+<device name="R3" type="Router"><IP><ipAddress>10.0.0.3</ipAddress></IP></device>
+</devices><links>
+<link><source>R9</source><from>R2</from><to>R3</to></link>
+<link source="R2"><target><ref>R3</ref></target><to>R1</to></link>
+</links></network>"""
+    expected = {
+        "devices": [{"name": "R2", "type": "Router", "ip": "10.0.0.2"}, {"name": "R3", "type": "Router", "ip": ""}],
+        "links": [{"from": "R2", "to": "R3"}],
+    }
+    for name in xml_backend.BACKENDS:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert parse_with(name, content) == expected, name
+        print(f'✅ {name} backend reads child elements the same way')
+
+if __name__ == "__main__":
+    test_backends_agree()
+    test_child_elements_agree()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the one-pass XML parser against the sample export and edge cases
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from main import NetworkParser
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_files')
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_xml_stream_matches_file():
+    with open(os.path.join(SAMPLE_DIR, 'network_topology.xml'), 'rb') as f:
+        data = f.read()
+    expected = NetworkParser().parse_xml_file(data.decode('utf-8'))
+    assert len(expected["devices"]) == 7 and len(expected["links"]) == 6
+
+    for size in (1, 7, 256, len(data) + 1):
+        assert NetworkParser().parse_xml_stream(chunked(data, size)) == expected, size
+    print('✅ network_topology.xml: streamed parse matches')
+
+def test_xml_document_order():
+    # Nested devices keep document order even though the inner one closes first
+    content = '''<network>
+      <device name="Outer" type="Router"><device name="Inner" type="PC"><ipAddress>10.0.0.2</ipAddress></device></device>
+      <link source="Outer" target="Inner" />
+      <Link source="Ignored" target="Ignored" />
+    </network>'''
+    result = NetworkParser().parse_xml_file(content)
+    assert result["devices"] == [
+        {"name": "Outer", "type": "Router", "ip": "10.0.0.2"},
+        {"name": "Inner", "type": "PC", "ip": "10.0.0.2"},
+    ]
+    assert result["links"] == [{"from": "Outer", "to": "Inner"}]
+    print('✅ Nested devices keep document order')
+
+def test_xml_fallbacks():
+    # No device elements: device-like tags become devices
+    result = NetworkParser().parse_xml_file('<lab><Router name="R1" ip="10.0.0.1"/><pc/></lab>')
+    assert result["devices"] == [
+        {"name": "R1", "type": "Router", "ip": "10.0.0.1"},
+        {"name": "pc_1", "type": "Pc", "ip": ""},
+    ]
+
+    # Not well-formed: only the IPs are recovered
+    content = '<network><device name="R1" type="Router"/> 10.0.0.1 <unclosed>'
+    assert NetworkParser().parse_xml_file(content)["devices"] == [{"name": "Device0", "type": "Unknown", "ip": "10.0.0.1"}]
+    assert NetworkParser().parse_xml_stream(chunked(content.encode(), 5))["devices"] == [
+        {"name": "Device0", "type": "Unknown", "ip": "10.0.0.1"}
+    ]
+    # A one-shot stream is read again through reread() for the IPs
+    data = content.encode()
+    streamed = NetworkParser().parse_xml_stream(iter(chunked(data, 5)), reread=lambda: chunked(data, 5))
+    assert streamed["devices"] == [{"name": "Device0", "type": "Unknown", "ip": "10.0.0.1"}]
+    print('✅ XML fallbacks')
+
+if __name__ == "__main__":
+    test_xml_stream_matches_file()
+    test_xml_document_order()
+    test_xml_fallbacks()
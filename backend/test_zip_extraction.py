@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test ZIP extraction in the PKT converter: which member is picked, and the
+size and ratio limits on members as they decompress
+"""
+
+import io
+import os
+import sys
+import tracemalloc
+import zipfile
+sys.path.append(os.path.dirname(__file__))
+
+import main
+import pkt_converter
+from pkt_converter import PKTConverter
+from topology import Topology
+
+NETWORK_XML = '<network><devices><device name="R1" type="Router"/></devices></network>'
+
+def build_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+def extract(members):
+    return extract_from(build_zip(members))
+
+def extract_from(data):
+    return PKTConverter()._try_zip_extraction(data)
+
+def test_member_priority():
+    # XML wins over earlier text and JSON members; resource forks and empty members are passed over
+    assert extract([
+        ('notes.txt', 'Router1\nSwitch1'),
+        ('__MACOSX/._network.xml', b'\x00\x05\x16\x07'),
+        ('empty.xml', ''),
+        ('devices.json', '{"name": "R1"}'),
+        ('network.xml', NETWORK_XML),
+    ]) == NETWORK_XML
+    # A member that fails to decode moves on to the next one
+    assert extract([('broken.xml', b'\xff\xfe<network/>'), ('devices.json', '{"name": "R1", "type": "router"}')]) \
+        == PKTConverter()._json_to_xml({"name": "R1", "type": "router"})
+    # Text members are read line by line as before
+    assert extract([('config.txt', '# comment\r\n Router1 \r\n\r\nSwitch1')]) \
+        == PKTConverter()._text_to_xml(['Router1', 'Switch1'])
+    print('✅ Most promising archive member is used')
+
+def test_member_streaming():
+    # Asked for a topology, the XML member is parsed as it decompresses
+    converter = PKTConverter(main._parse_converted_xml_stream)
+    for xml in (NETWORK_XML, '<network><device name="R1"/> 10.0.0.1 <unclosed>'):
+        archive = build_zip([('network.xml', xml)])
+        topology = converter._try_zip_extraction(archive, as_topology=True)
+        assert isinstance(topology, Topology)
+        assert topology.to_dict() == main._parse_converted_xml(xml)[0].to_dict()
+        assert converter._try_zip_extraction(archive) == xml
+
+    # The archive is read in place, so a large member that isn't used costs nothing
+    archive = build_zip([('padding.bin', os.urandom(8 * 1024 * 1024)), ('network.xml', NETWORK_XML)],
+                        zipfile.ZIP_STORED)
+    tracemalloc.start()
+    try:
+        assert extract_from(memoryview(archive)) == NETWORK_XML
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 1024 * 1024, peak
+    print(f'✅ XML member parsed while it decompresses; archive read in place with {peak / 2**10:.0f} KB peak')
+
+def test_member_limits():
+    # 200 MB of zeros compress to about 200 KB
+    bomb = build_zip([('network.xml', b'\x00' * (200 * 1024 * 1024))])
+    tracemalloc.start()
+    try:
+        assert PKTConverter()._try_zip_extraction(bomb) is None
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 16 * 1024 * 1024, peak
+    print(f'✅ Compression bomb given up with {peak / 2**20:.1f} MB peak')
+
+    # The limit is also counted on the bytes actually decompressed
+    archive = zipfile.ZipFile(io.BytesIO(build_zip([('network.xml', NETWORK_XML * 1000)])))
+    original = pkt_converter.ZIP_MEMBER_MAX_BYTES
+    pkt_converter.ZIP_MEMBER_MAX_BYTES = 4096
+    try:
+        chunks = pkt_converter._iter_member_text(archive, archive.infolist()[0])
+        try:
+            for _ in chunks:
+                pass
+            assert False, 'limit not enforced'
+        except pkt_converter.ZipMemberTooLarge:
+            pass
+    finally:
+        pkt_converter.ZIP_MEMBER_MAX_BYTES = original
+    print('✅ Member over the limit stopped while decompressing')
+
+if __name__ == "__main__":
+    test_member_priority()
+    test_member_streaming()
+    test_member_limits()
@@ -0,0 +1,150 @@
+"""
+Compact topology model
+Stores parsed devices and links as integer columns over a shared string table,
+so large topologies don't keep a dict per device and per link while parsing
+"""
+
+from array import array
+from typing import Dict, Iterator, List
+
+
+class Topology:
+    """Devices and links of one parsed network.
+
+    Every name, type and IP string is stored once in ``strings``; devices are
+    rows of string ids in three parallel columns and links are pairs of
+    string ids. Link endpoints don't have to be devices.
+    """
+
+    __slots__ = (
+        "strings", "_string_ids", "_device_rows",
+        "device_names", "device_types", "device_ips",
+        "link_sources", "link_targets", "_link_keys",
+    )
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        # Device row for each string id, -1 when that string is not a device
+        self._device_rows = array('i')
+
+        self.device_names = array('i')
+        self.device_types = array('i')
+        self.device_ips = array('i')
+
+        self.link_sources = array('i')
+        self.link_targets = array('i')
+        # (source << 32 | target) of every link, only while links are being added
+        self._link_keys = set()
+
+        self.intern("")
+
+    def intern(self, value: str) -> int:
+        """Return the string table id for a value, adding it if new"""
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._string_ids[value] = string_id
+            self.strings.append(value)
+            self._device_rows.append(-1)
+        return string_id
+
+    @property
+    def device_count(self) -> int:
+        return len(self.device_names)
+
+    @property
+    def link_count(self) -> int:
+        return len(self.link_sources)
+
+    def has_device(self, name: str) -> bool:
+        string_id = self._string_ids.get(name)
+        return string_id is not None and self._device_rows[string_id] >= 0
+
+    def append_device(self, name: str, device_type: str, ip: str):
+        """Append a device row even if the name is already a device"""
+        name_id = self.intern(name)
+        if self._device_rows[name_id] < 0:
+            self._device_rows[name_id] = len(self.device_names)
+        self.device_names.append(name_id)
+        self.device_types.append(self.intern(device_type))
+        self.device_ips.append(self.intern(ip))
+
+    def add_device(self, name: str, device_type: str, ip: str) -> bool:
+        """Append a device unless one with the same name exists; the first one wins"""
+        if self.has_device(name):
+            return False
+        self.append_device(name, device_type, ip)
+        return True
+
+    def fill_device_ip(self, name: str, ip: str) -> bool:
+        """Set a device's IP if it has none yet; returns False if there is no such device"""
+        string_id = self._string_ids.get(name)
+        if string_id is None or self._device_rows[string_id] < 0:
+            return False
+        row = self._device_rows[string_id]
+        if not self.strings[self.device_ips[row]]:
+            self.device_ips[row] = self.intern(ip)
+        return True
+
+    def append_link(self, source: str, target: str):
+        """Append a link even if it duplicates an existing one"""
+        self.link_sources.append(self.intern(source))
+        self.link_targets.append(self.intern(target))
+
+    def add_link(self, source: str, target: str) -> bool:
+        """Append a link unless it, or its reverse, was already added with add_link"""
+        if self._link_keys is None:
+            self._link_keys = {(s << 32) | t for s, t in zip(self.link_sources, self.link_targets)}
+        source_id = self.intern(source)
+        target_id = self.intern(target)
+        key = (source_id << 32) | target_id
+        if key in self._link_keys or (target_id << 32) | source_id in self._link_keys:
+            return False
+        self._link_keys.add(key)
+        self.link_sources.append(source_id)
+        self.link_targets.append(target_id)
+        return True
+
+    def merge(self, other: "Topology"):
+        """Add another topology's devices and links in order, as add_device and add_link would"""
+        ids = array('i', map(self.intern, other.strings))
+        rows = self._device_rows
+        for name_id, type_id, ip_id in zip(other.device_names, other.device_types, other.device_ips):
+            name_id = ids[name_id]
+            if rows[name_id] < 0:
+                rows[name_id] = len(self.device_names)
+                self.device_names.append(name_id)
+                self.device_types.append(ids[type_id])
+                self.device_ips.append(ids[ip_id])
+
+        if self._link_keys is None:
+            self._link_keys = {(s << 32) | t for s, t in zip(self.link_sources, self.link_targets)}
+        link_keys = self._link_keys
+        for source_id, target_id in zip(other.link_sources, other.link_targets):
+            source_id = ids[source_id]
+            target_id = ids[target_id]
+            key = (source_id << 32) | target_id
+            if key in link_keys or (target_id << 32) | source_id in link_keys:
+                continue
+            link_keys.add(key)
+            self.link_sources.append(source_id)
+            self.link_targets.append(target_id)
+
+    def release_link_index(self):
+        """Free the link dedup set once parsing is done; add_link rebuilds it if needed"""
+        self._link_keys = None
+
+    def iter_devices(self) -> Iterator[Dict[str, str]]:
+        strings = self.strings
+        for name_id, type_id, ip_id in zip(self.device_names, self.device_types, self.device_ips):
+            yield {"name": strings[name_id], "type": strings[type_id], "ip": strings[ip_id]}
+
+    def iter_links(self) -> Iterator[Dict[str, str]]:
+        strings = self.strings
+        for source_id, target_id in zip(self.link_sources, self.link_targets):
+            yield {"from": strings[source_id], "to": strings[target_id]}
+
+    def to_dict(self) -> Dict[str, List[Dict[str, str]]]:
+        """Expand into the {"devices": [...], "links": [...]} response shape"""
+        return {"devices": list(self.iter_devices()), "links": list(self.iter_links())}
@@ -0,0 +1,119 @@
+"""
+Upload cache
+Keeps conversion and parse results for uploads seen before, keyed by a hash
+of the uploaded bytes. Values are pickled, so both tiers are bounded by the
+exact number of bytes they hold: an in-memory LRU tier and an optional
+on-disk tier that survives restarts.
+"""
+
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class UploadCache:
+    """Two-tier LRU cache of picklable values.
+
+    The memory tier holds up to memory_bytes of pickled values. When
+    disk_dir is given, every value is also written there, up to disk_bytes;
+    a value dropped from memory is read back from disk on its next use.
+    hits and misses count lookups.
+    """
+
+    def __init__(self, memory_bytes: int, disk_dir: Optional[str] = None, disk_bytes: int = 0):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes if disk_dir else 0
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk = OrderedDict()
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Pick up the files an earlier process left, oldest use first"""
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith('.cache'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len('.cache')], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_used += size
+        with self._lock:
+            self._evict_disk()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + '.cache')
+
+    def get(self, key: str) -> Any:
+        """The cached value, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            elif key in self._disk:
+                self._disk.move_to_end(key)
+                data = self._read_disk(key)
+                if data is not None:
+                    self._put_memory(key, data)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(data)
+
+    def put(self, key: str, value: Any):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path = None
+        if len(data) <= self.disk_bytes:
+            # Written under a temporary name so readers never see part of a file
+            fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+
+        with self._lock:
+            self._put_memory(key, data)
+            if temp_path is not None:
+                os.replace(temp_path, self._disk_path(key))
+                self._disk_used += len(data) - self._disk.pop(key, 0)
+                self._disk[key] = len(data)
+                self._evict_disk()
+
+    def _put_memory(self, key: str, data: bytes):
+        self._memory_used -= len(self._memory.pop(key, b''))
+        if len(data) > self.memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            self._disk_used -= self._disk.pop(key)
+            return None
+
+    def _evict_disk(self):
+        while self._disk_used > self.disk_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
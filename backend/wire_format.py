@@ -0,0 +1,164 @@
+"""
+Wire formats for topology responses
+Besides plain JSON, a topology can be sent in a columnar layout: every name,
+type and IP once in a string table, devices as three columns of string ids
+and links as two. That is how Topology stores it, so the binary layout is
+mostly the columns' own bytes. MessagePack is offered when msgpack is
+installed.
+"""
+
+import json
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from topology import Topology
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+COLUMNAR_MEDIA_TYPE = "application/x-topology-columnar"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# Response types /upload can negotiate
+MEDIA_TYPES = [JSON_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE, NDJSON_MEDIA_TYPE]
+if msgpack is not None:
+    MEDIA_TYPES.append(MSGPACK_MEDIA_TYPE)
+
+COLUMNAR_MAGIC = b"NTOP"
+COLUMNAR_VERSION = 1
+
+
+def choose_media_type(accept: Optional[str]) -> str:
+    """The supported media type an Accept header asks for most, JSON when it names none"""
+    best, best_quality = JSON_MEDIA_TYPE, 0.0
+    for part in (accept or "").split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        # Earlier entries win ties; */* and types not offered leave JSON
+        if media_type.lower() in MEDIA_TYPES and quality > best_quality:
+            best, best_quality = media_type.lower(), quality
+    return best
+
+
+def to_columnar(topology: Topology, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """The columnar layout as plain values, for MessagePack"""
+    return {
+        "metadata": metadata,
+        "strings": topology.strings,
+        "devices": {
+            "name": topology.device_names.tolist(),
+            "type": topology.device_types.tolist(),
+            "ip": topology.device_ips.tolist(),
+        },
+        "links": {
+            "from": topology.link_sources.tolist(),
+            "to": topology.link_targets.tolist(),
+        },
+    }
+
+
+def encode_msgpack(topology: Topology, metadata: Dict[str, Any]) -> bytes:
+    return msgpack.packb(to_columnar(topology, metadata))
+
+
+def encode_columnar(topology: Topology, metadata: Dict[str, Any]) -> bytes:
+    """The columnar binary layout, all integers little-endian:
+
+        "NTOP", u32 version
+        u32 metadata byte length, metadata as UTF-8 JSON, padded to 4 bytes
+        u32 string count, u32 UTF-8 byte length of each string,
+            the strings back to back, padded to 4 bytes
+        u32 device count, i32 name ids, i32 type ids, i32 ip ids
+        u32 link count, i32 source ids, i32 target ids
+
+    Every column starts 4-byte aligned, so a browser can view it as an
+    Int32Array without copying.
+    """
+    encoded = [value.encode("utf-8") for value in topology.strings]
+    lengths = array("I", map(len, encoded))
+    parts = [COLUMNAR_MAGIC, struct.pack("<I", COLUMNAR_VERSION)]
+    _append_block(parts, json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+    parts.append(struct.pack("<I", len(encoded)))
+    parts.append(_little_endian(lengths))
+    _append_block(parts, b"".join(encoded), with_length=False)
+    parts.append(struct.pack("<I", topology.device_count))
+    for column in (topology.device_names, topology.device_types, topology.device_ips):
+        parts.append(_little_endian(column))
+    parts.append(struct.pack("<I", topology.link_count))
+    for column in (topology.link_sources, topology.link_targets):
+        parts.append(_little_endian(column))
+    return b"".join(parts)
+
+
+def decode_columnar(data: bytes) -> Dict[str, Any]:
+    """The /upload JSON body a columnar payload carries"""
+    if data[:4] != COLUMNAR_MAGIC or struct.unpack_from("<I", data, 4)[0] != COLUMNAR_VERSION:
+        raise ValueError("not a columnar topology payload")
+    offset = 8
+    (length,), offset = struct.unpack_from("<I", data, offset), offset + 4
+    metadata = json.loads(data[offset:offset + length].decode("utf-8"))
+    offset = _padded(offset + length)
+
+    lengths, offset = _read_column(data, offset, "I")
+    strings: List[str] = []
+    for length in lengths:
+        strings.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    offset = _padded(offset)
+
+    names, types, ips, offset = _read_columns(data, offset, 3)
+    devices = [{"name": strings[n], "type": strings[t], "ip": strings[i]} for n, t, i in zip(names, types, ips)]
+    sources, targets, offset = _read_columns(data, offset, 2)
+    links = [{"from": strings[s], "to": strings[t]} for s, t in zip(sources, targets)]
+    return {"devices": devices, "links": links, "metadata": metadata}
+
+
+def _append_block(parts: List[bytes], block: bytes, with_length: bool = True):
+    if with_length:
+        parts.append(struct.pack("<I", len(block)))
+    parts.append(block)
+    parts.append(b"\0" * (_padded(len(block)) - len(block)))
+
+
+def _padded(offset: int) -> int:
+    return (offset + 3) & ~3
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(data: bytes, offset: int, typecode: str, count: Optional[int] = None):
+    if count is None:
+        (count,), offset = struct.unpack_from("<I", data, offset), offset + 4
+    column = array(typecode)
+    column.frombytes(data[offset:offset + count * column.itemsize])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, offset + count * column.itemsize
+
+
+def _read_columns(data: bytes, offset: int, column_count: int):
+    """column_count columns of i32 that share one leading count"""
+    (count,), offset = struct.unpack_from("<I", data, offset), offset + 4
+    columns = []
+    for _ in range(column_count):
+        column, offset = _read_column(data, offset, "i", count)
+        columns.append(column)
+    return (*columns, offset)
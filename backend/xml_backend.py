@@ -0,0 +1,108 @@
+"""
+XML backend
+Uses lxml's C parser and serializer when lxml is installed and the standard
+library's ElementTree otherwise. Set XML_BACKEND=elementtree to force the
+standard library.
+"""
+
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, Optional
+
+try:
+    from lxml import etree as _lxml
+except ImportError:
+    _lxml = None
+
+
+class ElementTreeBackend:
+    """The standard library's ElementTree"""
+
+    name = "elementtree"
+    ParseError = ET.ParseError
+    Element = ET.Element
+    SubElement = ET.SubElement
+
+    def pull_parser(self):
+        return ET.XMLPullParser(events=('start', 'end'))
+
+    def fromstring(self, text: str):
+        return ET.fromstring(text)
+
+    def is_element(self, value) -> bool:
+        return isinstance(value, ET.Element)
+
+    def find(self, elem, path: str):
+        """First element matching an ElementPath, or None"""
+        # ElementPath keeps its own cache of compiled paths
+        return elem.find(path)
+
+    def tostring(self, root) -> str:
+        return ET.tostring(root, encoding='unicode')
+
+
+class LxmlBackend:
+    """lxml, with queries compiled to XPath once"""
+
+    name = "lxml"
+
+    def __init__(self):
+        self.ParseError = _lxml.ParseError
+        self.Element = _lxml.Element
+        self.SubElement = _lxml.SubElement
+        # Match what ElementTree gives: no comments or processing instructions
+        # in the tree, internal entities expanded, nothing fetched from outside
+        self._parser_options = {
+            "remove_comments": True,
+            "remove_pis": True,
+            "no_network": True,
+            "resolve_entities": "internal" if _lxml.LXML_VERSION >= (5,) else False,
+        }
+        self._parser = _lxml.XMLParser(**self._parser_options)
+        self._queries: Dict[str, object] = {}
+
+    def pull_parser(self):
+        return _lxml.XMLPullParser(events=('start', 'end'), **self._parser_options)
+
+    def fromstring(self, text: str):
+        return _lxml.fromstring(text, self._parser)
+
+    def is_element(self, value) -> bool:
+        return isinstance(value, _lxml._Element)
+
+    def find(self, elem, path: str):
+        """First element matching an ElementPath, or None.
+
+        Only plain child tags and ".//tag" descendant searches are used, and
+        both are valid XPath as they are.
+        """
+        query = self._queries.get(path)
+        if query is None:
+            query = self._queries[path] = _lxml.XPath(f'({path})[1]')
+        matches = query(elem)
+        return matches[0] if matches else None
+
+    def tostring(self, root) -> str:
+        return _lxml.tostring(root, encoding='unicode')
+
+
+BACKENDS = {"elementtree": ElementTreeBackend}
+if _lxml is not None:
+    BACKENDS["lxml"] = LxmlBackend
+
+
+def get_backend(name: Optional[str] = None):
+    """The named backend, or lxml when it is available"""
+    if name is None:
+        name = "lxml" if "lxml" in BACKENDS else "elementtree"
+    return BACKENDS[name]()
+
+
+backend = get_backend(os.environ.get("XML_BACKEND") or None)
+
+
+def use(name: Optional[str] = None):
+    """Switch the backend used by the parsers and the PKT converter"""
+    global backend
+    backend = get_backend(name)
+    return backend
@@ -1,5 +1,7 @@
 // Configuration
 const API_BASE_URL = 'http://127.0.0.1:8000';
+// Uploads at least this big ask for the streamed result, so drawing starts early
+const STREAMED_RESULT_BYTES = 5 * 1024 * 1024;
 
 // Global variables
 let networkData = null;
@@ -134,8 +136,14 @@ async function processFile(file) {
         const formData = new FormData();
         formData.append('file', file);
 
+        // Large networks are streamed so they start rendering early; the rest
+        // come back in the compact columnar form
+        const accept = file.size >= STREAMED_RESULT_BYTES
+            ? 'application/x-ndjson, application/json;q=0.8'
+            : 'application/x-topology-columnar, application/json;q=0.8';
         const response = await fetch(`${API_BASE_URL}/upload`, {
             method: 'POST',
+            headers: { 'Accept': accept },
             body: formData
         });
 
@@ -144,17 +152,23 @@ async function processFile(file) {
             throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
+        const contentType = response.headers.get('content-type') || '';
+        let data;
+        if (contentType.includes('application/x-topology-columnar')) {
+            data = decodeColumnarTopology(await response.arrayBuffer());
+            showResults();
+            updateNetworkVisualization(data);
+        } else if (contentType.includes('application/x-ndjson')) {
+            data = await readStreamedTopology(response);
+        } else {
+            data = await response.json();
+            showResults();
+            updateNetworkVisualization(data);
+        }
         console.log('Upload response:', data);
         
         networkData = data;
         updateUI(data);
-        updateNetworkVisualization(data);
-        
-        // Hide empty state and show results
-        if (emptyState) emptyState.style.display = 'none';
-        resultsSection.style.display = 'block';
-        clearDataBtn.style.display = 'inline-block';
         
         showSuccess('Network topology parsed successfully!');
         
@@ -166,6 +180,114 @@ async function processFile(file) {
     }
 }
 
+// Read an NDJSON /upload response: a metadata line, then lines of devices
+// and then links. Each chunk is drawn as it arrives.
+async function readStreamedTopology(response) {
+    const data = { devices: [], links: [], metadata: {} };
+    
+    await readNdjson(response, value => {
+        if (value.metadata) {
+            data.metadata = value.metadata;
+            showResults();
+            if (cy) cy.elements().remove();
+        }
+        if (value.devices) {
+            data.devices.push(...value.devices);
+            addNetworkElements(value.devices, []);
+        }
+        if (value.links) {
+            data.links.push(...value.links);
+            addNetworkElements([], value.links);
+        }
+    });
+    
+    applyLayout();
+    return data;
+}
+
+async function readNdjson(response, onValue) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        buffered += decoder.decode(value, { stream: !done });
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onValue(JSON.parse(line)));
+        if (done) break;
+    }
+    if (buffered.trim()) onValue(JSON.parse(buffered));
+}
+
+// Decode the columnar /upload layout (see backend/wire_format.py): a string
+// table, then devices and links as columns of string ids. The columns are
+// viewed in place as little-endian Int32Arrays, as on every browser platform.
+function decodeColumnarTopology(buffer) {
+    const bytes = new Uint8Array(buffer);
+    const view = new DataView(buffer);
+    const decoder = new TextDecoder();
+    if (decoder.decode(bytes.subarray(0, 4)) !== 'NTOP' || view.getUint32(4, true) !== 1) {
+        throw new Error('Unsupported topology response format');
+    }
+    
+    let offset = 8;
+    const padded = value => (value + 3) & ~3;
+    const readCount = () => {
+        const count = view.getUint32(offset, true);
+        offset += 4;
+        return count;
+    };
+    const readColumn = count => {
+        const column = new Int32Array(buffer, offset, count);
+        offset += count * 4;
+        return column;
+    };
+    
+    const metadataLength = readCount();
+    const metadata = JSON.parse(decoder.decode(bytes.subarray(offset, offset + metadataLength)));
+    offset = padded(offset + metadataLength);
+    
+    const stringCount = readCount();
+    const lengths = new Uint32Array(buffer, offset, stringCount);
+    offset += stringCount * 4;
+    const blobLength = lengths.reduce((total, length) => total + length, 0);
+    const blob = bytes.subarray(offset, offset + blobLength);
+    const text = decoder.decode(blob);
+    // Pure ASCII decodes to one character per byte, so one decode can be sliced
+    const ascii = text.length === blobLength;
+    const strings = new Array(stringCount);
+    let position = 0;
+    for (let i = 0; i < stringCount; i++) {
+        const end = position + lengths[i];
+        strings[i] = ascii ? text.slice(position, end) : decoder.decode(blob.subarray(position, end));
+        position = end;
+    }
+    offset = padded(offset + blobLength);
+    
+    const deviceCount = readCount();
+    const names = readColumn(deviceCount);
+    const types = readColumn(deviceCount);
+    const ips = readColumn(deviceCount);
+    const linkCount = readCount();
+    const sources = readColumn(linkCount);
+    const targets = readColumn(linkCount);
+    
+    return {
+        devices: Array.from(names, (name, i) => ({ name: strings[name], type: strings[types[i]], ip: strings[ips[i]] })),
+        links: Array.from(sources, (source, i) => ({ from: strings[source], to: strings[targets[i]] })),
+        metadata: metadata
+    };
+}
+
+function showResults() {
+    // Hide empty state and show results
+    if (emptyState) emptyState.style.display = 'none';
+    resultsSection.style.display = 'block';
+    clearDataBtn.style.display = 'inline-block';
+}
+
 function showLoading(message) {
     uploadContent.style.display = 'none';
     loadingContent.style.display = 'block';
@@ -633,6 +755,25 @@ function updateNetworkVisualization(data) {
         // Clear existing elements
         cy.elements().remove();
         
+        addNetworkElements(devices, links);
+        
+        // Apply layout
+        applyLayout();
+        
+        console.log('Network visualization updated successfully');
+        
+    } catch (error) {
+        console.error('Error updating network visualization:', error);
+    }
+}
+
+function addNetworkElements(devices, links) {
+    if (!cy) {
+        console.error('Cytoscape not initialized');
+        return;
+    }
+    
+    try {
         // Add nodes
         devices.forEach(device => {
             const color = getNodeColor(device.type);
@@ -668,13 +809,8 @@ function updateNetworkVisualization(data) {
             console.log(`Added edge: ${link.from} -> ${link.to}`);
         });
         
-        // Apply layout
-        applyLayout();
-        
-        console.log('Network visualization updated successfully');
-        
     } catch (error) {
-        console.error('Error updating network visualization:', error);
+        console.error('Error adding network elements:', error);
     }
 }
 